@@ -0,0 +1,261 @@
+# Copyright (c) 2026 IndyKite
+"""Micro-batching gateway for single AuthZEN evaluations.
+
+An authorization check runs per request, and one /access/v1/evaluation call
+per check makes the platform round trip the bottleneck. Here single
+evaluations that arrive within BATCH_WINDOW_MS of each other (or until
+BATCH_MAX_SIZE of them are waiting) are sent as ONE bulk
+/access/v1/evaluations call, and each caller gets its own decision back from
+the response's `evaluations` list, which is in request order.
+
+ - The first evaluation of a batch waits out the window and sends the batch;
+   a batch of one is sent to the single endpoint unchanged, so a quiet app
+   behaves exactly as before. BATCH_WINDOW_MS=0 turns batching off.
+ - Only calls for the same platform URL and app token share a batch, and
+   identical evaluations in a batch are sent once.
+ - A bulk call rejected as a bad request (400/422) is retried one evaluation
+   at a time, so one malformed request cannot fail its neighbours. So is one
+   the platform does not serve or permit (403/404/405/501): the batch falls
+   back to the single endpoint, and that URL and token skip the bulk call for
+   BULK_RETRY_SECONDS. Any other error status is every caller's answer.
+ - Decisions are cached for DECISION_TTL_SECONDS, keyed by the subject,
+   resource, action and a hash of the context (and the app token);
+   DECISION_TTL_SECONDS=0 turns the cache off.
+
+gateway_stats() reports the batch sizes and cache hit rate. Everything is per
+process.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from api._platform import data_request, parse_json
+
+logger = logging.getLogger(__name__)
+
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
+HTTP_BAD_REQUEST = 400
+HTTP_FORBIDDEN = 403
+HTTP_NOT_FOUND = 404
+HTTP_METHOD_NOT_ALLOWED = 405
+HTTP_UNPROCESSABLE_ENTITY = 422
+HTTP_NOT_IMPLEMENTED = 501
+# The bulk endpoint is missing or not permitted for this app: answer one evaluation at a time instead.
+_BULK_UNAVAILABLE = frozenset({HTTP_FORBIDDEN, HTTP_NOT_FOUND, HTTP_METHOD_NOT_ALLOWED, HTTP_NOT_IMPLEMENTED})
+
+BATCH_WINDOW_MS = float(os.getenv("AUTHZEN_BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("AUTHZEN_BATCH_MAX_SIZE", "50"))
+DECISION_TTL_SECONDS = float(os.getenv("AUTHZEN_DECISION_TTL_SECONDS", "5"))
+DECISION_CACHE_MAX = 4096
+BULK_RETRY_SECONDS = 300
+
+
+def _decision_key(app_token, evaluation):
+    context = json.dumps(evaluation.get("context") or {}, sort_keys=True, separators=(",", ":"), default=str)
+    parts = [
+        hashlib.sha256((app_token or "").encode()).hexdigest()[:16],
+        json.dumps(evaluation.get("subject"), sort_keys=True, separators=(",", ":")),
+        json.dumps(evaluation.get("resource"), sort_keys=True, separators=(",", ":")),
+        json.dumps(evaluation.get("action"), sort_keys=True, separators=(",", ":")),
+        hashlib.sha256(context.encode()).hexdigest()[:16],
+    ]
+    return "\x1f".join(parts)
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.items = []
+        self.keys = {}
+        self.results = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class EvaluationGateway:
+    """Collects single evaluations into bulk calls and caches their decisions."""
+
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_size=BATCH_MAX_SIZE, ttl=DECISION_TTL_SECONDS) -> None:
+        self.window = window_ms / 1000
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._open = {}
+        self._decisions = OrderedDict()
+        # (url_endpoints, app_token) -> monotonic time until which its bulk endpoint is not tried.
+        self._no_bulk = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "evaluations": 0,
+            "cache_hits": 0,
+            "platform_calls": 0,
+            "bulk_calls": 0,
+            "batched_evaluations": 0,
+            "largest_batch": 0,
+            "fallbacks": 0,
+            "bulk_unavailable": 0,
+        }
+
+    def evaluate(self, url_endpoints, app_token, evaluation):
+        """Return (status_code, response_json) for one evaluation, as /access/v1/evaluation would.
+
+        Raises the platform client's requests.RequestException when the call
+        carrying this evaluation failed without a response.
+        """
+        key = _decision_key(app_token, evaluation)
+        with self._lock:
+            self._stats["evaluations"] += 1
+            cached = self._cached(key)
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                return HTTP_OK, dict(cached)
+            if self.window <= 0 or self.max_size == 1:
+                batch, index, leader = None, 0, True
+            else:
+                batch, index, leader = self._join((url_endpoints, app_token), key, evaluation)
+        if batch is None:
+            batch = _Batch()
+            batch.items.append(evaluation)
+            self._send(url_endpoints, app_token, batch)
+        elif leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get((url_endpoints, app_token)) is batch:
+                    del self._open[url_endpoints, app_token]
+            self._send(url_endpoints, app_token, batch)
+        else:
+            batch.done.wait()
+        result = batch.results[index]
+        if isinstance(result, Exception):
+            raise result
+        status_code, response_json = result
+        if HTTP_OK <= status_code < HTTP_MULTIPLE_CHOICES and self.ttl > 0:
+            with self._lock:
+                self._decisions[key] = (time.monotonic() + self.ttl, response_json)
+                self._decisions.move_to_end(key)
+                while len(self._decisions) > DECISION_CACHE_MAX:
+                    self._decisions.popitem(last=False)
+        return status_code, dict(response_json) if isinstance(response_json, dict) else response_json
+
+    def _cached(self, key):
+        entry = self._decisions.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._decisions[key]
+            return None
+        self._decisions.move_to_end(key)
+        return entry[1]
+
+    def _join(self, group, key, evaluation):
+        """Add the evaluation to the group's open batch (opening one); caller holds the lock."""
+        batch = self._open.get(group)
+        leader = batch is None
+        if leader:
+            batch = self._open[group] = _Batch()
+        elif key in batch.keys:
+            # The same check is already in this batch: share its decision.
+            return batch, batch.keys[key], False
+        batch.keys[key] = len(batch.items)
+        batch.items.append(evaluation)
+        if len(batch.items) >= self.max_size:
+            # Full: nobody else joins, and the leader sends it now instead of at the window's end.
+            del self._open[group]
+            batch.full.set()
+        return batch, len(batch.items) - 1, leader
+
+    def _send(self, url_endpoints, app_token, batch):
+        try:
+            batch.results = self._call(url_endpoints, app_token, batch.items)
+        except Exception as exc:
+            batch.results = [exc] * len(batch.items)
+        finally:
+            batch.done.set()
+
+    def _call(self, url_endpoints, app_token, items):
+        with self._lock:
+            self._stats["platform_calls"] += 1
+        if len(items) == 1:
+            return [self._single(url_endpoints, app_token, items[0])]
+        group = (url_endpoints, app_token)
+        with self._lock:
+            if self._no_bulk.get(group, 0) > time.monotonic():
+                self._stats["fallbacks"] += 1
+                skip_bulk = True
+            else:
+                self._no_bulk.pop(group, None)
+                skip_bulk = False
+        if skip_bulk:
+            return [self._single(url_endpoints, app_token, item) for item in items]
+        with self._lock:
+            self._stats["bulk_calls"] += 1
+            self._stats["batched_evaluations"] += len(items)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
+        response = data_request(
+            "POST",
+            f"{url_endpoints}/access/v1/evaluations",
+            app_token,
+            json={"evaluations": items},
+            idempotent=True,
+        )
+        response_json = parse_json(response)
+        decisions = response_json.get("evaluations") if isinstance(response_json, dict) else None
+        if HTTP_OK <= response.status_code < HTTP_MULTIPLE_CHOICES and isinstance(decisions, list):
+            if len(decisions) == len(items):
+                logger.debug("AuthZEN bulk call answered %s evaluations", len(items))
+                return [(response.status_code, decision) for decision in decisions]
+            logger.warning("AuthZEN bulk call returned %s decisions for %s evaluations", len(decisions), len(items))
+        elif response.status_code in _BULK_UNAVAILABLE:
+            logger.warning(
+                "AuthZEN bulk endpoint answered %s; evaluating one at a time for %ss",
+                response.status_code,
+                BULK_RETRY_SECONDS,
+            )
+            with self._lock:
+                self._no_bulk[group] = time.monotonic() + BULK_RETRY_SECONDS
+                self._stats["bulk_unavailable"] += 1
+        elif response.status_code not in {HTTP_BAD_REQUEST, HTTP_UNPROCESSABLE_ENTITY}:
+            return [(response.status_code, response_json)] * len(items)
+        # Rejected (or unreadable) as a whole: let each evaluation get its own answer.
+        with self._lock:
+            self._stats["fallbacks"] += 1
+        return [self._single(url_endpoints, app_token, item) for item in items]
+
+    @staticmethod
+    def _single(url_endpoints, app_token, evaluation) -> tuple:
+        response = data_request(
+            "POST",
+            f"{url_endpoints}/access/v1/evaluation",
+            app_token,
+            json=evaluation,
+            idempotent=True,
+        )
+        return response.status_code, parse_json(response)
+
+    def stats(self):
+        with self._lock:
+            bulk = self._stats["bulk_calls"]
+            evaluations = self._stats["evaluations"]
+            return {
+                **self._stats,
+                "avg_batch_size": round(self._stats["batched_evaluations"] / bulk, 2) if bulk else 0.0,
+                "cache_hit_rate": round(self._stats["cache_hits"] / evaluations, 3) if evaluations else 0.0,
+                "cached_decisions": len(self._decisions),
+            }
+
+
+_gateway = EvaluationGateway()
+
+
+def evaluate(url_endpoints, app_token, evaluation):
+    """Evaluate one AuthZEN request through the process-wide gateway."""
+    return _gateway.evaluate(url_endpoints, app_token, evaluation)
+
+
+def gateway_stats():
+    """Return the process-wide gateway's batching and decision-cache counters."""
+    return _gateway.stats()
@@ -3,7 +3,7 @@ import json
 import logging
 import os
 
-import requests
+from api._platform import data_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -103,27 +103,12 @@ def execution():
     logger.info("Executing ContX IQ at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "X-IK-ClientKey": app_token,
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = data_request("POST", api_url, app_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     return render_template("ciq_execute/result.html", response_json=response_json, status_code=response.status_code)
@@ -5,7 +5,7 @@ import os
 import re
 from pathlib import Path
 
-import requests
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -184,28 +184,13 @@ def create_ciq_knowledge_query():
     logger.info("Creating ContX IQ knowledge query at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     # Extract and save ciq knowledge query ID if the request was successful
     ciq_knowledge_query_id_saved = False
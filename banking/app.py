@@ -3,6 +3,8 @@ import logging
 import os
 
 # Register apis
+from api._authzen_gateway import gateway_stats
+from api._platform import platform_metrics
 from api.app_agent import api_app_agent
 from api.application import api_application
 from api.authorization_policy import api_authorization_policy
@@ -84,5 +86,17 @@ def index():
     return render_template("index.html")
 
 
+@app.get("/platform/metrics")
+def platform_metrics_view():
+    """Per-endpoint call counts, statuses and latency of this process's platform calls."""
+    return platform_metrics()
+
+
+@app.get("/authzen/gateway/stats")
+def authzen_gateway_stats_view():
+    """Batch sizes and decision-cache hit rate of this process's AuthZEN evaluations."""
+    return gateway_stats()
+
+
 if __name__ == "__main__":
     app.run(debug=False)
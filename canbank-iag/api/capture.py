@@ -4,8 +4,8 @@ import json
 import logging
 import os
 
-import requests
 from api import _dataset
+from api._platform import data_request
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -88,15 +88,7 @@ def create_capture():
 
         logger.info("Processing chunk %s with %s nodes", index, len(chunk))
 
-        response = requests.put(
-            api_url,
-            headers={
-                "Content-Type": "application/json",
-                "X-IK-ClientKey": app_token,
-            },
-            json=chunk_data,
-            timeout=30,
-        )
+        response = data_request("PUT", api_url, app_token, json=chunk_data)
 
         try:
             response_json = response.json()
@@ -3,7 +3,7 @@ import json
 import logging
 import os
 
-import requests
+from api._platform import data_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -223,13 +223,9 @@ def execution():
     logger.info("Executing ContX IQ at: %s (slot=%s)", api_url, slot)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-IK-ClientKey": app_token,
-    }
+    user_token = None
     if slot not in _APP_SUBJECT_SLOTS:
         user_token = os.getenv("USER_TOKEN", "")
-        headers["Authorization"] = f"Bearer {user_token}"
         # Log a fingerprint (length + first/last 4 chars) so we can confirm the
         # process is shipping the token currently in .env — without leaking it.
         fingerprint = (
@@ -237,24 +233,12 @@ def execution():
         )
         logger.info("Authorization header USER_TOKEN: %s", fingerprint)
 
-    response = requests.post(
-        api_url,
-        headers=headers,
-        json=json_data,
-        timeout=30,
-    )
+    response = data_request("POST", api_url, app_token, user_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     return render_template("ciq_execute/result.html", response_json=response_json, status_code=response.status_code)
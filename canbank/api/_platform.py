@@ -0,0 +1,225 @@
+# Copyright (c) 2026 IndyKite
+"""Pooled HTTP client for the IndyKite platform APIs.
+
+Every blueprint talks to the platform through here instead of building its own
+requests.post: one keep-alive session per process (so repeated calls reuse
+the TCP/TLS connection), the two auth schemes in one place - the Config API
+with the service-account Bearer token, the data plane (capture, AuthZEN,
+ContX IQ) with the app agent's X-IK-ClientKey plus an optional user Bearer
+token - and one retry policy:
+
+ - 429, and 503 with a Retry-After, are retried for any method: the platform
+   rejected the call without acting on it;
+ - other transient statuses (408/5xx) and timeouts / connection errors are
+   retried only for idempotent calls (GET/PUT/DELETE, or idempotent=True for
+   read-only POSTs), so a create can never be sent twice;
+ - the delay honours Retry-After (seconds or HTTP date, capped) and otherwise
+   backs off exponentially.
+
+Each call is timed and counted per endpoint (ids in Config API paths are
+folded into "{id}"); platform_metrics() returns the latency/status summary.
+
+The API is blocking; under gunicorn's gevent worker (gunicorn.conf.py) the
+sockets are monkey-patched, so a call waiting on the platform yields to the
+other requests instead of holding an OS thread.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
+HTTP_REQUEST_TIMEOUT = 408
+HTTP_TOO_MANY_REQUESTS = 429
+HTTP_SERVER_ERROR = 500
+HTTP_SERVICE_UNAVAILABLE = 503
+
+DEFAULT_TIMEOUT = 30  # seconds per attempt
+RETRY_ATTEMPTS = 3  # total attempts (initial + retries)
+RETRY_BACKOFF_SECONDS = 1.0  # doubled each retry
+MAX_RETRY_AFTER_SECONDS = 60
+# Connections kept alive per host: enough for the capture worker pools, or for
+# every in-flight request under the gevent worker (gunicorn.conf.py sets it).
+POOL_MAXSIZE = int(os.getenv("PLATFORM_POOL_MAXSIZE", "32"))
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Config API paths carry the resource id (or name) after the collection.
+_CONFIG_ID_SEGMENT = 3
+
+_session = {"pid": None, "session": None}
+_session_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _get_session():
+    """Return this process's pooled session (a fresh one after a fork)."""
+    with _session_lock:
+        if _session["pid"] != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session["session"] = session
+            _session["pid"] = os.getpid()
+        return _session["session"]
+
+
+def _endpoint(method, url):
+    parts = urlsplit(url).path.split("/")
+    # /configs/v1/<resource>/<id>/...: fold the id so one endpoint is one row
+    if len(parts) > _CONFIG_ID_SEGMENT + 1 and parts[1] == "configs":
+        parts[_CONFIG_ID_SEGMENT + 1] = "{id}"
+    return f"{method} {'/'.join(parts)}"
+
+
+def _record(endpoint, status, seconds, retried):
+    with _metrics_lock:
+        entry = _metrics.setdefault(
+            endpoint,
+            {"count": 0, "errors": 0, "retries": 0, "statuses": {}, "latency_ms_total": 0.0, "latency_ms_max": 0.0},
+        )
+        entry["count"] += 1
+        entry["retries"] += retried
+        key = str(status) if status else "error"
+        entry["statuses"][key] = entry["statuses"].get(key, 0) + 1
+        if not status or status >= HTTP_SERVER_ERROR:
+            entry["errors"] += 1
+        millis = seconds * 1000
+        entry["latency_ms_total"] += millis
+        entry["latency_ms_max"] = max(entry["latency_ms_max"], millis)
+
+
+def platform_metrics():
+    """Return per-endpoint call counts, status counts, retries and latency (avg/max ms)."""
+    with _metrics_lock:
+        return {
+            endpoint: {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "retries": entry["retries"],
+                "statuses": dict(entry["statuses"]),
+                "latency_ms_avg": round(entry["latency_ms_total"] / entry["count"], 1),
+                "latency_ms_max": round(entry["latency_ms_max"], 1),
+            }
+            for endpoint, entry in sorted(_metrics.items())
+        }
+
+
+def _retry_after_seconds(response):
+    """Parse Retry-After (delta-seconds or HTTP date); None when absent or unparsable."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+def _should_retry(response, idempotent):
+    status = response.status_code
+    if status == HTTP_TOO_MANY_REQUESTS:
+        return True
+    if status == HTTP_SERVICE_UNAVAILABLE and response.headers.get("Retry-After"):
+        return True
+    return idempotent and (status == HTTP_REQUEST_TIMEOUT or status >= HTTP_SERVER_ERROR)
+
+
+def _pause(seconds, reason):
+    time.sleep(seconds)
+    logger.debug("Retrying after %s (waited %.1fs)", reason, seconds)
+
+
+def platform_request(  # noqa: PLR0913 - every option is keyword-only
+    method,
+    url,
+    *,
+    headers,
+    json=None,
+    params=None,
+    timeout=DEFAULT_TIMEOUT,
+    attempts=RETRY_ATTEMPTS,
+    backoff=RETRY_BACKOFF_SECONDS,
+    idempotent=None,
+):
+    """Send one platform call over the pooled session, retrying per the module policy.
+
+    Returns the final response (whatever its status); raises the last
+    requests.RequestException when every attempt failed without a response.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in _IDEMPOTENT_METHODS
+    endpoint = _endpoint(method, url)
+    session = _get_session()
+    start = time.perf_counter()
+    for attempt in range(1, attempts + 1):
+        last = attempt >= attempts
+        try:
+            response = session.request(method, url, headers=headers, json=json, params=params, timeout=timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as exc:
+            if last or not idempotent:
+                _record(endpoint, 0, time.perf_counter() - start, attempt - 1)
+                raise
+            logger.warning("%s attempt %s/%s failed: %s", endpoint, attempt, attempts, exc)
+            _pause(backoff * (2 ** (attempt - 1)), type(exc).__name__)
+            continue
+        if last or not _should_retry(response, idempotent):
+            elapsed = time.perf_counter() - start
+            _record(endpoint, response.status_code, elapsed, attempt - 1)
+            logger.debug("%s -> %s in %.0f ms", endpoint, response.status_code, elapsed * 1000)
+            return response
+        delay = _retry_after_seconds(response)
+        logger.warning("%s attempt %s/%s got retryable status %s", endpoint, attempt, attempts, response.status_code)
+        _pause(backoff * (2 ** (attempt - 1)) if delay is None else delay, f"status {response.status_code}")
+    msg = "attempts must be at least 1"
+    raise ValueError(msg)
+
+
+def config_headers(sa_token):
+    """Headers for the Config API (service-account Bearer token)."""
+    return {"Content-Type": "application/json", "Authorization": f"Bearer {sa_token}"}
+
+
+def data_headers(app_token, user_token=None):
+    """Headers for the data plane (app agent client key, plus a user Bearer token when given)."""
+    headers = {"Content-Type": "application/json", "X-IK-ClientKey": app_token}
+    if user_token is not None:
+        headers["Authorization"] = f"Bearer {user_token}"
+    return headers
+
+
+def config_request(method, url, sa_token, **kwargs: object):
+    """platform_request against the Config API."""
+    return platform_request(method, url, headers=config_headers(sa_token), **kwargs)
+
+
+def data_request(method, url, app_token, user_token=None, **kwargs: object):
+    """platform_request against the data plane (capture, AuthZEN, ContX IQ)."""
+    return platform_request(method, url, headers=data_headers(app_token, user_token), **kwargs)
+
+
+def parse_json(response):
+    """Return the response body as JSON, or the error dict the result pages render."""
+    try:
+        return response.json()
+    except ValueError:
+        return {
+            "message": "Invalid JSON response",
+            "status": response.status_code,
+            "response_text": response.text[:500] if response.text else "No response body",
+        }
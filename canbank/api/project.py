@@ -5,7 +5,7 @@ import os
 import re
 from pathlib import Path
 
-import requests
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -166,28 +166,13 @@ def create_project():
     logger.info("Creating project at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     # Extract and save project ID if the request was successful
     project_id_saved = False
@@ -247,13 +232,7 @@ def delete_project():
 
     logger.info("Deleting project at: %s", api_url)
 
-    response = requests.delete(
-        api_url,
-        headers={
-            "Authorization": f"Bearer {sa_token}",
-        },
-        timeout=30,
-    )
+    response = config_request("DELETE", api_url, sa_token)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
@@ -5,7 +5,7 @@ import logging
 import os
 from pathlib import Path
 
-import requests
+from api._platform import data_request
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -91,15 +91,7 @@ def create_relationships():
         logger.info("Processing chunk %s with %s relationships", index, len(chunk))
         logger.debug("Chunk %s payload: %s", index, json.dumps(chunk_data, indent=2))
 
-        response = requests.post(
-            api_url,
-            headers={
-                "Content-Type": "application/json",
-                "X-IK-ClientKey": app_token,
-            },
-            json=chunk_data,
-            timeout=30,
-        )
+        response = data_request("POST", api_url, app_token, json=chunk_data)
 
         try:
             response_json = response.json()
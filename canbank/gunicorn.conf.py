@@ -0,0 +1,37 @@
+# Copyright (c) 2026 IndyKite
+"""Gunicorn settings for serving the app to many concurrent users.
+
+`flask run` (and gunicorn's sync/gthread workers) pin one OS thread to every
+request for as long as it waits on the platform, so a few concurrent users can
+exhaust the pool on requests that are only waiting on the network. The default
+worker class here is gevent: the worker monkey-patches sockets before the app
+is imported, so the platform client in api/_platform.py yields while it waits
+and one worker holds WORKER_CONNECTIONS requests, and their upstream calls, in
+flight at once.
+
+    pipenv install                          # gunicorn and gevent are in the Pipfile
+    gunicorn app:app                        # cooperative (gevent) worker
+    WORKER_CLASS=gthread gunicorn app:app   # thread per request, for comparison
+
+../music/bench_serving.py compares the two under load.
+"""
+
+import os
+
+bind = os.getenv("BIND", "127.0.0.1:5000")
+worker_class = os.getenv("WORKER_CLASS", "gevent")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+# gevent: concurrent requests per worker. gthread: threads per worker.
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "2000"))
+threads = int(os.getenv("THREADS", "8"))
+# A heartbeat timeout, not a request limit: gevent and gthread workers keep
+# beating while their requests (a streamed capture included) wait on I/O.
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+accesslog = os.getenv("ACCESS_LOG", "-") or None  # "" disables the access log
+
+# Let every in-flight request keep its upstream connection alive in the pool.
+os.environ.setdefault(
+    "PLATFORM_POOL_MAXSIZE",
+    str(worker_connections if worker_class == "gevent" else threads),
+)
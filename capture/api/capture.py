@@ -6,6 +6,7 @@ from pathlib import Path
 
 import ijson
 import requests
+from api._platform import data_request
 from flask import flash, redirect, render_template, request, url_for
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -78,9 +79,10 @@ def _make_process_chunk(api_url, app_token):
 
     def process_chunk(index, chunk):
         try:
-            response = requests.put(
+            response = data_request(
+                "PUT",
                 api_url,
-                headers={"Content-Type": "application/json", "X-IK-ClientKey": app_token},
+                app_token,
                 json={"nodes": chunk},
                 timeout=REQUEST_TIMEOUT,
             )
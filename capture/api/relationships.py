@@ -6,6 +6,7 @@ from pathlib import Path
 
 import ijson
 import requests
+from api._platform import data_request
 from flask import flash, redirect, render_template, request, url_for
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -78,11 +79,13 @@ def _make_process_chunk(api_url, app_token):
 
     def process_chunk(index, chunk):
         try:
-            response = requests.post(
+            response = data_request(
+                "POST",
                 api_url,
-                headers={"Content-Type": "application/json", "X-IK-ClientKey": app_token},
+                app_token,
                 json={"relationships": chunk},
                 timeout=REQUEST_TIMEOUT,
+                idempotent=True,
             )
         except requests.exceptions.RequestException as e:
             logger.exception("Chunk %s failed", index)
@@ -2,6 +2,7 @@
 import os
 
 # Register apis
+from api._platform import platform_metrics
 from api.capture import api_capture
 from api.relationships import api_relationships
 from dotenv import load_dotenv
@@ -32,5 +33,11 @@ def index():
     return render_template("index.html")
 
 
+@app.get("/platform/metrics")
+def platform_metrics_view():
+    """Per-endpoint call counts, statuses and latency of this process's platform calls."""
+    return platform_metrics()
+
+
 if __name__ == "__main__":
     app.run(debug=False)
@@ -6,7 +6,7 @@ import re
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
-import requests
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -114,28 +114,13 @@ def create_app_agent():  # noqa: C901, PLR0912, PLR0915
     logger.info("Creating application agent at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     # Extract and save app agent ID if the request was successful
     app_agent_id_saved = False
@@ -172,15 +157,7 @@ def create_app_agent():  # noqa: C901, PLR0912, PLR0915
                 logger.info("Creating credentials at: %s", credentials_url)
                 logger.debug("Credentials payload: %s", json.dumps(credentials_data, indent=2))
 
-                creds_response = requests.post(
-                    credentials_url,
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {sa_token}",
-                    },
-                    json=credentials_data,
-                    timeout=30,
-                )
+                creds_response = config_request("POST", credentials_url, sa_token, json=credentials_data)
 
                 logger.info("Credentials response status: %s", creds_response.status_code)
                 logger.debug("Credentials response: %s", creds_response.text)
@@ -3,11 +3,11 @@ import concurrent.futures
 import json
 import logging
 import os
-import time
 from pathlib import Path
 
 import ijson
 import requests
+from api._platform import data_request, parse_json
 from dotenv import load_dotenv
 from flask import Response, render_template, request, stream_with_context
 from flask_openapi3 import APIBlueprint, Tag
@@ -37,10 +37,6 @@ RETRY_BACKOFF = 2.0  # seconds, doubled each retry
 # HTTP status constants (avoid magic numbers in comparisons).
 HTTP_OK = 200
 HTTP_BAD_REQUEST = 400
-HTTP_REQUEST_TIMEOUT = 408
-HTTP_TOO_MANY_REQUESTS = 429
-HTTP_SERVER_ERROR_MIN = 500
-HTTP_SERVER_ERROR_MAX = 600
 HTTP_CLIENT_TIMEOUT = 599  # local marker for an exhausted-retries timeout
 
 _APP_AGENT_HELP = (
@@ -103,61 +99,36 @@ def _iter_file_node_chunks(file_path, chunk_size):
             yield chunk
 
 
-def _is_retryable_status(status: int) -> bool:
-    if status in {HTTP_REQUEST_TIMEOUT, HTTP_TOO_MANY_REQUESTS}:
-        return True
-    return HTTP_SERVER_ERROR_MIN <= status < HTTP_SERVER_ERROR_MAX
-
-
 def _make_process_chunk(api_url: str, app_token: str):
     """Build a chunk processor that PUTs a node chunk, retrying on transient errors."""
 
     def process_chunk(index, chunk):
-        last_exception = None
-        for attempt in range(1, RETRY_ATTEMPTS + 1):
-            logger.info("Processing chunk %s with %s nodes (attempt %s/%s)", index, len(chunk), attempt, RETRY_ATTEMPTS)
-            try:
-                response = requests.put(
-                    api_url,
-                    headers={"Content-Type": "application/json", "X-IK-ClientKey": app_token},
-                    json={"nodes": chunk},
-                    timeout=REQUEST_TIMEOUT,
-                )
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                last_exception = e
-                logger.warning("Chunk %s attempt %s failed: %s", index, attempt, e)
-                if attempt < RETRY_ATTEMPTS:
-                    time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
-                    continue
-                return {
-                    "chunk_index": index,
-                    "status_code": HTTP_CLIENT_TIMEOUT,
-                    "response_json": {"message": str(e)},
-                    "response_text": f"After {RETRY_ATTEMPTS} attempts: {e}",
-                }
-
-            if _is_retryable_status(response.status_code) and attempt < RETRY_ATTEMPTS:
-                logger.warning("Chunk %s attempt %s got retryable status %s", index, attempt, response.status_code)
-                time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
-                continue
-
-            try:
-                response_json = response.json()
-            except ValueError:
-                response_json = {"message": "Invalid JSON response", "status": response.status_code}
-            logger.info("Chunk %s response status: %s", index, response.status_code)
+        logger.info("Processing chunk %s with %s nodes", index, len(chunk))
+        try:
+            response = data_request(
+                "PUT",
+                api_url,
+                app_token,
+                json={"nodes": chunk},
+                timeout=REQUEST_TIMEOUT,
+                attempts=RETRY_ATTEMPTS,
+                backoff=RETRY_BACKOFF,
+            )
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            logger.warning("Chunk %s failed: %s", index, e)
             return {
                 "chunk_index": index,
-                "status_code": response.status_code,
-                "response_json": response_json,
-                "response_text": response.text[:500] if response.text else "",
+                "status_code": HTTP_CLIENT_TIMEOUT,
+                "response_json": {"message": str(e)},
+                "response_text": f"After {RETRY_ATTEMPTS} attempts: {e}",
             }
 
+        logger.info("Chunk %s response status: %s", index, response.status_code)
         return {
             "chunk_index": index,
-            "status_code": HTTP_CLIENT_TIMEOUT,
-            "response_json": {"message": str(last_exception or "Unknown error")},
-            "response_text": str(last_exception or "Unknown error"),
+            "status_code": response.status_code,
+            "response_json": parse_json(response),
+            "response_text": response.text[:500] if response.text else "",
         }
 
     return process_chunk
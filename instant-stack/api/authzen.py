@@ -3,7 +3,7 @@ import json
 import logging
 import os
 
-import requests
+from api._authzen_gateway import evaluate
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -67,27 +67,9 @@ def evaluate_authzen():
     logger.info("Evaluating authorization at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "X-IK-ClientKey": app_token,
-        },
-        json=json_data,
-        timeout=30,
-    )
+    # Batched with concurrent checks into bulk /evaluations calls; decisions cached briefly.
+    status_code, response_json = evaluate(url_endpoints, app_token, json_data)
 
-    logger.info("Response status: %s", response.status_code)
-    logger.debug("Response headers: %s", response.headers)
-    logger.debug("Response text: %s", response.text)
+    logger.info("Response status: %s", status_code)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
-
-    return render_template("authzen/result.html", response_json=response_json, status_code=response.status_code)
+    return render_template("authzen/result.html", response_json=response_json, status_code=status_code)
@@ -5,6 +5,7 @@ import os
 import time
 
 import requests
+from api._platform import data_request
 from flask import jsonify, render_template
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -57,11 +58,8 @@ def _fetch_schema():
 
     api_url = f"{url_endpoints}/data-schema/v1/"
     try:
-        response = requests.get(
-            api_url,
-            headers={"X-IK-ClientKey": app_token},
-            timeout=SCHEMA_TIMEOUT_SECONDS,
-        )
+        # Probed on page render: fail fast instead of retrying.
+        response = data_request("GET", api_url, app_token, timeout=SCHEMA_TIMEOUT_SECONDS, attempts=1)
     except requests.RequestException as e:
         logger.warning("Data schema request failed: %s", e)
         return None, None
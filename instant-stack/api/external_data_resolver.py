@@ -5,8 +5,8 @@ import os
 import re
 from pathlib import Path
 
-import requests
 from api import _dataset
+from api._platform import config_request, parse_json
 from flask import abort, render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -79,6 +79,25 @@ api_external_data_resolver = APIBlueprint(
 _RESOLVER_DEFS = _dataset.RESOLVERS
 
 
+# Third-party resolver hosts the optional resolver-proxy app (../resolver-proxy)
+# can front, mapped to its upstream names. With RESOLVER_PROXY_URL set, the
+# form defaults point these resolvers at the proxy, which caches the responses.
+_PROXY_UPSTREAMS = {
+    "https://api.open-meteo.com/": "open-meteo/",
+    "https://query1.finance.yahoo.com/": "yahoo/",
+}
+
+
+def _proxied_url(url: str) -> str:
+    """Rewrite a known third-party resolver url to go through RESOLVER_PROXY_URL, when that is set."""
+    proxy = os.getenv("RESOLVER_PROXY_URL", "").rstrip("/")
+    if proxy:
+        for prefix, name in _PROXY_UPSTREAMS.items():
+            if url.startswith(prefix):
+                return f"{proxy}/{name}{url[len(prefix) :]}"
+    return url
+
+
 def _build_default(spec: dict) -> dict:
     # Tolerate datasets whose resolver entries omit the optional fields.
     return {
@@ -87,7 +106,7 @@ def _build_default(spec: dict) -> dict:
         "name": spec.get("name", ""),
         "display_name": spec.get("display_name", ""),
         "description": spec.get("description", ""),
-        "url": spec.get("url", ""),
+        "url": _proxied_url(spec.get("url", "")),
         "method": spec.get("method", "GET"),
         "headers": json.dumps(spec.get("headers", {})),
         "request_payload": spec.get("request_payload", ""),
@@ -149,28 +168,13 @@ def create_external_data_resolver():
     logger.info("Creating external data resolver at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     resolver_id_saved = False
     resolver_id = None
@@ -36,6 +36,7 @@ from pathlib import Path
 
 import requests
 from api import _dataset
+from api._platform import config_request
 from api.capture import _load_default_nodes
 from api.ciq_knowledge_query import _QUERY_DEFS
 from api.ciq_knowledge_query import _default_for_slot as _query_default_for_slot
@@ -438,11 +439,7 @@ def _capture_iter(client, step):
 def _read_ikg_status(url_endpoints, sa_token, project_id):
     """Read the project's ikg_status (PENDING/ACTIVE/FAILED/...). Returns (status, error_message)."""
     try:
-        response = requests.get(
-            f"{url_endpoints}/configs/v1/projects/{project_id}",
-            headers={"Authorization": f"Bearer {sa_token}"},
-            timeout=30,
-        )
+        response = config_request("GET", f"{url_endpoints}/configs/v1/projects/{project_id}", sa_token)
     except requests.RequestException as e:
         return "", str(e)[:100]
     if response.status_code >= HTTP_BAD_REQUEST:
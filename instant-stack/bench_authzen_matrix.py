@@ -0,0 +1,302 @@
+# Copyright (c) 2026 IndyKite
+"""Evaluate a dataset's full AuthZEN decision matrix through the bulk endpoint.
+
+For every KBAC policy in data/<dataset>/manifest.json, every node of the
+policy's subject type is paired with every node of its resource type, for
+each of the policy's actions - e.g. every Person against every Document in
+the insurance dataset. The nodes file is streamed, keeping only the ids of
+the types the policies mention. The evaluations are sent in bulk
+/access/v1/evaluations calls of --batch-size, --concurrency calls in flight,
+and the run reports decisions per second, call latency percentiles and the
+allow/deny split per subject/action/resource group:
+
+    python bench_authzen_matrix.py --dataset insurance --concurrency 8
+    python bench_authzen_matrix.py --dataset canbank --stub --limit 5000
+
+Against the platform it reads URL_ENDPOINTS and APP_TOKEN from .env and the
+policies must already be created there (only reads are sent). --stub starts a
+local stand-in that answers every evaluation after a fixed delay, allowing a
+deterministic ~--stub-allow share of them.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from pathlib import Path
+
+import requests
+from api import _dataset
+from api._platform import data_request, parse_json
+from dotenv import load_dotenv
+
+APP_DIR = Path(__file__).parent
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
+READ_CHUNK = 64 * 1024
+PERCENTILES = (0.50, 0.90, 0.95, 0.99)
+# Whitespace and commas between the array's elements.
+_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def iter_nodes(path):
+    """Yield the objects of the file's top-level "nodes" array one at a time, without loading the file."""
+    decoder = json.JSONDecoder()
+    with Path(path).open() as f:
+        buffer = ""
+        # Skip to the array's opening bracket.
+        while True:
+            chunk = f.read(READ_CHUNK)
+            buffer += chunk
+            start = buffer.find("[", buffer.find('"nodes"') + 1) if '"nodes"' in buffer else -1
+            if start >= 0:
+                break
+            if not chunk:
+                return
+        # Decode in place from pos; the buffer is only cut when a chunk has to be appended.
+        pos = start + 1
+        while True:
+            pos = _SEPARATOR.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                node, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    raise
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield node
+
+
+def load_policies(dataset):
+    """Return the dataset's KBAC policies as {name, subject_type, resource_type, actions}."""
+    with (APP_DIR / "data" / dataset / "manifest.json").open() as f:
+        raw = json.load(f).get("kbac", [])
+    policies = []
+    for entry in raw if isinstance(raw, list) else [raw]:
+        body = entry.get("policy", {})
+        body = json.loads(body) if isinstance(body, str) else body
+        policies.append(
+            {
+                "name": entry.get("name", ""),
+                "subject_type": body.get("subject", {}).get("type"),
+                "resource_type": body.get("resource", {}).get("type"),
+                "actions": body.get("actions", []),
+            },
+        )
+    return [p for p in policies if p["subject_type"] and p["resource_type"] and p["actions"]]
+
+
+def ids_by_type(dataset, types):
+    """Stream the dataset's nodes file and collect the external ids of the wanted node types."""
+    found = {node_type: {} for node_type in types}
+    for node in iter_nodes(APP_DIR / "data" / dataset / "nodes.json"):
+        if node.get("type") in found and node.get("external_id"):
+            found[node["type"]][node["external_id"]] = None
+    # dict keys: file order, a repeated id kept once.
+    return {node_type: list(ids) for node_type, ids in found.items()}
+
+
+def iter_matrix(policies, ids):
+    """Yield (group, evaluation) for every subject x resource x action of every policy, once each.
+
+    The group is "<subject type> <action> <resource type>": policies covering
+    the same cells (two ways to CAN_VIEW a Document) share one group, since the
+    platform returns one decision per cell whichever policy grants it. Cells
+    are deduplicated up front, per type pair and action, so nothing grows with
+    the matrix while it is streamed.
+    """
+    actions = {}
+    for policy in policies:
+        pair = actions.setdefault((policy["subject_type"], policy["resource_type"]), {})
+        pair.update(dict.fromkeys(policy["actions"]))
+    for (subject_type, resource_type), pair_actions in actions.items():
+        for subject_id in ids[subject_type]:
+            for resource_id in ids[resource_type]:
+                for action in pair_actions:
+                    yield (
+                        f"{subject_type} {action} {resource_type}",
+                        {
+                            "subject": {"type": subject_type, "id": subject_id},
+                            "resource": {"type": resource_type, "id": resource_id},
+                            "action": {"name": action},
+                        },
+                    )
+
+
+def _batches(pairs, size):
+    iterator = iter(pairs)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _StubPlatform(BaseHTTPRequestHandler):
+    """Stand-in bulk evaluations endpoint with deterministic decisions."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    allow = 0.3
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        decisions = []
+        for evaluation in body.get("evaluations", []):
+            digest = hashlib.sha256(json.dumps(evaluation, sort_keys=True).encode()).digest()
+            decisions.append({"decision": digest[0] < self.allow * 256})
+        out = json.dumps({"evaluations": decisions}).encode()
+        self.send_response(HTTP_OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *_args: object):
+        pass
+
+
+def _start_stub(latency, allow):
+    handler = type("StubPlatform", (_StubPlatform,), {"latency": latency, "allow": allow})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _evaluate_batch(url_endpoints, app_token, batch, timeout):
+    """Send one bulk call; return (seconds, status, decisions or None)."""
+    start = time.perf_counter()
+    try:
+        response = data_request(
+            "POST",
+            f"{url_endpoints}/access/v1/evaluations",
+            app_token,
+            json={"evaluations": [evaluation for _name, evaluation in batch]},
+            timeout=timeout,
+            idempotent=True,
+        )
+    except requests.RequestException:
+        return time.perf_counter() - start, "error", None
+    body = parse_json(response)
+    decisions = body.get("evaluations") if isinstance(body, dict) else None
+    if not HTTP_OK <= response.status_code < HTTP_MULTIPLE_CHOICES or not isinstance(decisions, list):
+        decisions = None
+    return time.perf_counter() - start, response.status_code, decisions
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run(args, url_endpoints, app_token):
+    """Evaluate the matrix; return the summary dict."""
+    policies = load_policies(args.dataset)
+    ids = ids_by_type(args.dataset, {p["subject_type"] for p in policies} | {p["resource_type"] for p in policies})
+    pairs = islice(iter_matrix(policies, ids), args.limit) if args.limit else iter_matrix(policies, ids)
+    per_group = {
+        f"{p['subject_type']} {action} {p['resource_type']}": {"allow": 0, "deny": 0, "failed": 0}
+        for p in policies
+        for action in p["actions"]
+    }
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        in_flight = {}
+        batches = _batches(pairs, args.batch_size)
+        # Keep at most --concurrency calls queued, so the matrix is generated as it is consumed.
+        for batch in islice(batches, args.concurrency):
+            in_flight[executor.submit(_evaluate_batch, url_endpoints, app_token, batch, args.timeout)] = batch
+        while in_flight:
+            future = next(as_completed(in_flight))
+            batch = in_flight.pop(future)
+            seconds, status, decisions = future.result()
+            latencies.append(seconds)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            for index, (group, _evaluation) in enumerate(batch):
+                if decisions is None or index >= len(decisions):
+                    per_group[group]["failed"] += 1
+                else:
+                    per_group[group]["allow" if decisions[index].get("decision") else "deny"] += 1
+            for batch in islice(batches, 1):
+                in_flight[executor.submit(_evaluate_batch, url_endpoints, app_token, batch, args.timeout)] = batch
+    wall = time.perf_counter() - started
+    latencies.sort()
+    decided = sum(c["allow"] + c["deny"] for c in per_group.values())
+    summary = {
+        "dataset": args.dataset,
+        "subjects_resources": {node_type: len(found) for node_type, found in ids.items()},
+        "evaluations": decided + sum(c["failed"] for c in per_group.values()),
+        "decisions": decided,
+        "wall_s": round(wall, 2),
+        "decisions_per_s": round(decided / wall, 1) if wall else 0.0,
+        "bulk_calls": len(latencies),
+        "statuses": statuses,
+        "call_mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "groups": per_group,
+    }
+    for fraction in PERCENTILES:
+        summary[f"call_p{round(fraction * 100)}_ms"] = round(_percentile(latencies, fraction) * 1000, 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--dataset", default=_dataset.DATASET, choices=_dataset.available_datasets())
+    parser.add_argument("--batch-size", type=int, default=50, help="evaluations per bulk call")
+    parser.add_argument("--concurrency", type=int, default=4, help="bulk calls in flight")
+    parser.add_argument("--limit", type=int, default=0, help="evaluate only the first N matrix cells (0: all)")
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout per bulk call (seconds)")
+    parser.add_argument("--stub", action="store_true", help="run against a local stand-in platform")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="stand-in seconds per bulk call")
+    parser.add_argument("--stub-allow", type=float, default=0.3, help="stand-in share of allowed decisions")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+    args.batch_size = max(1, args.batch_size)
+    args.concurrency = max(1, args.concurrency)
+
+    stub = None
+    if args.stub:
+        stub = _start_stub(args.stub_latency, args.stub_allow)
+        url_endpoints, app_token = f"http://127.0.0.1:{stub.server_address[1]}", "stub-app-token"
+    else:
+        load_dotenv(APP_DIR / ".env")
+        url_endpoints, app_token = os.getenv("URL_ENDPOINTS"), os.getenv("APP_TOKEN")
+        if not url_endpoints or not app_token:
+            msg = "URL_ENDPOINTS and APP_TOKEN must be set in .env (or run with --stub)"
+            raise SystemExit(msg)
+    try:
+        summary = run(args, url_endpoints, app_token)
+    finally:
+        if stub is not None:
+            stub.shutdown()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))  # noqa: T201
+        return
+    print(  # noqa: T201
+        f"{summary['dataset']}: {summary['decisions']} decisions ({summary['evaluations']} evaluated) "
+        f"in {summary['wall_s']}s = {summary['decisions_per_s']}/s over {summary['bulk_calls']} bulk calls",
+    )
+    latency = "  ".join(f"p{round(f * 100)} {summary[f'call_p{round(f * 100)}_ms']}ms" for f in PERCENTILES)
+    print(f"bulk call latency: mean {summary['call_mean_ms']}ms  {latency}")  # noqa: T201
+    print(f"{'subject action resource':>36}  {'allow':>7}  {'deny':>7}  {'failed':>7}")  # noqa: T201
+    for group, counts in summary["groups"].items():
+        print(f"{group:>36}  {counts['allow']:>7}  {counts['deny']:>7}  {counts['failed']:>7}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Copyright (c) 2026 IndyKite
+"""Shadow-test KBAC policies locally, without creating them on the platform.
+
+Loads data/<dataset>/nodes.json and relationships.json into an in-memory
+graph (api/_kbac_local.py) and evaluates the manifest's KBAC policies there:
+
+    # every subject x resource cell of every policy, with allow/deny counts
+    python kbac_shadow.py sweep --dataset insurance
+
+    # which decisions an edited policy would change before publishing it
+    python kbac_shadow.py diff --dataset insurance --against my-policy.json
+
+    # answer AuthZEN bodies (single or with an "evaluations" list)
+    python kbac_shadow.py evaluate requests.json
+
+--against takes a manifest (its KBAC list replaces the current one), a
+list of KBAC entries or a single entry ({name, policy, status}); entries
+replace the current policies of the same name and new names are added.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from api import _dataset
+from api._kbac_local import LocalEvaluator, LocalGraph, diff, sweep
+
+APP_DIR = Path(__file__).parent
+
+
+def load_policies(dataset):
+    """Return the dataset manifest's KBAC entries."""
+    with (APP_DIR / "data" / dataset / "manifest.json").open() as f:
+        raw = json.load(f).get("kbac", [])
+    return raw if isinstance(raw, list) else [raw]
+
+
+def load_graph(dataset):
+    """Build the in-memory graph from the dataset's nodes and relationships files."""
+    with (APP_DIR / "data" / dataset / "nodes.json").open() as f:
+        nodes = json.load(f).get("nodes", [])
+    with (APP_DIR / "data" / dataset / "relationships.json").open() as f:
+        relationships = json.load(f).get("relationships", [])
+    return LocalGraph.from_records(nodes, relationships)
+
+
+def candidate_policies(current, path):
+    """Return the policy set to compare against: `current` updated from the --against file."""
+    with Path(path).open() as f:
+        raw = json.load(f)
+    if isinstance(raw, dict) and ("kbac" in raw or "kbacs" in raw):
+        entries = raw.get("kbac", raw.get("kbacs"))
+        return entries if isinstance(entries, list) else [entries]
+    entries = raw if isinstance(raw, list) else [raw]
+    by_name = {entry.get("name", ""): entry for entry in current}
+    for entry in entries:
+        by_name[entry.get("name", "")] = entry
+    return list(by_name.values())
+
+
+def _report_unsupported(evaluator, label=""):
+    for name, reason in evaluator.unsupported.items():
+        print(f"{label}skipped {name}: {reason}", file=sys.stderr)  # noqa: T201
+
+
+def run_sweep(evaluator):
+    """Evaluate every cell of every policy group; return the summary dict."""
+    started = time.perf_counter()
+    groups = {}
+    for (subject_type, action, resource_type), _subject_id, allowed in sweep(evaluator):
+        counts = groups.setdefault(
+            f"{subject_type} {action} {resource_type}",
+            {"subjects": 0, "resources": len(evaluator.graph.by_type.get(resource_type, [])), "allow": 0},
+        )
+        counts["subjects"] += 1
+        counts["allow"] += len(allowed)
+    wall = time.perf_counter() - started
+    for counts in groups.values():
+        counts["deny"] = counts["subjects"] * counts["resources"] - counts["allow"]
+    decisions = sum(c["subjects"] * c["resources"] for c in groups.values())
+    return {
+        "decisions": decisions,
+        "wall_s": round(wall, 3),
+        "decisions_per_s": round(decisions / wall) if wall else 0,
+        "groups": groups,
+        "unsupported": evaluator.unsupported,
+    }
+
+
+def run_diff(before, after):
+    """Compare two evaluators over every cell; return the summary dict with the changed cells."""
+    started = time.perf_counter()
+    changes = list(diff(before, after))
+    by_group = {}
+    for change in changes:
+        group = f"{change['subject_type']} {change['action']} {change['resource_type']}"
+        counts = by_group.setdefault(group, {"granted": 0, "revoked": 0})
+        counts[change["change"]] += 1
+    return {
+        "wall_s": round(time.perf_counter() - started, 3),
+        "granted": sum(c["granted"] for c in by_group.values()),
+        "revoked": sum(c["revoked"] for c in by_group.values()),
+        "groups": by_group,
+        "changes": changes,
+        "unsupported": {"before": before.unsupported, "after": after.unsupported},
+    }
+
+
+def run_evaluate(evaluator, path):
+    """Answer every AuthZEN body in the file (one body or a list of them)."""
+    if path == "-":
+        raw = json.load(sys.stdin)
+    else:
+        with Path(path).open() as f:
+            raw = json.load(f)
+    bodies = raw if isinstance(raw, list) else [raw]
+    return [evaluator.evaluations(body) if "evaluations" in body else evaluator.evaluate(body) for body in bodies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--dataset", default=_dataset.DATASET, choices=_dataset.available_datasets())
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    # The same options after the command (kbac_shadow.py sweep --dataset insurance); SUPPRESS keeps
+    # the subcommand from overwriting a value given before it.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dataset", default=argparse.SUPPRESS, choices=_dataset.available_datasets())
+    common.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="print the result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sweep", parents=[common], help="evaluate every subject x resource cell of every policy")
+    diff_parser = commands.add_parser("diff", parents=[common], help="list the decisions a policy change would flip")
+    diff_parser.add_argument("--against", required=True, help="manifest, KBAC entry list or single KBAC entry")
+    diff_parser.add_argument("--show", type=int, default=20, help="changed cells to print (text output)")
+    evaluate_parser = commands.add_parser("evaluate", parents=[common], help="answer AuthZEN request bodies")
+    evaluate_parser.add_argument("requests", help="JSON file with one body or a list of them (- for stdin)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = load_graph(args.dataset)
+    policies = load_policies(args.dataset)
+    evaluator = LocalEvaluator(graph, policies)
+    loaded = time.perf_counter() - started
+
+    if args.command == "evaluate":
+        _report_unsupported(evaluator)
+        print(json.dumps(run_evaluate(evaluator, args.requests), indent=2))  # noqa: T201
+        return
+    if args.command == "diff":
+        after = LocalEvaluator(graph, candidate_policies(policies, args.against))
+        result = run_diff(evaluator, after)
+        if args.json:
+            print(json.dumps(result, indent=2))  # noqa: T201
+            return
+        _report_unsupported(evaluator, "current: ")
+        _report_unsupported(after, "candidate: ")
+        print(  # noqa: T201
+            f"{args.dataset}: {result['granted']} decisions newly allowed, {result['revoked']} no longer allowed "
+            f"({result['wall_s']}s)",
+        )
+        for group, counts in result["groups"].items():
+            print(f"  {group}: +{counts['granted']} -{counts['revoked']}")  # noqa: T201
+        for change in result["changes"][: args.show]:
+            sign = "+" if change["change"] == "granted" else "-"
+            print(  # noqa: T201
+                f"  {sign} {change['subject_type']}:{change['subject_id']} {change['action']} "
+                f"{change['resource_type']}:{change['resource_id']}  ({', '.join(change['policies'])})",
+            )
+        if len(result["changes"]) > args.show:
+            print(f"  ... {len(result['changes']) - args.show} more (--show, --json)")  # noqa: T201
+        return
+
+    result = run_sweep(evaluator)
+    if args.json:
+        print(json.dumps(result, indent=2))  # noqa: T201
+        return
+    _report_unsupported(evaluator)
+    print(  # noqa: T201
+        f"{args.dataset}: {len(graph.props)} nodes, {graph.relationship_count} relationships loaded in {loaded:.2f}s; "
+        f"{result['decisions']} decisions in {result['wall_s']}s = {result['decisions_per_s']}/s",
+    )
+    print(f"{'subject action resource':>36}  {'subjects':>8}  {'allow':>7}  {'deny':>7}")  # noqa: T201
+    for group, counts in result["groups"].items():
+        print(f"{group:>36}  {counts['subjects']:>8}  {counts['allow']:>7}  {counts['deny']:>7}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# Copyright (c) 2026 IndyKite
+"""Result cache for CIQ executes (chat story steps and the execute forms).
+
+A story walkthrough re-runs the same read queries over and over - every demo,
+every browser - and app-subject answers in particular barely change between
+captures. Read results are cached here, keyed by
+
+    (knowledge query id, canonical input_params, subject identity)
+
+where the subject identity is the app agent for _Application-subject slots and
+the token's issuer + subject claims for person-subject slots, so two users
+never share an entry while one user's fresh token still hits the entries
+cached under the previous one.
+
+Claims are read without verifying the signature, so a token is only served
+from the cache once the platform has accepted it on a real execute (its
+fingerprint is then remembered against the identity); until then every lookup
+misses and goes upstream, where it is validated. Expired tokens always miss.
+
+ - TTLs are per slot: APP_SUBJECT_TTL_SECONDS / PERSON_SUBJECT_TTL_SECONDS,
+   overridable with CIQ_CACHE_TTL_<slot> (0 disables caching for that slot);
+   write queries (upserts/deletes) are never cached;
+ - the cache is an LRU bounded at CACHE_MAX_ENTRIES;
+ - any successful write execute, completed capture or project delete clears
+   it (invalidate()), and a result fetched before an invalidation is dropped
+   instead of stored, so a stale read can never outlive the write.
+
+The entries are per process (each gunicorn worker keeps its own), but the
+generation that invalidation bumps is a counter in the shared state store
+(api/_state.py): every lookup and store reads it - one indexed SQLite read -
+and a worker that finds it moved clears its own entries first, so a capture
+seen by one worker invalidates all of them.
+"""
+
+import base64
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from api._music_data import CIQ_POLICIES, CIQ_QUERIES, ciq_query_for_slot
+from api._state import get_store
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = 512
+APP_SUBJECT_TTL_SECONDS = 300
+PERSON_SUBJECT_TTL_SECONDS = 60
+# Remembered token fingerprints (the platform accepted them); oldest dropped first.
+VERIFIED_TOKENS_MAX = 256
+# The state store counter every worker's cache follows.
+GENERATION_COUNTER = "ciq_cache_generation"
+
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
+
+_WRITE_KEYS = frozenset({"upsert_nodes", "upsert_relationships", "delete_nodes", "delete_relationships"})
+_READ_SLOTS = frozenset(
+    query["slot"] for query in CIQ_QUERIES if not any(query.get("query", {}).get(key) for key in _WRITE_KEYS)
+)
+_APP_SUBJECT_POLICY_SLOTS = {
+    pol["slot"] for pol in CIQ_POLICIES if pol.get("policy", {}).get("subject", {}).get("type") == "_Application"
+}
+
+
+def is_write_slot(slot):
+    """Return True unless the slot's knowledge query only reads (unknown slots count as writes)."""
+    return slot not in _READ_SLOTS
+
+
+def slot_ttl(slot):
+    """Seconds a read result for this slot stays fresh; 0 when it must not be cached."""
+    if is_write_slot(slot):
+        return 0
+    override = os.getenv(f"CIQ_CACHE_TTL_{slot}")
+    if override is not None:
+        try:
+            return max(0, int(override))
+        except ValueError:
+            logger.warning("Ignoring non-integer CIQ_CACHE_TTL_%s=%r", slot, override)
+    policy_slot = ciq_query_for_slot(slot)["policy_slot"]
+    return APP_SUBJECT_TTL_SECONDS if policy_slot in _APP_SUBJECT_POLICY_SLOTS else PERSON_SUBJECT_TTL_SECONDS
+
+
+def _fingerprint(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _token_claims(token):
+    """Decode a JWT's payload WITHOUT verifying it; {} when it is not a JWT."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def subject_identity(app_token, user_token=None):
+    """Return (identity, token fingerprint) for the caller; identity is None when it must not be cached."""
+    if user_token is None:
+        return f"app:{_fingerprint(app_token or '')[:16]}", None
+    claims = _token_claims(user_token)
+    exp = claims.get("exp")
+    if not claims.get("sub") or (isinstance(exp, int | float) and exp <= time.time()):
+        return None, None
+    return f"user:{claims.get('iss', '')}|{claims['sub']}", _fingerprint(user_token)
+
+
+class CiqResultCache:
+    """Bounded LRU of execute results with per-entry expiry and whole-cache invalidation.
+
+    store is the shared state store (or a callable returning it) whose
+    GENERATION_COUNTER the cache follows; None keeps the generation in this
+    process only.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, store=None) -> None:
+        self.max_entries = max_entries
+        self._store = store
+        self._entries = OrderedDict()
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+            "invalidations_elsewhere": 0,
+        }
+
+    @staticmethod
+    def make_key(query_id, input_params, identity) -> str:
+        canonical = json.dumps(input_params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{query_id}\x1f{canonical}\x1f{identity}"
+
+    def _shared_store(self):
+        return self._store() if callable(self._store) else self._store
+
+    def _sync(self):
+        """Catch up with the shared generation - clearing the entries if another worker invalidated - and return it."""
+        store = self._shared_store()
+        if store is None:
+            with self._lock:
+                return self._generation
+        shared = store.counter(GENERATION_COUNTER)
+        with self._lock:
+            if shared != self._generation:
+                self._entries.clear()
+                self._generation = shared
+                self._stats["invalidations_elsewhere"] += 1
+            return self._generation
+
+    def lookup(self, slot, query_id, input_params, app_token, user_token=None):
+        """Return a ticket for one execute: `.hit` holds a cached (status, body) or None."""
+        ttl = slot_ttl(slot)
+        identity, fingerprint = subject_identity(app_token, user_token)
+        ticket = _Ticket(self, slot, ttl, fingerprint, identity)
+        if not ttl or identity is None:
+            return ticket
+        ticket.key = self.make_key(query_id, input_params, identity)
+        ticket.generation = self._sync()
+        with self._lock:
+            trusted = fingerprint is None or self._verified.get(fingerprint) == identity
+            entry = self._entries.get(ticket.key) if trusted else None
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[ticket.key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return ticket
+            self._entries.move_to_end(ticket.key)
+            self._stats["hits"] += 1
+            ticket.hit = (entry[1], copy.deepcopy(entry[2]))
+        return ticket
+
+    def store(self, ticket, status, body):
+        """Cache a successful read for the ticket's key and trust its token from now on."""
+        generation = self._sync() if ticket.key is not None else None
+        with self._lock:
+            if ticket.fingerprint is not None:
+                self._verified[ticket.fingerprint] = ticket.identity
+                self._verified.move_to_end(ticket.fingerprint)
+                while len(self._verified) > VERIFIED_TOKENS_MAX:
+                    self._verified.popitem(last=False)
+            # Fetched before a write/capture landed: the answer may already be stale.
+            if ticket.key is None or ticket.generation != generation:
+                return
+            self._entries[ticket.key] = (time.monotonic() + ticket.ttl, status, copy.deepcopy(body))
+            self._entries.move_to_end(ticket.key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, reason):
+        """Drop every entry, in every worker (the graph changed); in-flight fetches will not be stored either."""
+        store = self._shared_store()
+        generation = store.bump(GENERATION_COUNTER) if store is not None else None
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._generation = self._generation + 1 if generation is None else generation
+            self._stats["invalidations"] += 1
+        logger.info("CIQ result cache invalidated (%s): dropped %s entries", reason, dropped)
+
+    def generation(self):
+        """Return a counter bumped by every invalidation, in any worker (two reads differ: a write came between)."""
+        return self._sync()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+class _Ticket:
+    """One execute's view of the cache: the hit (if any) and where to store the fresh result."""
+
+    def __init__(self, cache, slot, ttl, fingerprint, identity) -> None:
+        self.cache = cache
+        self.slot = slot
+        self.ttl = ttl
+        self.fingerprint = fingerprint
+        self.identity = identity
+        self.key = None
+        self.generation = None
+        self.hit = None
+
+    def record(self, status, body):
+        """Record the upstream result: cache a successful read, or invalidate after a successful write."""
+        if not HTTP_OK <= status < HTTP_MULTIPLE_CHOICES:
+            return
+        if is_write_slot(self.slot):
+            self.cache.invalidate(f"CIQ write slot {self.slot}")
+            return
+        self.cache.store(self, status, body)
+
+
+_cache = CiqResultCache(store=get_store)
+
+
+def get_cache():
+    """Return the process-wide CIQ result cache."""
+    return _cache
+
+
+def invalidate(reason):
+    """Clear the process-wide cache (after a capture, write execute or project delete)."""
+    _cache.invalidate(reason)
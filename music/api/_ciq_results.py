@@ -0,0 +1,109 @@
+# Copyright (c) 2026 IndyKite
+"""Columnar view of a CIQ execute result, for rendering large answers a page at a time.
+
+A CIQ row is {"nodes": {"node.property.name": value, ...}}. Instead of building
+a display dict per row (splitting every key of every row), the column mapping
+- raw key -> (display name, column index) - is derived once per response, and
+rows are produced lazily as lists aligned to the columns, only for the page
+being rendered or streamed.
+
+The chat renders the first page inline; the rest of a large answer is kept
+here (per process, LRU + TTL) under an unguessable id so the browser can
+fetch it from /chat/results as NDJSON and append rows as they arrive.
+"""
+
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# `data[].nodes` keys look like "node.property.name"; keep at least node + prop.
+MIN_KEY_PARTS = 2
+RESULTS_MAX = 32
+RESULT_TTL_SECONDS = 600
+
+
+def display_key(key):
+    """Return the column name for a raw `node.property.name` key (node_name)."""
+    parts = key.split(".")
+    if len(parts) < MIN_KEY_PARTS:
+        return key
+    node_name = parts[0]
+    prop_type = parts[1] if parts[1] != "property" else parts[2] if len(parts) > MIN_KEY_PARTS else parts[1]
+    return f"{node_name}_{prop_type}".replace(".", "_")
+
+
+class ColumnarResult:
+    """The rows of one execute response with their columns derived once."""
+
+    def __init__(self, data) -> None:
+        # References to each row's nodes dict, not copies; rows without nodes are not results.
+        self._rows = [row["nodes"] for row in data if isinstance(row, dict) and row.get("nodes")]
+        self._index = {}
+        positions = {}
+        for nodes in self._rows:
+            for key in nodes:
+                if key not in self._index:
+                    self._index[key] = positions.setdefault(display_key(key), len(positions))
+        self.columns = list(positions)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def rows(self, offset=0, limit=None):
+        """Yield rows [offset, offset + limit) as lists aligned to `columns` (None for a missing cell)."""
+        stop = len(self._rows) if limit is None else min(len(self._rows), offset + limit)
+        width = len(self.columns)
+        for position in range(max(0, offset), stop):
+            row = [None] * width
+            for key, value in self._rows[position].items():
+                row[self._index[key]] = value
+            yield row
+
+    def page(self, offset=0, limit=100):
+        """Return one page as a JSON-able dict (next_offset is None on the last page)."""
+        rows = list(self.rows(offset, limit))
+        next_offset = offset + len(rows)
+        return {
+            "columns": self.columns,
+            "rows": rows,
+            "offset": offset,
+            "total": len(self),
+            "next_offset": next_offset if next_offset < len(self) else None,
+        }
+
+    def ndjson(self, offset=0):
+        """Yield NDJSON lines: the columns, one line per row from `offset`, then a done marker."""
+        yield json.dumps({"type": "columns", "columns": self.columns, "offset": offset, "total": len(self)}) + "\n"
+        count = 0
+        for row in self.rows(offset):
+            count += 1
+            yield json.dumps(row, default=str) + "\n"
+        yield json.dumps({"type": "done", "rows": count}) + "\n"
+
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def remember(result):
+    """Keep a result for later pages; return its id."""
+    result_id = secrets.token_urlsafe(12)
+    now = time.monotonic()
+    with _results_lock:
+        _results[result_id] = (now + RESULT_TTL_SECONDS, result)
+        while len(_results) > RESULTS_MAX or (_results and next(iter(_results.values()))[0] <= now):
+            _results.popitem(last=False)
+    return result_id
+
+
+def recall(result_id):
+    """Return a remembered result, or None when it is unknown or expired."""
+    with _results_lock:
+        entry = _results.get(result_id)
+        if entry is None or entry[0] <= time.monotonic():
+            _results.pop(result_id, None)
+            return None
+        _results.move_to_end(result_id)
+        return entry[1]
@@ -0,0 +1,650 @@
+# Copyright (c) 2026 IndyKite
+"""Array-backed, integer-indexed graph snapshot for the Graph Explorer.
+
+Nodes are numbered 0..n-1 in file order and relationships 0..m-1 (the
+"e<index>" element ids); everything else is a flat table indexed by those
+numbers instead of dicts keyed by external_id strings:
+
+ - ids, labels, props: string tables - one UTF-8 blob plus an offsets array
+   (props holds each node's properties as a JSON object);
+ - node_type / edge_label: small integer codes into type_names / label_names;
+ - edge_source / edge_target: node numbers per relationship;
+ - adjacency in CSR form: the relationships incident to node i are
+   adj_edges[adj_offsets[i]:adj_offsets[i + 1]], those leading to a node of
+   the dense type (Track) first, up to track_end[i] - so a node's degree is
+   a subtraction and "its tracks" is a slice.
+
+A relationship costs ~17 bytes (two endpoints, a label code, two adjacency
+entries) instead of a dict per edge plus list entries in several dicts, and
+an external_id is looked up by binary search over id_order (ids sorted).
+
+Because every table is a flat buffer, an index is also written to disk as a
+snapshot file and memory-mapped back (open_index): the tables become
+memoryviews over the mapping, so loading parses nothing but a small JSON
+header and every worker process reads the same page-cache pages. The file:
+
+    magic (8 bytes) | header length (8, little-endian) | header JSON |
+    sections, each starting at a multiple of 8 from the first one
+
+The header holds the key the snapshot was built for (source file names,
+mtime_ns and sizes plus a caller-supplied tag), the byte order, the index
+metadata, and each section's [typecode, offset, nbytes].
+
+Capture mostly grows its files by appending records. The metadata therefore
+records, per source file, the length and digest of everything up to its last
+record; when the key changes, update_index checks that prefix and parses only
+what follows it, extending the previous snapshot's tables instead of
+streaming both files again. Any other change falls back to build_index.
+
+Building runs in the background while requests are served from the previous
+snapshot. Its per-record loops sleep for YIELD_SECONDS every YIELD_EVERY
+steps (and the digests once per chunk), so under gunicorn's gevent worker -
+where that background thread is a greenlet - requests keep getting answered
+instead of waiting for the whole build.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import ijson
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock, concurrent builders each write a copy
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DENSE_TYPE = "Track"
+
+SNAPSHOT_MAGIC = b"IKGRAPH1"
+SNAPSHOT_VERSION = 1
+_PREAMBLE = 16
+_ALIGN = 8
+_STRING_TABLES = ("ids", "labels", "props")
+# How a capture file ends after its last record (the array and object closing), and
+# what follows that point when records were appended: ", {record}, ... ] }".
+_CLOSER = re.compile(rb"\s*\]\s*\}\s*\Z")
+_APPENDED = re.compile(rb"\s*,(.*\})(\s*\]\s*\}\s*)", re.DOTALL)
+_TAIL_PROBE = 64
+_HASH_CHUNK = 1 << 20
+_LOCK_POLL_SECONDS = 0.1
+YIELD_EVERY = 2_000
+# Not 0: gevent's sleep(0) only switches to ready greenlets, and requests
+# waiting on the event loop's timers could stall for seconds of a build.
+YIELD_SECONDS = 0.0001
+_NUMBER_TABLES = (
+    "id_order",
+    "node_type",
+    "edge_source",
+    "edge_target",
+    "edge_label",
+    "adj_offsets",
+    "adj_edges",
+    "track_end",
+)
+
+
+def _yielding(items):
+    """Iterate items, sleeping briefly every YIELD_EVERY of them (a cooperative yield under gevent)."""
+    for i, item in enumerate(items):
+        if i % YIELD_EVERY == 0:
+            time.sleep(YIELD_SECONDS)
+        yield item
+
+
+class StringTable:
+    """Strings stored back to back in one UTF-8 blob; string i is blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, blob=b"", offsets=None) -> None:
+        self.blob = blob
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i) -> str:
+        return self.raw(i).decode()
+
+    def raw(self, i):
+        """Return string i as bytes."""
+        return bytes(self.blob[self.offsets[i] : self.offsets[i + 1]])
+
+
+class _StringTableBuilder:
+    def __init__(self, table=None) -> None:
+        """Start empty, or with a copy of table's strings."""
+        self.blob = bytearray()
+        self.offsets = array("Q", [0])
+        if table is not None:
+            self.blob += table.blob
+            self.offsets = _copy(table.offsets, "Q")
+
+    def append(self, text):
+        self.blob += text.encode()
+        self.offsets.append(len(self.blob))
+
+    def table(self):
+        return StringTable(bytes(self.blob), self.offsets)
+
+
+class GraphIndex:
+    """One dataset snapshot: node and relationship tables plus CSR adjacency."""
+
+    def __init__(self, tables, meta) -> None:
+        self._tables = tables
+        self.meta = meta
+        self.ids = tables["ids"]
+        self.labels = tables["labels"]
+        self.props = tables["props"]
+        self.id_order = tables["id_order"]
+        self.node_type = tables["node_type"]
+        self.edge_source = tables["edge_source"]
+        self.edge_target = tables["edge_target"]
+        self.edge_label = tables["edge_label"]
+        self.adj_offsets = tables["adj_offsets"]
+        self.adj_edges = tables["adj_edges"]
+        self.track_end = tables["track_end"]
+        self.type_names = meta["type_names"]
+        self.label_names = meta["label_names"]
+        self.type_counts = meta["type_counts"]
+        self.dense_code = self.type_names.index(DENSE_TYPE) if DENSE_TYPE in self.type_names else -1
+        # The snapshot key this index was opened for (open_index); derived caches on disk use it.
+        self.key = None
+        self._derived = {}
+        self._derived_locks = {}
+        self._derived_lock = threading.Lock()
+
+    def cached(self, name, factory):
+        """Return what factory() builds from this snapshot, built once per name.
+
+        Response caches, search indexes and the like hang off the snapshot
+        they were computed from, so they are dropped with it and a request
+        never mixes one snapshot's data with another's derived state. Two
+        callers asking for the same name wait for one build.
+        """
+        if name in self._derived:
+            return self._derived[name]
+        with self._derived_lock:
+            lock = self._derived_locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = factory()
+            return self._derived[name]
+
+    def cached_value(self, name, default=None):
+        """Return the derived object `name` if it has been built already, else default - never builds."""
+        return self._derived.get(name, default)
+
+    @property
+    def node_count(self):
+        return len(self.node_type)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_source)
+
+    def find(self, external_id):
+        """Return the node number for an external_id, or None."""
+        key = external_id.encode()
+        order = self.id_order
+        lo = bisect_left(range(len(order)), key, key=lambda position: self.ids.raw(order[position]))
+        if lo < len(order) and self.ids.raw(order[lo]) == key:
+            return order[lo]
+        return None
+
+    def type_of(self, node):
+        return self.type_names[self.node_type[node]]
+
+    def is_dense(self, node):
+        return self.node_type[node] == self.dense_code
+
+    def degree(self, node):
+        return self.adj_offsets[node + 1] - self.adj_offsets[node]
+
+    def track_count(self, node):
+        return self.track_end[node] - self.adj_offsets[node]
+
+    def incident(self, node):
+        """Return the relationship numbers touching node (a self-loop appears twice)."""
+        return self.adj_edges[self.adj_offsets[node] : self.adj_offsets[node + 1]]
+
+    def track_edges(self, node):
+        """Return the relationship numbers between a non-Track node and its Track neighbours."""
+        return self.adj_edges[self.adj_offsets[node] : self.track_end[node]]
+
+    def other(self, edge, node):
+        """Return the endpoint of edge that is not node."""
+        source = self.edge_source[edge]
+        return self.edge_target[edge] if source == node else source
+
+    def node_props(self, node):
+        return json.loads(self.props.raw(node))
+
+    def sections(self):
+        """Yield (name, buffer) for every flat table - what a snapshot file stores."""
+        for name in _STRING_TABLES:
+            yield f"{name}.blob", self._tables[name].blob
+            yield f"{name}.offsets", self._tables[name].offsets
+        for name in _NUMBER_TABLES:
+            yield name, self._tables[name]
+
+
+def build_index(nodes_file, relationships_file, node_label):
+    """Stream both capture files once into a GraphIndex.
+
+    node_label(type, props) returns the display label or None (the external_id
+    is used then). Relationships whose endpoints are not in the nodes file are
+    dropped, and a repeated external_id keeps its first record.
+    """
+    builder = _IndexBuilder(node_label)
+    with nodes_file.open("rb") as f:
+        builder.add_nodes(ijson.items(f, "nodes.item", use_float=True))
+    if builder.duplicates:
+        logger.warning("Skipped %s repeated node external_ids in %s", builder.duplicates, nodes_file.name)
+    with relationships_file.open("rb") as f:
+        builder.add_relationships(ijson.items(f, "relationships.item", use_float=True))
+    return builder.finish({"nodes": _source_state(nodes_file), "relationships": _source_state(relationships_file)})
+
+
+def update_index(previous, nodes_file, relationships_file, node_label):
+    """Return previous brought up to date with the two files, or None when only build_index will do.
+
+    Records appended to a file since previous was built are recognised by the
+    digest of the file up to its last record (meta "sources"): only they are
+    parsed, the tables are extended and the adjacency recomputed, so the result
+    equals build_index of the same files. A nodes file changed in any other way
+    may renumber nodes and needs a full build; a relationships file changed in
+    any other way - or any file once appended nodes may resolve relationships
+    dropped before - is streamed again against the kept nodes. Node numbers
+    below previous.node_count keep their meaning (meta "extends").
+    """
+    sources = previous.meta.get("sources") or {}
+    appended_nodes = _appended_records(nodes_file, sources.get("nodes"), previous)
+    if appended_nodes is None:
+        return None
+    new_nodes, nodes_state = appended_nodes
+    appended_relationships = _appended_records(relationships_file, sources.get("relationships"), previous)
+    extends = {"key": previous.key, "nodes": previous.node_count}
+    if not new_nodes and appended_relationships is not None and not appended_relationships[0]:
+        # Touched, or rewritten with the same records: the tables stand as they are.
+        logger.info("Graph sources unchanged since the previous snapshot, keeping its tables")
+        meta = {**previous.meta, "sources": {"nodes": nodes_state, "relationships": appended_relationships[1]}}
+        return GraphIndex(dict(previous._tables), {**meta, "extends": extends})  # noqa: SLF001 - same module
+    builder = _IndexBuilder(node_label, previous)
+    builder.add_nodes(new_nodes)
+    if appended_relationships is None or (builder.node_count > previous.node_count and builder.dropped):
+        builder.clear_relationships()
+        with relationships_file.open("rb") as f:
+            builder.add_relationships(ijson.items(f, "relationships.item", use_float=True))
+        relationships_state = _source_state(relationships_file)
+        restreamed = True
+    else:
+        new_relationships, relationships_state = appended_relationships
+        builder.add_relationships(new_relationships)
+        restreamed = False
+    logger.info(
+        "Updated graph snapshot in place: %s nodes appended, relationships %s",
+        builder.node_count - previous.node_count,
+        "streamed again" if restreamed else f"{builder.edge_count - previous.edge_count} appended",
+    )
+    index = builder.finish({"nodes": nodes_state, "relationships": relationships_state})
+    index.meta["extends"] = extends
+    return index
+
+
+class _IndexBuilder:
+    """Node and relationship records accumulated into the tables of a GraphIndex."""
+
+    def __init__(self, node_label, base=None) -> None:
+        """Start empty, or with copies of base's tables to extend."""
+        self.node_label = node_label
+        if base is None:
+            self.ids, self.labels, self.props = _StringTableBuilder(), _StringTableBuilder(), _StringTableBuilder()
+            self.node_type = array("H")
+            self.type_codes, self.number = {}, {}
+            self.dropped = 0
+        else:
+            self.ids = _StringTableBuilder(base.ids)
+            self.labels = _StringTableBuilder(base.labels)
+            self.props = _StringTableBuilder(base.props)
+            self.node_type = _copy(base.node_type, "H")
+            self.type_codes = {name: code for code, name in enumerate(base.type_names)}
+            self.number = {base.ids[node]: node for node in _yielding(range(base.node_count))}
+            self.dropped = base.meta.get("dropped", 0)
+        self.duplicates = 0
+        self.clear_relationships(base)
+
+    def clear_relationships(self, base=None):
+        if base is None:
+            self.edge_source, self.edge_target, self.edge_label = array("I"), array("I"), array("H")
+            self.label_codes = {}
+            self.dropped = 0
+        else:
+            self.edge_source = _copy(base.edge_source, "I")
+            self.edge_target = _copy(base.edge_target, "I")
+            self.edge_label = _copy(base.edge_label, "H")
+            self.label_codes = {name: code for code, name in enumerate(base.label_names)}
+
+    @property
+    def node_count(self):
+        return len(self.node_type)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_source)
+
+    def add_nodes(self, records):
+        for n in _yielding(records):
+            ext_id = n["external_id"]
+            if ext_id in self.number:
+                self.duplicates += 1
+                continue
+            self.number[ext_id] = len(self.node_type)
+            node_props = {p["type"]: p.get("value") for p in n.get("properties", [])}
+            self.ids.append(ext_id)
+            self.labels.append(self.node_label(n["type"], node_props) or ext_id)
+            self.props.append(json.dumps(node_props, separators=(",", ":"), default=str))
+            self.node_type.append(self.type_codes.setdefault(n["type"], len(self.type_codes)))
+
+    def add_relationships(self, records):
+        for r in _yielding(records):
+            src = self.number.get(r["source"]["external_id"])
+            tgt = self.number.get(r["target"]["external_id"])
+            if src is None or tgt is None:
+                self.dropped += 1
+                continue
+            self.edge_source.append(src)
+            self.edge_target.append(tgt)
+            self.edge_label.append(self.label_codes.setdefault(r["type"], len(self.label_codes)))
+
+    def finish(self, sources):
+        """Return the GraphIndex of everything added; sources is stored for the next update_index."""
+        node_type = self.node_type
+        dense = self.type_codes.get(DENSE_TYPE, -1)
+        adj_offsets, adj_edges, track_end = _csr(len(node_type), node_type, self.edge_source, self.edge_target, dense)
+        counts = [0] * len(self.type_codes)
+        for code in _yielding(node_type):
+            counts[code] += 1
+        id_table = self.ids.table()
+        # Sort keys gathered first (yielding), so the sort itself makes no Python calls.
+        raw_ids = [id_table.raw(node) for node in _yielding(range(len(node_type)))]
+        id_order = array("I", sorted(range(len(node_type)), key=raw_ids.__getitem__))
+        tables = {
+            "ids": id_table,
+            "labels": self.labels.table(),
+            "props": self.props.table(),
+            "id_order": id_order,
+            "node_type": node_type,
+            "edge_source": self.edge_source,
+            "edge_target": self.edge_target,
+            "edge_label": self.edge_label,
+            "adj_offsets": adj_offsets,
+            "adj_edges": adj_edges,
+            "track_end": track_end,
+        }
+        meta = {
+            "type_names": list(self.type_codes),
+            "label_names": list(self.label_codes),
+            "type_counts": {name: counts[code] for name, code in self.type_codes.items()},
+            "dropped": self.dropped,
+            "sources": sources,
+        }
+        return GraphIndex(tables, meta)
+
+
+def _copy(buffer, typecode):
+    """Return a growable array copy of a flat table (an array or a mapped memoryview)."""
+    copy = array(typecode)
+    copy.frombytes(memoryview(buffer).cast("B"))
+    return copy
+
+
+def _source_state(path):
+    """Return {"prefix", "digest"} of a capture file: its length up to the last record, and that part's digest.
+
+    None when the file does not end like `..., {record} ] }` (an empty array, say) - it then
+    cannot be extended in place.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - _TAIL_PROBE))
+        tail = f.read()
+        closer = _CLOSER.search(tail)
+        if closer is None or not tail[: closer.start()].endswith(b"}"):
+            return None
+        prefix = size - (closer.end() - closer.start())
+        f.seek(0)
+        digest = _digest(f, prefix)
+    return {"prefix": prefix, "digest": digest.hexdigest()}
+
+
+def _digest(f, length, digest=None):
+    """Feed the next `length` bytes of f into digest (a new blake2b if None) and return it."""
+    digest = digest or hashlib.blake2b(digest_size=16)
+    while length > 0:
+        chunk = f.read(min(length, _HASH_CHUNK))
+        if not chunk:
+            break
+        digest.update(chunk)
+        length -= len(chunk)
+        time.sleep(YIELD_SECONDS)  # let requests in between (a cooperative yield under gevent)
+    return digest
+
+
+def _appended_records(path, state, previous):
+    """Return (records appended to path since state was taken, its new state), or None if it changed otherwise."""
+    if state is None:
+        return None
+    if previous.key is not None and source_key((path,))[0] in previous.key:
+        return [], state  # untouched since previous was built
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size < state["prefix"]:
+            return None
+        digest = _digest(f, state["prefix"])
+        if digest.hexdigest() != state["digest"]:
+            return None
+        tail = f.read()
+    return _parse_appended(tail, state, digest)
+
+
+def _parse_appended(tail, state, digest):
+    """Parse what follows a file's known prefix: nothing new, appended records, or None for anything else."""
+    if _CLOSER.fullmatch(tail):
+        return [], state
+    appended = _APPENDED.fullmatch(tail)
+    if appended is None:
+        return None
+    records = list(ijson.items(io.BytesIO(b"[" + appended.group(1) + b"]"), "item", use_float=True))
+    body = appended.start(2)
+    digest.update(tail[:body])
+    return records, {"prefix": state["prefix"] + body, "digest": digest.hexdigest()}
+
+
+def _csr(node_count, node_type, edge_source, edge_target, dense):
+    """Counting-sort the relationships into per-node incidence lists, Track neighbours first."""
+    track_degree = array("I", bytes(4 * node_count))
+    degree = array("I", bytes(4 * node_count))
+    for src, tgt in _yielding(zip(edge_source, edge_target, strict=True)):
+        degree[src] += 1
+        degree[tgt] += 1
+        src_dense, tgt_dense = node_type[src] == dense, node_type[tgt] == dense
+        if src_dense != tgt_dense:
+            track_degree[tgt if src_dense else src] += 1
+    adj_offsets = array("I", [0]) * (node_count + 1)
+    for node in _yielding(range(node_count)):
+        adj_offsets[node + 1] = adj_offsets[node] + degree[node]
+    # Two cursors per node: Track-side slots fill from the start, the rest after them.
+    track_cursor = array("I", adj_offsets[:-1])
+    rest_cursor = array("I", track_cursor)
+    for node in _yielding(range(node_count)):
+        rest_cursor[node] += track_degree[node]
+    track_end = array("I", rest_cursor)
+    adj_edges = array("I", bytes(4 * adj_offsets[-1]))
+    for edge, (src, tgt) in enumerate(_yielding(zip(edge_source, edge_target, strict=True))):
+        src_dense, tgt_dense = node_type[src] == dense, node_type[tgt] == dense
+        for node, other_dense, own_dense in ((src, tgt_dense, src_dense), (tgt, src_dense, tgt_dense)):
+            if other_dense and not own_dense:
+                adj_edges[track_cursor[node]] = edge
+                track_cursor[node] += 1
+            else:
+                adj_edges[rest_cursor[node]] = edge
+                rest_cursor[node] += 1
+    return adj_offsets, adj_edges, track_end
+
+
+def source_key(files):
+    """Return [name, mtime_ns, size] per file - a snapshot is valid while these match."""
+    key = []
+    for path in files:
+        stat = path.stat()
+        key.append([path.name, stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_snapshot(index, path, key):
+    """Write index to path atomically (a temp file renamed over it)."""
+    layout, sections, offset = {}, [], 0
+    for name, buffer in index.sections():
+        data = memoryview(buffer)
+        layout[name] = [data.format, offset, data.nbytes]
+        sections.append((offset, data.cast("B")))
+        offset = _aligned(offset + data.nbytes)
+    header = json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "key": key,
+            "byteorder": sys.byteorder,
+            "meta": index.meta,
+            "sections": layout,
+        },
+    ).encode()
+    base = _aligned(_PREAMBLE + len(header))
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(SNAPSHOT_MAGIC + len(header).to_bytes(8, "little") + header)
+            for start, data in sections:
+                f.seek(base + start)
+                f.write(data)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def load_snapshot(path, key):
+    """Memory-map the snapshot at path; return its GraphIndex, or None if it is missing, stale or unreadable."""
+    try:
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size < _PREAMBLE:
+                return None
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return None
+    try:
+        mapped = _map_sections(memoryview(mapping), key)
+    except (ValueError, KeyError, TypeError) as exc:
+        logger.warning("Ignoring unreadable graph snapshot %s: %s", path, exc)
+        return None
+    if mapped is None:
+        return None
+    meta, sections = mapped
+    tables = {name: StringTable(sections[f"{name}.blob"], sections[f"{name}.offsets"]) for name in _STRING_TABLES}
+    tables.update((name, sections[name]) for name in _NUMBER_TABLES)
+    # The memoryviews keep the mapping alive; it is unmapped once the index is dropped.
+    return GraphIndex(tables, meta)
+
+
+def _map_sections(view, key):
+    """Return (meta, {name: typed memoryview}) from a mapped snapshot, or None if it was built for another key."""
+    header_len = int.from_bytes(view[8:_PREAMBLE], "little")
+    if bytes(view[:8]) != SNAPSHOT_MAGIC or _PREAMBLE + header_len > len(view):
+        msg = "not a graph snapshot"
+        raise ValueError(msg)
+    header = json.loads(bytes(view[_PREAMBLE : _PREAMBLE + header_len]))
+    if (header["version"], header["key"], header["byteorder"]) != (SNAPSHOT_VERSION, key, sys.byteorder):
+        return None
+    base = _aligned(_PREAMBLE + header_len)
+    sections = {}
+    for name, (code, offset, nbytes) in header["sections"].items():
+        if base + offset + nbytes > len(view):
+            msg = f"section {name} runs past the end of the file"
+            raise ValueError(msg)
+        sections[name] = view[base + offset : base + offset + nbytes].cast(code)
+    return header["meta"], sections
+
+
+@contextmanager
+def build_lock(snapshot_file):
+    """Hold an exclusive lock next to a built file (the snapshot, its layout) so one worker process builds it."""
+    if fcntl is None:
+        yield
+        return
+    with snapshot_file.with_name(snapshot_file.name + ".lock").open("a") as lock:
+        # Polled rather than a blocking flock, which would stall every greenlet of a gevent worker
+        # for as long as another process builds.
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(_LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def open_index(snapshot_file, nodes_file, relationships_file, node_label, tag="", *, previous=None):  # noqa: PLR0913 - previous is keyword-only
+    """Return the index of the two source files, memory-mapped from snapshot_file.
+
+    The snapshot is rebuilt when it is missing or its key no longer matches
+    the sources' names, mtimes and sizes or tag - pass something in tag that
+    changes whenever node_label would. Given the previous index of the same
+    files (and tag), records appended since are applied to it (update_index);
+    otherwise, or if the files changed in other ways, the sources are streamed
+    through build_index. If the snapshot cannot be written, the freshly built
+    in-memory index is returned instead.
+    """
+    key = [*source_key((nodes_file, relationships_file)), tag]
+    if previous is not None and (previous.key is None or previous.key[-1] != tag):
+        previous = None
+    index = _open_or_build(snapshot_file, (nodes_file, relationships_file), node_label, key, previous)
+    index.key = key
+    return index
+
+
+def _open_or_build(snapshot_file, sources, node_label, key, previous):
+    index = load_snapshot(snapshot_file, key)
+    if index is not None:
+        return index
+    with build_lock(snapshot_file):
+        # Another worker may have built it while this one waited for the lock.
+        index = load_snapshot(snapshot_file, key)
+        if index is not None:
+            return index
+        index = update_index(previous, *sources, node_label) if previous is not None else None
+        if index is None:
+            logger.info("Building graph snapshot %s from %s and %s", snapshot_file.name, *(f.name for f in sources))
+            index = build_index(*sources, node_label)
+        try:
+            write_snapshot(index, snapshot_file, key)
+        except OSError as exc:
+            logger.warning("Could not write graph snapshot %s, keeping it in memory: %s", snapshot_file, exc)
+            return index
+    return load_snapshot(snapshot_file, key) or index
@@ -0,0 +1,329 @@
+# Copyright (c) 2026 IndyKite
+"""Server-side node positions for the Graph Explorer, cached beside the snapshot.
+
+The browser used to lay out every loaded node itself (fcose), which takes
+seconds at a few thousand nodes and is repeated by every visitor. Instead a
+layout of the whole graph is computed once per snapshot, with NumPy:
+
+ - the skeleton - every node except Tracks - is laid out force-directed
+   (Fruchterman-Reingold): springs along its relationships, plus one spring
+   between consecutive non-Track neighbours of each Track, so an Album sits
+   next to its Artist and the Playlists sharing its Tracks. Repulsion is exact
+   (chunked pairwise) up to EXACT_MAX nodes and beyond that computed on a
+   GRID x GRID density grid convolved with the 1/r kernel by FFT, so an
+   iteration is O(n + GRID^2 log GRID) instead of O(n^2);
+ - each Track is then placed on a sunflower spiral around its first non-Track
+   neighbour (usually its Album), and Tracks without one on a ring outside.
+
+Positions are in the explorer's own units (EDGE_LENGTH is its ideal edge
+length) and written to a sidecar file next to the snapshot, keyed by the
+snapshot's key and LAYOUT_VERSION, so worker processes and restarts reuse it:
+
+    magic (8 bytes) | header length (8, little-endian) | header JSON | float32 x, y per node
+
+When the snapshot was updated in place (update_index: records appended,
+node numbers kept), the previous layout is extended instead: existing nodes
+keep their positions - the explorer does not jump - and each new node goes on
+a spiral around a neighbour placed before it, or on a ring outside.
+
+NumPy is in the Pipfile but tolerated missing: without it no layout is
+computed and the client lays the graph out as before. Reading a cached
+layout, or extending one, needs only the standard library.
+"""
+
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import time
+from array import array
+
+from api._graph_index import build_lock
+
+try:
+    import numpy as np
+except ImportError:  # in the Pipfile; tolerated missing (pipenv run pip install numpy)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_MAGIC = b"IKLAYOUT"
+LAYOUT_VERSION = 1
+_PREAMBLE = 16
+EDGE_LENGTH = 60.0
+EXACT_MAX = 1000
+EXACT_ITERATIONS = 200
+GRID = 256
+GRID_ITERATIONS = 120
+CELL_PAIRS = 8
+_CHUNK = 512
+# Distance between neighbouring Tracks on an anchor's spiral.
+TRACK_SPACING = 14.0
+_GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+SEED = 7
+# Pull towards the centre, against the repulsion that would push components apart indefinitely.
+GRAVITY = 1.0
+
+
+def available():
+    """Return True when layouts can be computed (NumPy is installed)."""
+    return np is not None
+
+
+class Layout:
+    """x, y per node number, for the snapshot key it was laid out for."""
+
+    def __init__(self, coords, key) -> None:
+        self.coords = coords
+        self.key = key
+
+    @property
+    def node_count(self):
+        return len(self.coords) // 2
+
+    def position(self, node):
+        return {"x": round(self.coords[2 * node], 1), "y": round(self.coords[2 * node + 1], 1)}
+
+
+def load_or_compute(ds, path, previous=None):
+    """Return ds's Layout from the sidecar file at path, computing (and writing) it when missing or stale.
+
+    previous is the Layout of the snapshot ds was updated from, if any; it is
+    extended rather than laid out again. Returns None when there is no cached
+    layout and NumPy is not installed.
+    """
+    key = [ds.key, LAYOUT_VERSION]
+    layout = _load(path, key, ds.node_count)
+    extends = ds.meta.get("extends")
+    grows = previous is not None and extends is not None and previous.key == [extends["key"], LAYOUT_VERSION]
+    if layout is not None or (np is None and not grows):
+        return layout
+    with build_lock(path):
+        # Another worker may have computed it while this one waited for the lock.
+        layout = _load(path, key, ds.node_count)
+        if layout is not None:
+            return layout
+        started = time.perf_counter()
+        if grows:
+            coords = extend(ds, previous)
+        else:
+            coords = array("f")
+            coords.frombytes(compute(ds).astype(np.float32).tobytes())
+        logger.info(
+            "Graph layout of %s nodes (%s new) in %.2fs",
+            ds.node_count,
+            ds.node_count - previous.node_count if grows else ds.node_count,
+            time.perf_counter() - started,
+        )
+        try:
+            _write(path, key, coords)
+        except OSError as exc:
+            logger.warning("Could not write graph layout %s, keeping it in memory: %s", path, exc)
+    return Layout(coords, key)
+
+
+def _load(path, key, node_count):
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    header_len = int.from_bytes(data[8:_PREAMBLE], "little")
+    if data[:8] != LAYOUT_MAGIC or _PREAMBLE + header_len > len(data):
+        logger.warning("Ignoring unreadable graph layout %s", path)
+        return None
+    try:
+        header = json.loads(data[_PREAMBLE : _PREAMBLE + header_len])
+    except ValueError:
+        logger.warning("Ignoring unreadable graph layout %s", path)
+        return None
+    if header.get("key") != key or header.get("byteorder") != sys.byteorder:
+        return None
+    coords = array("f")
+    body = data[_PREAMBLE + header_len :]
+    if len(body) != 2 * node_count * coords.itemsize:
+        logger.warning("Ignoring truncated graph layout %s", path)
+        return None
+    coords.frombytes(body)
+    return Layout(coords, key)
+
+
+def _write(path, key, coords):
+    """Write coords to path atomically (a temp file renamed over it)."""
+    header = json.dumps({"key": key, "byteorder": sys.byteorder}).encode()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(LAYOUT_MAGIC + len(header).to_bytes(8, "little") + header)
+            coords.tofile(f)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def compute(ds):
+    """Return an (n, 2) array of positions for every node of ds."""
+    dense = np.asarray(memoryview(ds.node_type)) == ds.dense_code
+    source = np.asarray(memoryview(ds.edge_source)).astype(np.int64)
+    target = np.asarray(memoryview(ds.edge_target)).astype(np.int64)
+    skeleton = np.flatnonzero(~dense)
+    number = np.full(ds.node_count, -1, dtype=np.int64)
+    number[skeleton] = np.arange(len(skeleton))
+
+    # (track, non-Track neighbour) pairs, grouped by track.
+    mixed = dense[source] != dense[target]
+    source_dense = dense[source[mixed]]
+    tracks = np.where(source_dense, source[mixed], target[mixed])
+    anchors = np.where(source_dense, target[mixed], source[mixed])
+    order = np.argsort(tracks, kind="stable")
+    tracks, anchors = tracks[order], anchors[order]
+
+    direct = ~dense[source] & ~dense[target]
+    same_track = tracks[1:] == tracks[:-1]
+    u = np.concatenate([number[source[direct]], number[anchors[:-1][same_track]]])
+    v = np.concatenate([number[target[direct]], number[anchors[1:][same_track]]])
+    keep = u != v
+    positions = np.zeros((ds.node_count, 2))
+    if len(skeleton):
+        positions[skeleton] = _force_layout(len(skeleton), u[keep], v[keep]) * EDGE_LENGTH * 1.5
+    _place_tracks(positions, dense, tracks, anchors)
+    return positions
+
+
+def extend(ds, previous):
+    """Return previous's coordinates plus a position for every node ds has beyond them."""
+    coords = array("f", previous.coords)
+    coords.frombytes(bytes(2 * coords.itemsize * (ds.node_count - previous.node_count)))
+    ring = max(map(abs, previous.coords), default=0.0) + 4 * EDGE_LENGTH
+    around = {}  # anchor -> how many nodes already sit on its spiral
+    loose = 0
+    for node in range(previous.node_count, ds.node_count):
+        if node % 1000 == 0:
+            time.sleep(0)  # let requests in between (a cooperative yield under gevent)
+        anchor = next((other for edge in ds.incident(node) if (other := ds.other(edge, node)) < node), None)
+        if anchor is None:
+            angle = loose * TRACK_SPACING / ring
+            x, y = ring * math.cos(angle), ring * math.sin(angle)
+            loose += 1
+        else:
+            if anchor not in around:
+                around[anchor] = sum(ds.other(edge, anchor) < previous.node_count for edge in ds.incident(anchor))
+            rank = around[anchor]
+            around[anchor] += 1
+            radius = TRACK_SPACING * math.sqrt(rank + 1.0)
+            x = coords[2 * anchor] + radius * math.cos(rank * _GOLDEN_ANGLE)
+            y = coords[2 * anchor + 1] + radius * math.sin(rank * _GOLDEN_ANGLE)
+        coords[2 * node], coords[2 * node + 1] = x, y
+    return coords
+
+
+def _place_tracks(positions, dense, tracks, anchors):
+    """Put each Track on a sunflower spiral around its first non-Track neighbour, the rest on an outer ring."""
+    first = np.ones(len(tracks), dtype=bool)
+    first[1:] = tracks[1:] != tracks[:-1]
+    tracks, anchors = tracks[first], anchors[first]
+    order = np.argsort(anchors, kind="stable")
+    tracks, anchors = tracks[order], anchors[order]
+    # Rank of each Track among its anchor's Tracks.
+    starts = np.ones(len(anchors), dtype=bool)
+    starts[1:] = anchors[1:] != anchors[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(anchors)), 0))
+    rank = np.arange(len(anchors)) - group_start
+    radius = TRACK_SPACING * np.sqrt(rank + 1.0)
+    angle = rank * _GOLDEN_ANGLE
+    positions[tracks, 0] = positions[anchors, 0] + radius * np.cos(angle)
+    positions[tracks, 1] = positions[anchors, 1] + radius * np.sin(angle)
+
+    loose = np.zeros(len(dense), dtype=bool)
+    loose[dense] = True
+    loose[tracks] = False
+    loose = np.flatnonzero(loose)
+    if len(loose):
+        placed = positions[~np.isin(np.arange(len(dense)), loose)]
+        outer = (np.abs(placed).max() if len(placed) else 0.0) + 4 * EDGE_LENGTH
+        angle = np.arange(len(loose)) * (2 * math.pi / len(loose))
+        ring = max(outer, TRACK_SPACING * len(loose) / (2 * math.pi))
+        positions[loose, 0] = ring * np.cos(angle)
+        positions[loose, 1] = ring * np.sin(angle)
+
+
+def _force_layout(count, u, v):
+    """Fruchterman-Reingold over count nodes joined by the (u, v) springs; the ideal distance is 1."""
+    rng = np.random.default_rng(SEED)
+    side = math.sqrt(count)
+    positions = rng.uniform(-side / 2, side / 2, (count, 2))
+    exact = count <= EXACT_MAX
+    iterations = EXACT_ITERATIONS if exact else GRID_ITERATIONS
+    temperature = side / 10
+    for step in range(iterations):
+        displacement = _exact_repulsion(positions) if exact else _grid_repulsion(positions)
+        delta = positions[u] - positions[v]
+        distance = np.hypot(delta[:, 0], delta[:, 1]) + 1e-9
+        pull = delta * distance[:, None]  # |d|^2 / k along d / |d|, k = 1
+        displacement -= GRAVITY * positions  # keeps disconnected components from drifting apart
+        for axis in (0, 1):
+            displacement[:, axis] -= np.bincount(u, pull[:, axis], count)
+            displacement[:, axis] += np.bincount(v, pull[:, axis], count)
+        length = np.hypot(displacement[:, 0], displacement[:, 1]) + 1e-9
+        limit = temperature * (1 - step / iterations) + 0.01
+        positions += displacement * (np.minimum(length, limit) / length)[:, None]
+        time.sleep(0)  # let requests in between (a cooperative yield under gevent)
+    return positions - positions.mean(axis=0)
+
+
+def _exact_repulsion(positions):
+    """Return the k^2 / r push on every node from every other one."""
+    x, y = positions[:, 0].copy(), positions[:, 1].copy()
+    force = np.empty_like(positions)
+    for start in range(0, len(x), _CHUNK):
+        dx = x[start : start + _CHUNK, None] - x
+        dy = y[start : start + _CHUNK, None] - y
+        inverse = dx * dx
+        inverse += dy * dy
+        inverse += 1e-9
+        np.reciprocal(inverse, out=inverse)
+        force[start : start + _CHUNK, 0] = (dx * inverse).sum(axis=1)
+        force[start : start + _CHUNK, 1] = (dy * inverse).sum(axis=1)
+    return force
+
+
+def _grid_repulsion(positions):
+    """Approximate _exact_repulsion: bin nodes on a grid and convolve the counts with the force kernel."""
+    low = positions.min(axis=0)
+    cell = (positions.max(axis=0) - low).max() / (GRID - 1) + 1e-9
+    cells = ((positions - low) / cell).astype(np.int64)
+    flat = cells[:, 0] * GRID + cells[:, 1]
+    density = np.bincount(flat, minlength=GRID * GRID).reshape(GRID, GRID)
+    spectrum = np.fft.rfft2(density, s=(2 * GRID, 2 * GRID))
+    force = np.empty_like(positions)
+    for axis, kernel in enumerate(_kernel_spectra()):
+        field = np.fft.irfft2(spectrum * kernel, s=(2 * GRID, 2 * GRID))
+        force[:, axis] = field[cells[:, 0], cells[:, 1]] / cell
+    # The kernel leaves out a node's own cell: push apart nodes sharing one exactly (up to CELL_PAIRS + 1 per cell).
+    order = np.argsort(flat, kind="stable")
+    for gap in range(1, CELL_PAIRS + 1):
+        first, second = order[:-gap], order[gap:]
+        same = flat[first] == flat[second]
+        if not same.any():
+            break
+        first, second = first[same], second[same]
+        delta = positions[first] - positions[second]
+        push = delta / ((delta**2).sum(axis=1) + 1e-9)[:, None]
+        for axis in (0, 1):
+            force[:, axis] += np.bincount(first, push[:, axis], len(positions))
+            force[:, axis] -= np.bincount(second, push[:, axis], len(positions))
+    return force
+
+
+@functools.cache
+def _kernel_spectra():
+    """Return the spectra of the x and y push of one node at each cell offset, in cell units.
+
+    Offsets run -(GRID-1)..GRID-1, zero-padded to 2 * GRID so the convolution does not wrap.
+    """
+    offsets = np.fft.fftfreq(2 * GRID, 1 / (2 * GRID))
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    squared = dx**2 + dy**2
+    squared[0, 0] = np.inf  # nodes in the same cell do not push each other
+    return np.fft.rfft2(dx / squared), np.fft.rfft2(dy / squared)
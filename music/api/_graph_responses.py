@@ -0,0 +1,134 @@
+# Copyright (c) 2026 IndyKite
+"""Serialized, compressed /graph/data responses for one graph snapshot.
+
+Every /graph/data page is a pure function of the snapshot and the query
+string, so its JSON is encoded once - identity, gzip and (with the optional
+brotli package) br bytes side by side - and served from here afterwards,
+with a strong ETag per encoding so a browser revalidating gets a bare 304:
+
+ - pinned entries hold the hot views (the default listing and the
+   include_tracks pages); graph_view warms them when a snapshot is opened and
+   they live as long as it does, up to MAX_PINNED_BYTES - past that a hot
+   page is cached like any other, so a big graph's include_tracks pages
+   cannot pin several times the snapshot's own size;
+ - everything else (expansions, filtered listings) goes into an LRU bounded
+   at MAX_ENTRIES / MAX_BYTES.
+
+One ResponseCache belongs to one GraphIndex (GraphIndex.cached), so a new
+snapshot starts with an empty cache and its bodies - and ETags - differ.
+ETags are a digest of the body, so every worker process hands out the same
+ones for the same snapshot.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional: pipenv run pip install brotli
+    brotli = None
+
+MAX_ENTRIES = 256
+MAX_BYTES = 32 * 1024 * 1024
+# Pinned bodies, every encoding counted; the default listing fits many times over.
+MAX_PINNED_BYTES = 4 * 1024 * 1024
+# Pinned entries are encoded once per snapshot, so they get the slower, denser levels.
+PINNED_LEVELS = {"gzip": 9, "br": 9}
+ON_DEMAND_LEVELS = {"gzip": 6, "br": 5}
+
+
+class EncodedResponse:
+    """One JSON body in every available Content-Encoding, plus its ETag."""
+
+    __slots__ = ("etag", "variants")
+
+    def __init__(self, payload, levels) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=levels["gzip"], mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=levels["br"])
+
+    @property
+    def size(self):
+        return sum(len(variant) for variant in self.variants.values())
+
+    def etag_for(self, encoding):
+        """Return the (unquoted) strong ETag of one encoding - each representation needs its own."""
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+
+class ResponseCache:
+    """Pinned hot views plus a bounded LRU of on-demand responses, all for one snapshot."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, max_pinned_bytes=MAX_PINNED_BYTES) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_pinned_bytes = max_pinned_bytes
+        self._pinned = {}
+        self._pinned_bytes = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "not_modified": 0}
+
+    def get(self, key):
+        """Return the EncodedResponse cached for key, or None."""
+        with self._lock:
+            entry = self._pinned.get(key)
+            if entry is None:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            self._stats["hits" if entry is not None else "misses"] += 1
+            return entry
+
+    def put(self, key, payload, *, pinned=False):
+        """Encode payload and cache it under key; return the entry.
+
+        Pinned entries are never evicted, but only while they fit in
+        max_pinned_bytes: one that does not goes into the LRU instead.
+        """
+        entry = EncodedResponse(payload, PINNED_LEVELS if pinned else ON_DEMAND_LEVELS)
+        with self._lock:
+            if pinned and key not in self._pinned and self._pinned_bytes + entry.size <= self.max_pinned_bytes:
+                self._pinned[key] = entry
+                self._pinned_bytes += entry.size
+                return entry
+            if key in self._pinned:
+                return self._pinned[key]
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+        return entry
+
+    def is_pinned(self, key):
+        with self._lock:
+            return key in self._pinned
+
+    def note_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "pinned": len(self._pinned),
+                "pinned_bytes": self._pinned_bytes,
+                "max_pinned_bytes": self.max_pinned_bytes,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "encodings": ["identity", "gzip"] + (["br"] if brotli is not None else []),
+            }
@@ -0,0 +1,211 @@
+# Copyright (c) 2026 IndyKite
+"""Search index over one graph snapshot's node labels and property values.
+
+Text is case- and accent-folded and split into word tokens. The index holds
+
+ - the vocabulary, sorted, so the tokens starting with a prefix are one
+   bisect range (type-ahead: the last query word is always a prefix);
+ - postings in CSR form: the nodes containing vocabulary token t are
+   postings[offsets[t]:offsets[t + 1]], each entry node * 2 + field where
+   field 0 is the display label (the _LABEL_PROPS values) and 1 any other
+   string property value;
+ - a trigram -> vocabulary token map, used when a query word matches no
+   token exactly or as a prefix (typos: "abbey rooad"). A swap inside a short
+   word can leave it no trigram in common with the intended token ("raod",
+   "road"), so words of up to SHORT_WORD letters also look up every string
+   one edit away (deletion, swap, substitution, insertion) in the vocabulary.
+
+A query word scores each node by its best match - exact > prefix > fuzzy,
+label > property - and a node must match every word (falling back to any
+word when nothing matches them all). Ties favor a label equal to or starting
+with the whole query, then better-connected nodes. Every posting scan is
+capped (MAX_SCAN), so a one-letter query stays fast on millions of Tracks.
+"""
+
+import heapq
+import logging
+import re
+import string
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+LABEL_WEIGHT = 2.0
+PROPERTY_WEIGHT = 1.0
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+# Per query word: prefix completions and fuzzy neighbours considered, and postings scanned.
+PREFIX_EXPANSIONS = 64
+PREFIX_SCAN = 5000
+FUZZY_EXPANSIONS = 16
+FUZZY_MIN_SIMILARITY = 0.45
+SHORT_WORD = 6
+_EDIT_ALPHABET = string.ascii_lowercase + string.digits
+MAX_SCAN = 200_000
+YIELD_EVERY = 10_000
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Casefold text and strip accents ("Beyoncé" -> "beyonce")."""
+    decomposed = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokens(text):
+    return _TOKEN.findall(normalize(text))
+
+
+def _trigrams(token):
+    padded = f"^{token}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _edits(word):
+    """Yield the strings one deletion, adjacent swap, substitution or insertion away from word."""
+    for i in range(len(word) + 1):
+        left, right = word[:i], word[i:]
+        if right:
+            yield left + right[1:]
+            if len(right) > 1:
+                yield left + right[1] + right[0] + right[2:]
+            for ch in _EDIT_ALPHABET:
+                yield left + ch + right[1:]
+        for ch in _EDIT_ALPHABET:
+            yield left + ch + right
+
+
+def _postings_by_token(ds):
+    """Return {token: [node * 2 + field, ...]} in node order - a label token is not repeated as a property."""
+    by_token = {}
+    for node in range(ds.node_count):
+        if node % YIELD_EVERY == 0:
+            time.sleep(0)  # let requests in between (a cooperative yield under gevent)
+        label_tokens = set(tokens(ds.labels[node]))
+        prop_tokens = set()
+        for value in ds.node_props(node).values():
+            if isinstance(value, str):
+                prop_tokens.update(tokens(value))
+        for token in label_tokens:
+            by_token.setdefault(token, []).append(node * 2)
+        for token in prop_tokens - label_tokens:
+            by_token.setdefault(token, []).append(node * 2 + 1)
+    return by_token
+
+
+class SearchIndex:
+    """Prefix, token and trigram-fuzzy lookup of node numbers for one GraphIndex."""
+
+    def __init__(self, ds) -> None:
+        """Tokenize every node's label and string properties (one pass over the snapshot)."""
+        started = time.perf_counter()
+        self.ds = ds
+        by_token = _postings_by_token(ds)
+        self.vocab = sorted(by_token)
+        self.offsets = array("I", [0])
+        self.postings = array("I")
+        for token in self.vocab:
+            self.postings.extend(by_token[token])
+            self.offsets.append(len(self.postings))
+        del by_token
+        self.trigrams = {}
+        for token_id, token in enumerate(self.vocab):
+            if len(token) >= 2:  # noqa: PLR2004 - one-letter tokens have no useful trigrams
+                for gram in _trigrams(token):
+                    self.trigrams.setdefault(gram, array("I")).append(token_id)
+        logger.info(
+            "Graph search index: %s tokens, %s postings, %s trigrams in %.2fs",
+            len(self.vocab),
+            len(self.postings),
+            len(self.trigrams),
+            time.perf_counter() - started,
+        )
+
+    def _frequency(self, token_id):
+        return self.offsets[token_id + 1] - self.offsets[token_id]
+
+    def _matches(self, word, *, prefix):
+        """Return [(token_id, quality)] for one query word: exact, then prefix completions, else fuzzy."""
+        matches = []
+        start = bisect_left(self.vocab, word)
+        if start < len(self.vocab) and self.vocab[start] == word:
+            matches.append((start, EXACT))
+            start += 1
+        if prefix:
+            end = bisect_left(self.vocab, word + "\U0010ffff", start, min(len(self.vocab), start + PREFIX_SCAN))
+            completions = heapq.nlargest(PREFIX_EXPANSIONS, range(start, end), key=self._frequency)
+            matches.extend((token_id, PREFIX * len(word) / len(self.vocab[token_id])) for token_id in completions)
+        if matches or len(word) < 3:  # noqa: PLR2004 - too short to match fuzzily
+            return matches
+        return self._fuzzy(word)
+
+    def _fuzzy(self, word):
+        """Return [(token_id, quality)] for the tokens most similar to word: shared trigrams, or one edit away."""
+        grams = _trigrams(word)
+        shared = {}
+        for gram in grams:
+            for token_id in self.trigrams.get(gram, ()):
+                shared[token_id] = shared.get(token_id, 0) + 1
+        similar = {}
+        for token_id, common in shared.items():
+            # Dice coefficient; a padded token of length n has n trigrams.
+            similarity = 2 * common / (len(grams) + len(self.vocab[token_id]))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                similar[token_id] = similarity
+        if len(word) <= SHORT_WORD:
+            for candidate in set(_edits(word)):
+                token_id = self._token_id(candidate)
+                if token_id is not None:
+                    similar[token_id] = max(similar.get(token_id, 0.0), 1 - 1 / len(word))
+        best = heapq.nlargest(FUZZY_EXPANSIONS, similar.items(), key=lambda item: item[1])
+        return [(token_id, FUZZY * similarity) for token_id, similarity in best]
+
+    def _token_id(self, token):
+        """Return the vocabulary number of token, or None."""
+        position = bisect_left(self.vocab, token)
+        return position if position < len(self.vocab) and self.vocab[position] == token else None
+
+    def _word_scores(self, word, type_codes, *, prefix):
+        """Return {node: best score} for one query word (only nodes of type_codes, unless None)."""
+        scores = {}
+        scanned = 0
+        node_type = self.ds.node_type
+        for token_id, quality in self._matches(word, prefix=prefix):
+            label_score, prop_score = quality * LABEL_WEIGHT, quality * PROPERTY_WEIGHT
+            for entry in self.postings[self.offsets[token_id] : self.offsets[token_id + 1]]:
+                node = entry >> 1
+                if type_codes is not None and node_type[node] not in type_codes:
+                    continue
+                score = prop_score if entry & 1 else label_score
+                if score > scores.get(node, 0.0):
+                    scores[node] = score
+            scanned += self._frequency(token_id)
+            if scanned >= MAX_SCAN:
+                break
+        return scores
+
+    def search(self, query, limit=10, type_codes=None):
+        """Return [(node, score)] for the best `limit` matches of query, best first."""
+        words = tokens(query)
+        if not words:
+            return []
+        per_word = [self._word_scores(word, type_codes, prefix=i == len(words) - 1) for i, word in enumerate(words)]
+        per_word.sort(key=len)
+        scores = {node: score for node, score in per_word[0].items() if all(node in other for other in per_word[1:])}
+        for other in per_word[1:]:
+            for node in scores:
+                scores[node] += other[node]
+        if not scores:
+            for word_scores in per_word:
+                for node, score in word_scores.items():
+                    scores[node] = scores.get(node, 0.0) + score
+        whole = " ".join(words)
+        ranked = []
+        # Label bonuses and the degree tie-break only for a shortlist - they read the string tables.
+        for node, score in heapq.nlargest(limit * 10, scores.items(), key=lambda item: item[1]):
+            label = " ".join(tokens(self.ds.labels[node]))
+            bonus = 3.0 if label == whole else 1.0 if label.startswith(whole) else 0.0
+            ranked.append((score + bonus, self.ds.degree(node), node))
+        return [(node, round(score, 3)) for score, _, node in heapq.nlargest(limit, ranked)]
@@ -0,0 +1,160 @@
+# Copyright (c) 2026 IndyKite
+"""Bounded traversals over a GraphIndex's CSR adjacency.
+
+ - k_hop: breadth-first neighborhood up to k relationships out, expanding at
+   most budget.fanout neighbors per node (the best-connected first) and only into
+   the allowed node types;
+ - shortest_path: bidirectional BFS between two nodes, always growing the
+   smaller frontier, through allowed node types only;
+ - induced_edges: the relationships among a set of nodes.
+
+Relationships are followed in both directions. Every call takes a Budget
+(visited nodes, collected edges, wall time) and stops where it runs out
+instead of pinning the worker: results are then partial and the budget's
+`exceeded` says which limit was hit. Callers report it as `truncated`.
+"""
+
+import heapq
+import time
+
+# Check the clock every this many steps; cheaper than on every edge.
+_CLOCK_EVERY = 1024
+
+
+class Budget:
+    """Node, edge, per-node fan-out and time caps shared by one request's traversals."""
+
+    def __init__(self, max_nodes, max_edges, seconds, fanout=None) -> None:
+        """Start the clock now."""
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.fanout = fanout
+        self.deadline = time.monotonic() + seconds
+        self.exceeded = None
+        self._steps = 0
+
+    def tick(self):
+        """Count one step; return False once the time is up."""
+        self._steps += 1
+        if self._steps % _CLOCK_EVERY == 0 and time.monotonic() > self.deadline:
+            self.exceeded = self.exceeded or "time"
+        return self.exceeded != "time"
+
+    def stop(self, reason):
+        """Record why a traversal stopped early (the first reason wins)."""
+        self.exceeded = self.exceeded or reason
+
+
+def _allowed(ds, type_codes):
+    if type_codes is None:
+        return lambda _node: True
+    node_type = ds.node_type
+    return lambda node: node_type[node] in type_codes
+
+
+def k_hop(ds, start, hops, budget, type_codes=None):
+    """Return {node: distance} for the nodes within `hops` relationships of start (start at 0).
+
+    Each node contributes at most budget.fanout not-yet-seen neighbors of the
+    allowed types, the highest-degree ones first; nodes beyond the cap are
+    skipped (budget.exceeded = "fanout") but can still be reached through
+    another node. Stops at budget.max_nodes nodes or when time is up.
+    """
+    allowed = _allowed(ds, type_codes)
+    distance = {start: 0}
+    frontier = [start]
+    for depth in range(1, hops + 1):
+        reached = []
+        for node in frontier:
+            fresh = []
+            for edge in ds.incident(node):
+                if not budget.tick():
+                    return distance
+                other = ds.other(edge, node)
+                if other not in distance and allowed(other):
+                    fresh.append(other)
+            fresh = list(dict.fromkeys(fresh))
+            if budget.fanout is not None and len(fresh) > budget.fanout:
+                budget.stop("fanout")
+                fresh = heapq.nlargest(budget.fanout, fresh, key=ds.degree)
+            for other in fresh:
+                if len(distance) >= budget.max_nodes:
+                    budget.stop("nodes")
+                    return distance
+                distance[other] = depth
+                reached.append(other)
+        frontier = reached
+        if not frontier:
+            break
+    return distance
+
+
+def shortest_path(ds, source, target, budget, type_codes=None):
+    """Return ([nodes], [edges]) of a shortest path from source to target, or None if there is none.
+
+    Intermediate nodes must be of the allowed types (the endpoints need not
+    be). None is also returned when the budget runs out first - check
+    budget.exceeded to tell the two apart.
+    """
+    if source == target:
+        return [source], []
+    allowed = _allowed(ds, type_codes)
+    # node -> (previous node, edge) on each side; the roots map to None.
+    parents = ({source: None}, {target: None})
+    frontiers = ([source], [target])
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other_seen = parents[side], parents[1 - side]
+        reached = []
+        for node in frontiers[side]:
+            for edge in ds.incident(node):
+                if not budget.tick():
+                    return None
+                nxt = ds.other(edge, node)
+                if nxt in seen:
+                    continue
+                if nxt in other_seen:
+                    seen[nxt] = (node, edge)
+                    return _join(parents, nxt)
+                if not allowed(nxt):
+                    continue
+                if len(parents[0]) + len(parents[1]) >= budget.max_nodes:
+                    budget.stop("nodes")
+                    return None
+                seen[nxt] = (node, edge)
+                reached.append(nxt)
+        frontiers = (reached, frontiers[1]) if side == 0 else (frontiers[0], reached)
+    return None
+
+
+def _join(parents, meet):
+    """Stitch the two half-paths that meet at `meet` into source -> target order."""
+    halves = []
+    for parent in parents:
+        nodes, edges = [meet], []
+        step = parent[meet]
+        while step is not None:
+            node, edge = step
+            nodes.append(node)
+            edges.append(edge)
+            step = parent[node]
+        halves.append((nodes, edges))
+    (forward_nodes, forward_edges), (backward_nodes, backward_edges) = halves
+    return forward_nodes[::-1] + backward_nodes[1:], forward_edges[::-1] + backward_edges
+
+
+def induced_edges(ds, nodes, budget):
+    """Return the relationship numbers whose endpoints are both in nodes, up to budget.max_edges."""
+    members = nodes if isinstance(nodes, set | dict) else set(nodes)
+    edges = set()
+    for node in members:
+        for edge in ds.incident(node):
+            if not budget.tick():
+                return sorted(edges)
+            other = ds.other(edge, node)
+            if other <= node and other in members and edge not in edges:
+                if len(edges) >= budget.max_edges:
+                    budget.stop("edges")
+                    return sorted(edges)
+                edges.add(edge)
+    return sorted(edges)
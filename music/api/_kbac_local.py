@@ -0,0 +1,601 @@
+# Copyright (c) 2026 IndyKite
+"""Evaluate KBAC policies locally, against an in-memory copy of the dataset graph.
+
+Every policy change otherwise has to be created on the platform before its
+effect on decisions can be seen. Here the manifest's KBAC policies are
+compiled once and AuthZEN-shaped requests are answered from a graph built
+from the dataset's nodes and relationships files - for shadow testing a
+policy edit over every subject x resource cell before publishing it.
+
+The graph keeps an index per node type/label and, per node, its outgoing and
+incoming neighbours grouped by relationship type, so a policy is evaluated
+as one traversal from the subject that yields every resource it reaches;
+parts of a condition that do not depend on the subject are computed once per
+policy. Decisions are allow-if-any: a request is allowed when an ACTIVE
+policy for its subject type, action and resource type matches.
+
+The supported condition language is the Cypher subset the manifests use:
+
+ - one or more MATCH clauses of comma-separated node/relationship chains,
+   e.g. (subject:User)-[:WORKS_IN]->(d:Department)-[:CAN_RETRIEVE]->(resource:Quote);
+ - relationship types with |, any direction, and variable length (*, *n, *n..m);
+ - inline node properties ({name: 'x'});
+ - a WHERE of AND/OR/NOT comparisons (= <> < <= > >=, IS [NOT] NULL) between
+   subject/resource properties (x.property.name, x.external_id) and literals.
+
+Anything else (shared intermediate variables, filters, RETURN/WITH, ...)
+makes the policy unsupported; LocalEvaluator.unsupported says why. Unlike
+Cypher, a path may reuse a relationship, which can only over-approximate a
+match - never hide one.
+"""
+
+import json
+import re
+from collections import OrderedDict
+
+MAX_HOPS = 15  # upper bound for an open-ended variable-length relationship (*, *n..)
+ALLOWED_CACHE_MAX = 8192  # (policy, subject) traversals kept for repeated requests
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<string>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")"
+    r"|(?P<number>\d+\.\d+|\d+)"
+    r"|(?P<name>[A-Za-z_]\w*|`[^`]+`)"
+    r"|(?P<symbol><-|->|\.\.|<>|!=|<=|>=|[()\[\]{}:,|*\-<>=.]))",
+)
+_COMPARISONS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+_BOUND = ("subject", "resource")
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            msg = f"unexpected input at {text[position : position + 20]!r}"
+            raise ValueError(msg)
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1].encode().decode("unicode_escape")
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif value.startswith("`"):
+            value = value[1:-1]
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser for the supported Cypher subset."""
+
+    def __init__(self, text) -> None:
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self, value=None, kind=None):
+        if self.position >= len(self.tokens):
+            return False
+        found_kind, found_value = self.tokens[self.position]
+        if kind is not None and found_kind != kind:
+            return False
+        if value is None:
+            return True
+        if found_kind == "name" and isinstance(found_value, str):
+            return found_value.upper() == value.upper()
+        return found_kind == "symbol" and found_value == value
+
+    def take(self, value=None, kind=None):
+        if not self.peek(value, kind):
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of condition"
+            msg = f"expected {value or kind!r}, found {found!r}"
+            raise ValueError(msg)
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def condition(self):
+        """Return ([pattern, ...], where-callable or None)."""
+        patterns = []
+        while self.peek("MATCH"):
+            self.take()
+            patterns.append(self.pattern())
+            while self.peek(","):
+                self.take()
+                patterns.append(self.pattern())
+        if not patterns:
+            msg = "condition must start with MATCH"
+            raise ValueError(msg)
+        where = None
+        if self.peek("WHERE"):
+            self.take()
+            where = self.or_expression()
+        if self.position < len(self.tokens):
+            msg = f"unsupported clause at {self.tokens[self.position][1]!r}"
+            raise ValueError(msg)
+        return patterns, where
+
+    def pattern(self):
+        """Return a chain as {"nodes": [...], "rels": [...]} (len(rels) == len(nodes) - 1)."""
+        nodes = [self.node()]
+        rels = []
+        while self.peek("-") or self.peek("<-"):
+            rels.append(self.relationship())
+            nodes.append(self.node())
+        return {"nodes": nodes, "rels": rels}
+
+    def node(self):
+        self.take("(")
+        node = {"var": None, "label": None, "props": {}}
+        if self.peek(kind="name"):
+            node["var"] = self.take()
+        if self.peek(":"):
+            self.take()
+            node["label"] = self.take(kind="name")
+        if self.peek("{"):
+            self.take()
+            while not self.peek("}"):
+                key = self.take(kind="name")
+                self.take(":")
+                node["props"][key] = self.literal()
+                if not self.peek("}"):
+                    self.take(",")
+            self.take("}")
+        self.take(")")
+        return node
+
+    def relationship(self):
+        left = self.take()
+        rel = {"types": None, "min": 1, "max": 1}
+        if self.peek("["):
+            self.take()
+            if self.peek(kind="name"):
+                msg = f"relationship variable {self.take()!r} is not supported"
+                raise ValueError(msg)
+            if self.peek(":"):
+                self.take()
+                types = [self.take(kind="name")]
+                while self.peek("|"):
+                    self.take()
+                    if self.peek(":"):
+                        self.take()
+                    types.append(self.take(kind="name"))
+                rel["types"] = frozenset(types)
+            if self.peek("*"):
+                self.take()
+                rel["min"], rel["max"] = self.hops()
+            self.take("]")
+        right = self.take()
+        directions = {("-", "->"): "out", ("<-", "-"): "in", ("-", "-"): "both"}
+        if (left, right) not in directions:
+            msg = f"invalid relationship arrows {left}...{right}"
+            raise ValueError(msg)
+        rel["direction"] = directions[left, right]
+        return rel
+
+    def hops(self):
+        low = self.take(kind="number") if self.peek(kind="number") else None
+        if not self.peek(".."):
+            return (low, low) if low is not None else (1, MAX_HOPS)
+        self.take()
+        high = self.take(kind="number") if self.peek(kind="number") else MAX_HOPS
+        return (1 if low is None else low), min(high, MAX_HOPS)
+
+    def or_expression(self):
+        parts = [self.and_expression()]
+        while self.peek("OR"):
+            self.take()
+            parts.append(self.and_expression())
+        if len(parts) == 1:
+            return parts[0]
+
+        def either(bound):
+            values = [part(bound) for part in parts]
+            return True if True in values else None if None in values else False
+
+        return either
+
+    def and_expression(self):
+        parts = [self.not_expression()]
+        while self.peek("AND"):
+            self.take()
+            parts.append(self.not_expression())
+        if len(parts) == 1:
+            return parts[0]
+
+        def every(bound):
+            values = [part(bound) for part in parts]
+            return False if False in values else None if None in values else True
+
+        return every
+
+    def not_expression(self):
+        if self.peek("NOT"):
+            self.take()
+            inner = self.not_expression()
+            return lambda bound: None if (value := inner(bound)) is None else not value
+        if self.peek("("):
+            self.take()
+            inner = self.or_expression()
+            self.take(")")
+            return inner
+        return self.comparison()
+
+    def comparison(self):
+        left = self.operand()
+        if self.peek("IS"):
+            self.take()
+            negate = bool(self.peek("NOT")) and self.take() is not None
+            self.take("NULL")
+            return lambda bound: (left(bound) is None) != negate
+        symbol = self.take(kind="symbol")
+        if symbol not in _COMPARISONS:
+            msg = f"unsupported operator {symbol!r}"
+            raise ValueError(msg)
+        right = self.operand()
+        compare = _COMPARISONS[symbol]
+
+        def evaluate(bound):
+            a, b = left(bound), right(bound)
+            if a is None or b is None:
+                return None
+            try:
+                return compare(a, b)
+            except TypeError:
+                return None
+
+        return evaluate
+
+    def operand(self):
+        if self.peek("-"):
+            self.take()
+            number = -self.take(kind="number")
+            return lambda _bound: number
+        if self.peek(kind="name") and self.position + 1 < len(self.tokens) and self.tokens[self.position + 1][1] == ".":
+            var = self.take()
+            if var not in _BOUND:
+                msg = f"WHERE may only use subject and resource, not {var!r}"
+                raise ValueError(msg)
+            self.take(".")
+            field = self.take(kind="name")
+            index = _BOUND.index(var)
+            if field == "property":
+                self.take(".")
+                prop = self.take(kind="name")
+                return lambda bound: bound[index][1].get(prop)
+            if field == "external_id":
+                return lambda bound: bound[index][0][1]
+            msg = f"unsupported field {var}.{field}"
+            raise ValueError(msg)
+        value = self.literal()
+        return lambda _bound: value
+
+    def literal(self):
+        if self.peek(kind="string") or self.peek(kind="number"):
+            return self.take()
+        if self.peek("-"):
+            self.take()
+            return -self.take(kind="number")
+        for word, value in (("TRUE", True), ("FALSE", False), ("NULL", None)):
+            if self.peek(word):
+                self.take()
+                return value
+        found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of condition"
+        msg = f"expected a value, found {found!r}"
+        raise ValueError(msg)
+
+
+class LocalGraph:
+    """Nodes keyed by (type, external_id), indexed by label and by neighbour per relationship type."""
+
+    def __init__(self) -> None:
+        self.props = {}
+        self.labels = {}
+        self.by_type = {}
+        self.by_label = {}
+        self.out = {}
+        self.inn = {}
+        self.relationship_count = 0
+
+    @classmethod
+    def from_records(cls, nodes, relationships) -> "LocalGraph":
+        """Build the graph from capture-format node and relationship dicts (any iterables)."""
+        graph = cls()
+        for node in nodes:
+            key = (node["type"], node["external_id"])
+            graph.props[key] = {p["type"]: p.get("value") for p in node.get("properties", [])}
+            graph.labels[key] = frozenset((node["type"], *node.get("labels", [])))
+            graph.by_type.setdefault(node["type"], []).append(key)
+            for label in graph.labels[key]:
+                graph.by_label.setdefault(label, set()).add(key)
+        for rel in relationships:
+            source = (rel["source"]["type"], rel["source"]["external_id"])
+            target = (rel["target"]["type"], rel["target"]["external_id"])
+            if source not in graph.props or target not in graph.props:
+                continue
+            graph.out.setdefault(source, {}).setdefault(rel["type"], []).append(target)
+            graph.inn.setdefault(target, {}).setdefault(rel["type"], []).append(source)
+            graph.relationship_count += 1
+        return graph
+
+    def neighbours(self, key, types, direction):
+        """Yield the nodes one relationship of `types` (None: any) away from key."""
+        sides = (self.out, self.inn) if direction == "both" else (self.out if direction == "out" else self.inn,)
+        for side in sides:
+            by_type = side.get(key)
+            if not by_type:
+                continue
+            if types is None:
+                for targets in by_type.values():
+                    yield from targets
+            else:
+                for rel_type in types & by_type.keys():
+                    yield from by_type[rel_type]
+
+    def matches(self, key, node):
+        """Whether the graph node satisfies a pattern node's label and inline properties."""
+        if node["label"] is not None and node["label"] not in self.labels[key]:
+            return False
+        props = self.props[key]
+        return all(props.get(name) == value for name, value in node["props"].items())
+
+
+_REVERSED = {"out": "in", "in": "out", "both": "both"}
+
+
+def _reverse(steps):
+    """Turn the (rel, node) steps walking right-to-left into the same chain walked left-to-right."""
+    return [({**rel, "direction": _REVERSED[rel["direction"]]}, node) for rel, node in steps]
+
+
+def _walk(graph, frontier, steps):
+    """Return the nodes reachable from `frontier` along steps [(rel, node), ...]."""
+    for rel, node in steps:
+        reached = set(frontier) if rel["min"] == 0 else set()
+        if rel["min"] <= 1:
+            seen = set(frontier)
+            level = frontier
+            for _ in range(max(rel["max"], 1)):
+                level = {n for key in level for n in graph.neighbours(key, rel["types"], rel["direction"])} - seen
+                if not level:
+                    break
+                seen |= level
+                reached |= level
+        else:
+            # Exactly-n-hop sets cannot skip nodes already seen at a shorter distance.
+            level = frontier
+            for hop in range(1, rel["max"] + 1):
+                level = {n for key in level for n in graph.neighbours(key, rel["types"], rel["direction"])}
+                if hop >= rel["min"]:
+                    reached |= level
+        frontier = {key for key in reached if graph.matches(key, node)}
+        if not frontier:
+            break
+    return frontier
+
+
+class _CompiledPolicy:
+    """One KBAC policy entry with its condition parsed into walkable chains."""
+
+    def __init__(self, entry) -> None:
+        body = entry.get("policy", {})
+        if isinstance(body, str):
+            body = json.loads(body)
+        self.name = entry.get("name", "")
+        self.subject_type = body.get("subject", {}).get("type")
+        self.resource_type = body.get("resource", {}).get("type")
+        self.actions = frozenset(body.get("actions", []))
+        condition = body.get("condition", {})
+        if set(condition) - {"cypher"}:
+            msg = f"condition keys {sorted(set(condition) - {'cypher'})} are not supported"
+            raise ValueError(msg)
+        if not (self.subject_type and self.resource_type and self.actions):
+            msg = "policy needs a subject type, a resource type and actions"
+            raise ValueError(msg)
+        self.patterns, self.where = _Parser(condition.get("cypher", "")).condition()
+        names = [n["var"] for p in self.patterns for n in p["nodes"] if n["var"]]
+        shared = sorted({n for n in names if names.count(n) > 1 and n not in _BOUND})
+        if shared:
+            msg = f"variables used more than once are not supported: {shared}"
+            raise ValueError(msg)
+        for pattern in self.patterns:
+            for var, node_type in zip(_BOUND, (self.subject_type, self.resource_type), strict=True):
+                vars_ = [n["var"] for n in pattern["nodes"]]
+                if vars_.count(var) > 1:
+                    msg = f"{var} appears twice in one pattern"
+                    raise ValueError(msg)
+                if var in vars_ and pattern["nodes"][vars_.index(var)]["label"] not in {None, node_type}:
+                    msg = f"{var} is labelled differently from the policy's {var} type {node_type}"
+                    raise ValueError(msg)
+        self._fixed = None
+
+    @staticmethod
+    def _position(pattern, var) -> int | None:
+        return next((i for i, node in enumerate(pattern["nodes"]) if node["var"] == var), None)
+
+    @staticmethod
+    def _side(pattern, index, step) -> list:
+        """Return the (rel, node) steps from nodes[index] towards one end of the chain (step +1 right, -1 left)."""
+        if step > 0:
+            return list(zip(pattern["rels"][index:], pattern["nodes"][index + 1 :], strict=True))
+        return _reverse(list(zip(pattern["rels"][:index][::-1], pattern["nodes"][:index][::-1], strict=True)))
+
+    def _extends(self, graph, pattern, index, key):
+        """Whether the chain matches on both sides of nodes[index] = key."""
+        return (
+            graph.matches(key, pattern["nodes"][index])
+            and bool(_walk(graph, {key}, self._side(pattern, index, +1)))
+            and bool(_walk(graph, {key}, self._side(pattern, index, -1)))
+        )
+
+    def _fixed_constraints(self, graph):
+        """Evaluate the subject-independent chains once: (gate, resource candidates or None)."""
+        if self._fixed is None:
+            gate, candidates = True, None
+            for pattern in self.patterns:
+                if self._position(pattern, "subject") is not None:
+                    continue
+                r = self._position(pattern, "resource")
+                if r is not None:
+                    found = {
+                        k for k in graph.by_type.get(self.resource_type, []) if self._extends(graph, pattern, r, k)
+                    }
+                    candidates = found if candidates is None else candidates & found
+                else:
+                    first = pattern["nodes"][0]
+                    pool = graph.by_label.get(first["label"], ()) if first["label"] else graph.props
+                    gate = gate and any(self._extends(graph, pattern, 0, k) for k in pool)
+            self._fixed = (gate, candidates)
+        return self._fixed
+
+    def _reach(self, graph, pattern, subject):
+        """Return the resources one subject chain reaches: None (no resource in it) when it matches, else a set."""
+        s = self._position(pattern, "subject")
+        r = self._position(pattern, "resource")
+        if r is None:
+            return None if self._extends(graph, pattern, s, subject) else set()
+        step = 1 if r > s else -1
+        # The far side of the subject must match too, but does not depend on the resource.
+        far_side = self._side(pattern, s, -step)
+        if not graph.matches(subject, pattern["nodes"][s]) or not _walk(graph, {subject}, far_side):
+            return set()
+        between = self._side(pattern, s, step)[: abs(r - s)]
+        return {
+            key
+            for key in _walk(graph, {subject}, between)
+            if key[0] == self.resource_type and _walk(graph, {key}, self._side(pattern, r, step))
+        }
+
+    def allowed(self, graph, subject):
+        """Return the set of resource keys this policy allows `subject` (a node key) on."""
+        if subject not in graph.props or subject[0] != self.subject_type:
+            return set()
+        gate, candidates = self._fixed_constraints(graph)
+        if not gate:
+            return set()
+        for pattern in self.patterns:
+            if self._position(pattern, "subject") is None:
+                continue
+            found = self._reach(graph, pattern, subject)
+            if found is not None:
+                candidates = found if candidates is None else candidates & found
+            if candidates is not None and not candidates:
+                return set()
+        if candidates is None:
+            candidates = set(graph.by_type.get(self.resource_type, []))
+        if self.where is None:
+            return candidates
+        subject_bound = (subject, graph.props[subject])
+        return {key for key in candidates if self.where((subject_bound, (key, graph.props[key]))) is True}
+
+
+class LocalEvaluator:
+    """Answer AuthZEN evaluations from a LocalGraph and a list of KBAC policy entries."""
+
+    def __init__(self, graph, policies) -> None:
+        self.graph = graph
+        self.policies = []
+        self.unsupported = {}
+        for entry in policies:
+            if entry.get("status", "ACTIVE") != "ACTIVE":
+                continue
+            try:
+                self.policies.append(_CompiledPolicy(entry))
+            except (ValueError, TypeError, AttributeError) as exc:
+                self.unsupported[entry.get("name", "")] = str(exc)
+        self._allowed = OrderedDict()
+
+    def groups(self):
+        """Return the (subject type, action, resource type) triples any policy decides, in policy order."""
+        seen = {}
+        for policy in self.policies:
+            for action in sorted(policy.actions):
+                seen.setdefault((policy.subject_type, action, policy.resource_type), None)
+        return list(seen)
+
+    def allowed(self, subject_type, subject_id, action, resource_type):
+        """Return {resource id: [granting policy names]} for one subject, action and resource type."""
+        subject = (subject_type, subject_id)
+        out = {}
+        for policy in self.policies:
+            if (
+                policy.subject_type != subject_type
+                or policy.resource_type != resource_type
+                or action not in policy.actions
+            ):
+                continue
+            cache_key = (policy.name, subject)
+            resources = self._allowed.get(cache_key)
+            if resources is None:
+                resources = self._allowed[cache_key] = policy.allowed(self.graph, subject)
+                while len(self._allowed) > ALLOWED_CACHE_MAX:
+                    self._allowed.popitem(last=False)
+            else:
+                self._allowed.move_to_end(cache_key)
+            for _type, resource_id in resources:
+                out.setdefault(resource_id, []).append(policy.name)
+        return out
+
+    def evaluate(self, evaluation):
+        """Answer one /access/v1/evaluation body: {"decision": bool}, plus the granting policies as context."""
+        subject = evaluation.get("subject") or {}
+        resource = evaluation.get("resource") or {}
+        action = (evaluation.get("action") or {}).get("name")
+        granted = self.allowed(subject.get("type"), subject.get("id"), action, resource.get("type")).get(
+            resource.get("id"),
+        )
+        if granted:
+            return {"decision": True, "context": {"policies": granted}}
+        return {"decision": False}
+
+    def evaluations(self, body):
+        """Answer an /access/v1/evaluations body; top-level subject/resource/action are the defaults."""
+        defaults = {k: body[k] for k in ("subject", "resource", "action", "context") if k in body}
+        items = body.get("evaluations") or [{}]
+        return {"evaluations": [self.evaluate({**defaults, **item}) for item in items]}
+
+
+def sweep(evaluator, groups=None):
+    """Yield (group, subject id, {resource id: policies}) for every subject of every group's subject type."""
+    for group in groups or evaluator.groups():
+        subject_type, action, resource_type = group
+        for _type, subject_id in evaluator.graph.by_type.get(subject_type, []):
+            yield group, subject_id, evaluator.allowed(subject_type, subject_id, action, resource_type)
+
+
+def diff(before, after):
+    """Yield the cells whose decision differs between two evaluators over the same graph.
+
+    Each change is {subject_type, subject_id, action, resource_type,
+    resource_id, change: "granted"|"revoked", policies}, where policies are
+    the granting policies on the side that allows.
+    """
+    groups = list(dict.fromkeys(before.groups() + after.groups()))
+    for (group, subject_id, old), (_group, _subject_id, new) in zip(
+        sweep(before, groups),
+        sweep(after, groups),
+        strict=True,
+    ):
+        if old.keys() == new.keys():
+            continue
+        subject_type, action, resource_type = group
+        for resource_id in sorted(old.keys() ^ new.keys()):
+            granted = resource_id in new
+            yield {
+                "subject_type": subject_type,
+                "subject_id": subject_id,
+                "action": action,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "change": "granted" if granted else "revoked",
+                "policies": (new if granted else old)[resource_id],
+            }
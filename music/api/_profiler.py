@@ -0,0 +1,278 @@
+# Copyright (c) 2026 IndyKite
+"""Per-run profiling for the provisioning stream.
+
+A provisioning run takes anywhere from a few minutes to the better part of an
+hour, and almost all of it is waiting: on the IKG to provision, on the agent
+settle, on the platform's error cache before a capture retry, and on the
+platform round trips themselves. A RunProfile records, per step and substep,
+the wall time, the platform round trips and bytes sent, the retries and the
+time spent sleeping, so the run's `done` event can say where the time went.
+
+Every run is also exported as a Chrome trace-event file (load it in
+chrome://tracing or https://ui.perfetto.dev): steps, substeps, sleeps and each
+platform request become slices on a timeline, which makes two runs easy to
+compare side by side.
+
+Round trips are recorded by api/_platform.py, which every platform call
+goes through, against the profile of the context making the call: the run's
+own thread (recording) and the capture workers it fans out to, which carry
+the profile along (propagate). Calls made by any other request - another
+user's, on another thread or greenlet of the same worker - are never counted,
+so two runs at once each see only their own.
+"""
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(__file__).parent.parent / "profiles"
+# Oldest trace files beyond this many are pruned on export.
+PROFILE_KEEP = 20
+
+# The profile of the run executing on this thread (or greenlet, under gevent);
+# None everywhere else.
+_local = threading.local()
+
+
+class RunProfile:
+    """Timings and counters for one run, plus the trace events to export."""
+
+    def __init__(self, name) -> None:
+        self.name = name
+        self.started_at = datetime.now(UTC)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._trace = []
+        self._steps = []
+        self._step = None
+        self._substep = None
+        self._threads = {}
+
+    def _now(self):
+        return time.perf_counter() - self._origin
+
+    def _tid(self):
+        # Small stable ids keep the trace viewer's thread lanes readable; the
+        # run's own thread is always lane 1.
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = len(self._threads) + 1
+        return self._threads[ident]
+
+    def _slice(self, name, category, start, end, args=None):
+        self._trace.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": 1,
+                "tid": self._tid(),
+                "args": args or {},
+            },
+        )
+
+    def begin_step(self, index, label):
+        """Open the timing record for one step (closing any substep left open)."""
+        with self._lock:
+            self._step = {
+                "index": index,
+                "label": label,
+                "start": self._now(),
+                "requests": 0,
+                "bytes_sent": 0,
+                "retries": 0,
+                "sleep_seconds": 0.0,
+                "substeps": [],
+            }
+            self._substep = None
+
+    def mark_substep(self, detail):
+        """Close the running substep (if any) and open a new one named by its progress detail."""
+        with self._lock:
+            if self._step is None:
+                return
+            now = self._now()
+            self._close_substep(now)
+            self._substep = {"detail": detail, "start": now}
+
+    def _close_substep(self, now):
+        if self._substep is None:
+            return
+        sub = self._substep
+        self._step["substeps"].append({"detail": sub["detail"], "wall_seconds": round(now - sub["start"], 3)})
+        self._slice(sub["detail"], "substep", sub["start"], now)
+        self._substep = None
+
+    def end_step(self, status):
+        """Close the current step with its final status."""
+        with self._lock:
+            step = self._step
+            if step is None:
+                return
+            now = self._now()
+            self._close_substep(now)
+            record = {
+                "index": step["index"],
+                "label": step["label"],
+                "status": status,
+                "wall_seconds": round(now - step["start"], 3),
+                "requests": step["requests"],
+                "bytes_sent": step["bytes_sent"],
+                "retries": step["retries"],
+                "sleep_seconds": round(step["sleep_seconds"], 3),
+                "substeps": step["substeps"],
+            }
+            self._steps.append(record)
+            self._slice(
+                step["label"],
+                "step",
+                step["start"],
+                now,
+                {key: record[key] for key in ("status", "requests", "bytes_sent", "retries", "sleep_seconds")},
+            )
+            self._step = None
+
+    def record_request(self, method, url, response, start, end):
+        """Count one platform round trip (response is None when it failed without one)."""
+        bytes_sent = _body_size(response.request.body) if response is not None else 0
+        status = response.status_code if response is not None else 0
+        with self._lock:
+            if self._step is not None:
+                self._step["requests"] += 1
+                self._step["bytes_sent"] += bytes_sent
+            # Path only: query strings can carry ids, never log anything more.
+            path = urlsplit(url).path
+            self._slice(
+                f"{method} {path}",
+                "http",
+                start - self._origin,
+                end - self._origin,
+                {"status": status, "bytes_sent": bytes_sent},
+            )
+
+    def record_sleep(self, seconds, reason, start):
+        with self._lock:
+            if self._step is not None:
+                self._step["sleep_seconds"] += seconds
+            self._slice(f"sleep: {reason}", "sleep", start - self._origin, start - self._origin + seconds)
+
+    def record_retry(self, reason):
+        with self._lock:
+            if self._step is not None:
+                self._step["retries"] += 1
+            self._trace.append(
+                {
+                    "name": f"retry: {reason}",
+                    "cat": "retry",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": round(self._now() * 1e6),
+                    "pid": 1,
+                    "tid": self._tid(),
+                },
+            )
+
+    def summary(self):
+        """Return the JSON-ready timings for the run's `done` event."""
+        with self._lock:
+            steps = list(self._steps)
+        return {
+            "wall_seconds": round(self._now(), 3),
+            "requests": sum(s["requests"] for s in steps),
+            "bytes_sent": sum(s["bytes_sent"] for s in steps),
+            "retries": sum(s["retries"] for s in steps),
+            "sleep_seconds": round(sum(s["sleep_seconds"] for s in steps), 3),
+            "steps": steps,
+        }
+
+    def trace(self):
+        """Return the run as a Chrome trace-event document."""
+        with self._lock:
+            events = list(self._trace)
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": 1,
+                "args": {"name": f"{self.name} {self.started_at:%Y-%m-%d %H:%M:%S}"},
+            },
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": {"run": self.name}}
+
+    def export(self, directory=PROFILE_DIR):
+        """Write the trace file (pruning old ones) and return its path, or None when writing failed."""
+        path = directory / f"{self.name}-{self.started_at:%Y%m%d-%H%M%S}.json"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            with path.open("w") as f:
+                json.dump(self.trace(), f)
+            for old in sorted(directory.glob(f"{self.name}-*.json"))[:-PROFILE_KEEP]:
+                old.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Could not write the %s trace file", self.name)
+            return None
+        return path
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, bytes | bytearray):
+        return len(body)
+    return 0  # streamed/file bodies: size unknown without consuming them
+
+
+@contextlib.contextmanager
+def recording(profile):
+    """Record the calls, sleeps and retries of this thread against `profile` for the duration of the block."""
+    outer = getattr(_local, "profile", None)
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = outer
+
+
+def current_profile():
+    """Return the profile recording on this thread, or None."""
+    return getattr(_local, "profile", None)
+
+
+def propagate(fn):
+    """Wrap fn so it runs under the calling thread's profile - for work handed to a thread pool."""
+    profile = current_profile()
+    if profile is None:
+        return fn
+
+    def run(*args: object, **kwargs: object):
+        with recording(profile):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def timed_sleep(seconds, reason):
+    """time.sleep, recorded against this thread's profile (if any)."""
+    start = time.perf_counter()
+    time.sleep(seconds)
+    profile = current_profile()
+    if profile is not None:
+        profile.record_sleep(time.perf_counter() - start, reason, start)
+
+
+def note_retry(reason):
+    """Count one retry against the current step of this thread's profile (if any)."""
+    profile = current_profile()
+    if profile is not None:
+        profile.record_retry(reason)
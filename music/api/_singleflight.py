@@ -0,0 +1,105 @@
+# Copyright (c) 2026 IndyKite
+"""Coalesce identical in-flight CIQ executes into one upstream call.
+
+When a room full of people opens the same story step at once, every browser
+fires the same /contx-iq/v1/execute within a few milliseconds - all of them
+miss the result cache (api/_ciq_cache.py), because none has returned yet.
+Here the first caller (the leader) makes the call and every identical caller
+that arrives while it is in flight waits for it and gets the same response.
+
+Identical means same knowledge query id, same canonical input_params and the
+exact same tokens: the subject claims of a user token are not verified until
+the platform has seen it, so two different tokens never share a call, even for
+the same subject. Write queries are never coalesced - each one runs.
+
+The shared value is the requests.Response itself; every caller parses its
+own copy of the body with .json(), so nobody sees another caller's edits.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def flight_key(query_id, input_params, app_token, user_token=None):
+    """Key for one execute: query id, canonical params and the caller's exact tokens."""
+    canonical = json.dumps(input_params, sort_keys=True, separators=(",", ":"), default=str)
+    tokens = hashlib.sha256(f"{app_token}\x1f{user_token or ''}".encode()).hexdigest()
+    return f"{query_id}\x1f{canonical}\x1f{tokens}"
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run fn once per key at a time; concurrent callers with the same key share its outcome."""
+
+    def __init__(self) -> None:
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "leaders": 0, "coalesced": 0, "errors": 0, "max_waiters": 0}
+
+    def do(self, key, fn):
+        """Return (fn's result, shared) - shared is True when another caller's call was reused.
+
+        An exception raised by the leader's fn is re-raised in every waiting caller.
+        A None key (a write) always runs fn on its own.
+        """
+        if key is None:
+            return fn(), False
+        with self._lock:
+            self._stats["calls"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["leaders"] += 1
+            else:
+                flight.waiters += 1
+                self._stats["coalesced"] += 1
+                self._stats["max_waiters"] = max(self._stats["max_waiters"], flight.waiters)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except Exception as exc:
+            flight.error = exc
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.info("Coalesced %s identical CIQ executes into one upstream call", flight.waiters + 1)
+        return flight.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": len(self._flights),
+                "coalesced_rate": round(self._stats["coalesced"] / self._stats["calls"], 3)
+                if self._stats["calls"]
+                else 0.0,
+            }
+
+
+_flights = SingleFlight()
+
+
+def get_flights():
+    """Return the process-wide coalescing group for CIQ executes."""
+    return _flights
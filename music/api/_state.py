@@ -0,0 +1,308 @@
+# Copyright (c) 2026 IndyKite
+"""SQLite-backed state store for the music app's saved IDs, tokens and flags.
+
+Every value the app saves (PROJECT_ID, APP_TOKEN, CIQ_QUERY_ID_<slot>, the
+capture/readiness flags, ...) lives in one key/value table in state.db, opened
+in WAL mode: readers never block writers, and writers from several worker
+processes serialize on SQLite's own short write lock instead of a flock held
+around a whole-file read-modify-write.
+
+Connections are pooled per process and never wait inside SQLite: its busy
+handler is off, and a writer that finds the write lock taken polls for it
+with time.sleep, which under gunicorn's gevent worker yields to the other
+requests instead of stalling the whole worker for up to BUSY_TIMEOUT_SECONDS.
+
+Besides the saved values, the store keeps named counters (counter, bump) in a
+table of their own - not mirrored to .env nor os.environ - that every worker
+process sees: a per-process cache compares one to tell whether another worker
+invalidated it.
+
+Reads are served from an in-process cache. Every write bumps a version counter
+in the same transaction, so refresh() costs one indexed read (plus a stat of
+.env) and only reloads the table, and re-syncs os.environ, when another thread
+or worker actually changed something. Request hot paths call refresh() where
+they used to re-parse .env with load_dotenv, then read os.getenv as before.
+
+.env stays the human-facing file, for compatibility:
+ - import: a .env edited by hand (a different mtime/size than the one this
+   store last wrote or imported) replaces the store's contents on the next
+   refresh, exactly as load_dotenv(override=True) used to pick the edit up.
+   A missing .env imports nothing: deleting the file does not empty the store;
+ - export: every committed write updates the keys it changed in .env, in
+   place and inside the same write transaction, so the file mirrors the
+   store while comments, order and untouched lines (the layout copied from
+   .env.example) are kept. Values are written double-quoted with escapes, as
+   python-dotenv's set_key does, so spaces, "#" and newlines survive the
+   round trip. Only a missing .env is rendered from the whole table.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from dotenv import dotenv_values
+from dotenv.parser import parse_stream
+
+logger = logging.getLogger(__name__)
+
+STATE_DB = Path(__file__).parent.parent / "state.db"
+ENV_FILE = Path(__file__).parent.parent / ".env"
+# Seconds a writer waits for another process's write transaction to finish,
+# polling every BUSY_POLL_SECONDS.
+BUSY_TIMEOUT_SECONDS = 10
+BUSY_POLL_SECONDS = 0.02
+
+_EXPORT_HEADER = (
+    "# Mirrored from state.db (api/_state.py). Edit freely: a changed .env is\n"
+    "# imported back into the store on the next request.\n"
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, env_sig TEXT)",
+    "INSERT OR IGNORE INTO meta (id, version, env_sig) VALUES (1, 0, NULL)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+def _file_signature(path):
+    """Return a cheap change marker for a file (mtime + size), or "" when it does not exist."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return ""
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _env_line(key, value):
+    """Render KEY="value" the way python-dotenv reads it back: backslashes and double quotes escaped."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'{key}="{escaped}"\n'
+
+
+def _patch_env(text, changes):
+    """Return .env text with each changed key's binding replaced (or dropped), new keys appended."""
+    pending = dict(changes)
+    parts = []
+    for binding in parse_stream(io.StringIO(text)):
+        if binding.key not in changes:
+            parts.append(binding.original.string)
+        elif binding.key in pending:
+            value = pending.pop(binding.key)
+            if value is not None:
+                parts.append(_env_line(binding.key, value))
+        # else: a repeated line for a key already rewritten above - dropped
+    added = [_env_line(key, value) for key, value in pending.items() if value is not None]
+    if added and parts and not parts[-1].endswith("\n"):
+        parts[-1] += "\n"
+    return "".join(parts + added)
+
+
+def _when_free(action):
+    """Return action(), retried while another connection holds the write lock (sleeping, so gevent can switch)."""
+    deadline = time.monotonic() + BUSY_TIMEOUT_SECONDS
+    while True:
+        try:
+            return action()
+        except sqlite3.OperationalError as exc:
+            if exc.sqlite_errorcode != sqlite3.SQLITE_BUSY or time.monotonic() > deadline:
+                raise
+        time.sleep(BUSY_POLL_SECONDS)
+
+
+class StateStore:
+    """Key/value store with a version-checked read cache and a .env mirror."""
+
+    def __init__(self, db_path=STATE_DB, env_file=ENV_FILE) -> None:
+        self.db_path = db_path
+        self.env_file = env_file
+        self._idle = []
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._version = None
+        self._values = {}
+        # Keys this store has put into os.environ; only these are ever popped.
+        self._exported_environ = set()
+
+    # -- connection / transactions -------------------------------------------
+
+    def _connect(self):
+        # timeout=0: no busy wait inside SQLite, where gevent could not switch (see _when_free).
+        conn = sqlite3.connect(self.db_path, timeout=0, isolation_level=None, check_same_thread=False)
+        _when_free(lambda: conn.execute("PRAGMA journal_mode=WAL"))
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            _when_free(lambda statement=statement: conn.execute(statement))
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """Borrow a pooled connection: one caller at a time uses it, from whichever thread or greenlet."""
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            with self._pool_lock:
+                self._idle.append(conn)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Hold SQLite's write lock (BEGIN IMMEDIATE) around the block; commit, or roll back on error."""
+        with self._connection() as conn:
+            _when_free(lambda: conn.execute("BEGIN IMMEDIATE"))
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _write(self, changes):
+        """Apply changes ({key: value, or None to delete}) in one IMMEDIATE transaction and mirror them to .env."""
+        with self._transaction() as conn:
+            self._import_if_changed(conn)
+            conn.executemany(
+                "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, value) for key, value in changes.items() if value is not None],
+            )
+            deleted = [(key,) for key, value in changes.items() if value is None]
+            conn.executemany("DELETE FROM kv WHERE key = ?", deleted)
+            conn.execute("UPDATE meta SET version = version + 1 WHERE id = 1")
+            # Exported while still holding the write lock, so concurrent writers
+            # can never leave an older snapshot in the file.
+            self._export(conn, changes)
+            conn.execute("UPDATE meta SET env_sig = ? WHERE id = 1", (_file_signature(self.env_file),))
+        self.refresh()
+
+    # -- .env import / export ------------------------------------------------
+
+    def _import_if_changed(self, conn):
+        """Replace the table with .env when the file changed outside this store. Caller holds the write lock."""
+        signature = _file_signature(self.env_file)
+        (recorded,) = conn.execute("SELECT env_sig FROM meta WHERE id = 1").fetchone()
+        if signature == recorded:
+            return False
+        if not signature:
+            # Deleted (or never created): nothing to import, and the next write renders it again.
+            conn.execute("UPDATE meta SET env_sig = ? WHERE id = 1", (signature,))
+            return False
+        values = {key: value for key, value in (dotenv_values(self.env_file) or {}).items() if value is not None}
+        conn.execute("DELETE FROM kv")
+        conn.executemany("INSERT INTO kv (key, value) VALUES (?, ?)", values.items())
+        conn.execute("UPDATE meta SET version = version + 1, env_sig = ? WHERE id = 1", (signature,))
+        logger.info("Imported %s value(s) from %s into the state store", len(values), self.env_file.name)
+        return True
+
+    def _export(self, conn, changes):
+        """Rewrite the changed keys' lines of .env in place (or render the whole table when it is missing)."""
+        try:
+            text = self.env_file.read_text()
+        except FileNotFoundError:
+            rows = conn.execute("SELECT key, value FROM kv ORDER BY rowid").fetchall()
+            text = _EXPORT_HEADER + "".join(_env_line(key, value) for key, value in rows)
+        else:
+            text = _patch_env(text, changes)
+        tmp = self.env_file.with_name(self.env_file.name + ".tmp")
+        tmp.write_text(text)
+        tmp.replace(self.env_file)
+
+    def import_env(self):
+        """Force a .env import (normally automatic when the file changes); return True if it ran."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE meta SET env_sig = NULL WHERE id = 1")
+            imported = self._import_if_changed(conn)
+        self.refresh()
+        return imported
+
+    # -- reads ---------------------------------------------------------------
+
+    def refresh(self):
+        """Bring the read cache and os.environ up to date; cheap when nothing changed."""
+        with self._connection() as conn:
+            version, recorded_sig = conn.execute("SELECT version, env_sig FROM meta WHERE id = 1").fetchone()
+        if recorded_sig != _file_signature(self.env_file):
+            with self._transaction() as conn:
+                self._import_if_changed(conn)
+                (version,) = conn.execute("SELECT version FROM meta WHERE id = 1").fetchone()
+        if version == self._version:
+            return
+        with self._connection() as conn:
+            values = dict(conn.execute("SELECT key, value FROM kv ORDER BY rowid").fetchall())
+        with self._lock:
+            if version == self._version:
+                return
+            for key in self._exported_environ - values.keys():
+                os.environ.pop(key, None)
+            os.environ.update(values)
+            self._exported_environ = set(values)
+            self._values = values
+            self._version = version
+
+    def snapshot(self):
+        """Return a copy of every saved value (the dotenv_values(.env) replacement)."""
+        self.refresh()
+        return dict(self._values)
+
+    def get(self, key, default=None):
+        self.refresh()
+        return self._values.get(key, default)
+
+    def counter(self, name):
+        """Return the shared counter's current value (0 until first bumped); one indexed read."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    # -- writes --------------------------------------------------------------
+
+    def bump(self, name):
+        """Increment the shared counter (for every worker process) and return its new value."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+            (value,) = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return value
+
+    def set_many(self, values):
+        """Insert or update several keys in ONE transaction (and one .env export)."""
+        if not values:
+            return
+        self._write({key: str(value) for key, value in values.items()})
+
+    def delete(self, keys):
+        """Remove the given keys (from the store, .env and os.environ)."""
+        keys = list(keys)
+        if not keys:
+            return
+        self._write(dict.fromkeys(keys))
+        for key in keys:
+            os.environ.pop(key, None)
+
+    def retain(self, keep):
+        """Remove every key except those in `keep`; return the removed keys."""
+        keep = set(keep)
+        dropped = [key for key in self.snapshot() if key not in keep]
+        self.delete(dropped)
+        return dropped
+
+
+_store = {}
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store (opened on first use)."""
+    with _store_lock:
+        if "store" not in _store:
+            _store["store"] = StateStore()
+        return _store["store"]
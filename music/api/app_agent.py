@@ -8,6 +8,7 @@ from urllib.parse import quote
 import requests
 from api._env import remove_env_variables, update_env_variable
 from api._music_data import APP_AGENT_DEFAULTS
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -88,15 +89,7 @@ def _create_agent_credentials(
     logger.info("Creating credentials at: %s", credentials_url)
     logger.debug("Credentials payload: %s", json.dumps(credentials_data, indent=2))
 
-    creds_response = requests.post(
-        credentials_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=credentials_data,
-        timeout=30,
-    )
+    creds_response = config_request("POST", credentials_url, sa_token, json=credentials_data)
 
     logger.info("Credentials response status: %s", creds_response.status_code)
     logger.debug("Credentials response: %s", creds_response.text)
@@ -140,11 +133,11 @@ def _lookup_agent_by_name(url_endpoints: str, sa_token: str, name: str) -> str |
     same fixed name would otherwise dead-end on the conflict forever.
     """
     try:
-        response = requests.get(
+        response = config_request(
+            "GET",
             f"{url_endpoints}/configs/v1/application-agents/{quote(name, safe='')}",
+            sa_token,
             params={"location": os.getenv("PROJECT_ID", "")},
-            headers={"Authorization": f"Bearer {sa_token}"},
-            timeout=30,
         )
     except requests.RequestException:
         logger.exception("Agent lookup by name failed")
@@ -182,28 +175,13 @@ def create_app_agent():
     logger.info("Creating application agent at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     # Extract and save app agent ID if the request was successful
     app_agent_id_saved = False
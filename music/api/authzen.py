@@ -3,8 +3,9 @@ import json
 import logging
 import os
 
-import requests
+from api._authzen_gateway import evaluate
 from api._music_data import EVALUATION_SLOTS, EVALUATIONS, evaluation_for_slot, slot_to_path_suffix
+from api._platform import data_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -85,30 +86,18 @@ def evaluate_authzen():
     logger.info("Evaluating authorization at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "X-IK-ClientKey": app_token,
-        },
-        json=json_data,
-        timeout=30,
-    )
+    if path == "evaluation":
+        # Single checks go through the gateway: batched with concurrent ones, decisions cached briefly.
+        status_code, response_json = evaluate(url_endpoints, app_token, json_data)
+    else:
+        response = data_request("POST", api_url, app_token, json=json_data, idempotent=True)
+        logger.debug("Response headers: %s", response.headers)
+        logger.debug("Response text: %s", response.text)
+        status_code, response_json = response.status_code, parse_json(response)
 
-    logger.info("Response status: %s", response.status_code)
-    logger.debug("Response headers: %s", response.headers)
-    logger.debug("Response text: %s", response.text)
+    logger.info("Response status: %s", status_code)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
-
-    return render_template("authzen/result.html", response_json=response_json, status_code=response.status_code)
+    return render_template("authzen/result.html", response_json=response_json, status_code=status_code)
 
 
 # Expose the evaluation list for the index template.
@@ -3,13 +3,14 @@ import concurrent.futures
 import json
 import logging
 import os
-import time
 from pathlib import Path
 
 import ijson
 import requests
-from api._env import update_env_variable
-from dotenv import load_dotenv
+from api._ciq_cache import invalidate as invalidate_ciq_cache
+from api._env import refresh_env, update_env_variable
+from api._platform import data_request, parse_json
+from api._profiler import propagate
 from flask import Response, render_template, request, stream_with_context
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -50,10 +51,6 @@ RETRY_BACKOFF = 2.0  # seconds, doubled each retry
 HTTP_OK = 200
 HTTP_MULTIPLE_CHOICES = 300
 HTTP_BAD_REQUEST = 400
-HTTP_REQUEST_TIMEOUT = 408
-HTTP_TOO_MANY_REQUESTS = 429
-HTTP_SERVER_ERROR_MIN = 500
-HTTP_SERVER_ERROR_MAX = 600
 HTTP_CLIENT_TIMEOUT = 599  # local marker for an exhausted-retries timeout
 
 _PREVIEW_NODE_COUNT = 5
@@ -142,61 +139,36 @@ def _chunk_list(lst, chunk_size):
         yield chunk, min(1.0, (i + len(chunk)) / total)
 
 
-def _is_retryable_status(status: int) -> bool:
-    if status in {HTTP_REQUEST_TIMEOUT, HTTP_TOO_MANY_REQUESTS}:
-        return True
-    return HTTP_SERVER_ERROR_MIN <= status < HTTP_SERVER_ERROR_MAX
-
-
 def _make_process_chunk(api_url: str, app_token: str):
     """Build a chunk processor that PUTs a node chunk, retrying on transient errors."""
 
     def process_chunk(index, chunk):
-        last_exception = None
-        for attempt in range(1, RETRY_ATTEMPTS + 1):
-            logger.info("Processing chunk %s with %s nodes (attempt %s/%s)", index, len(chunk), attempt, RETRY_ATTEMPTS)
-            try:
-                response = requests.put(
-                    api_url,
-                    headers={"Content-Type": "application/json", "X-IK-ClientKey": app_token},
-                    json={"nodes": chunk},
-                    timeout=REQUEST_TIMEOUT,
-                )
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                last_exception = e
-                logger.warning("Chunk %s attempt %s failed: %s", index, attempt, e)
-                if attempt < RETRY_ATTEMPTS:
-                    time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
-                    continue
-                return {
-                    "chunk_index": index,
-                    "status_code": HTTP_CLIENT_TIMEOUT,
-                    "response_json": {"message": str(e)},
-                    "response_text": f"After {RETRY_ATTEMPTS} attempts: {e}",
-                }
-
-            if _is_retryable_status(response.status_code) and attempt < RETRY_ATTEMPTS:
-                logger.warning("Chunk %s attempt %s got retryable status %s", index, attempt, response.status_code)
-                time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
-                continue
-
-            try:
-                response_json = response.json()
-            except ValueError:
-                response_json = {"message": "Invalid JSON response", "status": response.status_code}
-            logger.info("Chunk %s response status: %s", index, response.status_code)
+        logger.info("Processing chunk %s with %s nodes", index, len(chunk))
+        try:
+            response = data_request(
+                "PUT",
+                api_url,
+                app_token,
+                json={"nodes": chunk},
+                timeout=REQUEST_TIMEOUT,
+                attempts=RETRY_ATTEMPTS,
+                backoff=RETRY_BACKOFF,
+            )
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            logger.warning("Chunk %s failed: %s", index, e)
             return {
                 "chunk_index": index,
-                "status_code": response.status_code,
-                "response_json": response_json,
-                "response_text": response.text[:500] if response.text else "",
+                "status_code": HTTP_CLIENT_TIMEOUT,
+                "response_json": {"message": str(e)},
+                "response_text": f"After {RETRY_ATTEMPTS} attempts: {e}",
             }
 
+        logger.info("Chunk %s response status: %s", index, response.status_code)
         return {
             "chunk_index": index,
-            "status_code": HTTP_CLIENT_TIMEOUT,
-            "response_json": {"message": str(last_exception or "Unknown error")},
-            "response_text": str(last_exception or "Unknown error"),
+            "status_code": response.status_code,
+            "response_json": parse_json(response),
+            "response_text": response.text[:500] if response.text else "",
         }
 
     return process_chunk
@@ -240,8 +212,8 @@ def _error_response(wants_stream, msg, status):
 
 
 def _resolve_env(wants_stream):
-    """Re-read .env and return ((url_endpoints, app_token), None) or (None, error_response)."""
-    load_dotenv(ENV_FILE, override=True)
+    """Refresh the saved env and return ((url_endpoints, app_token), None) or (None, error_response)."""
+    refresh_env()
     url_endpoints = os.getenv("URL_ENDPOINTS")
     app_token = os.getenv("APP_TOKEN")
     if not app_token:
@@ -260,6 +232,8 @@ def _iter_results_bounded(chunk_iter, process_chunk):
     the pending futures. Here we pull chunks from the iterator only as worker slots free up,
     so memory stays flat no matter how large the source file is.
     """
+    # Chunks post from pool threads; carry the provisioning run's profile (if any) over to them.
+    work = propagate(process_chunk)
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = {}
         for index, (chunk, frac) in enumerate(chunk_iter):
@@ -267,7 +241,7 @@ def _iter_results_bounded(chunk_iter, process_chunk):
                 done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
                 for fut in done:
                     yield futures.pop(fut), fut.result()
-            futures[executor.submit(process_chunk, index, chunk)] = (index, frac)
+            futures[executor.submit(work, index, chunk)] = (index, frac)
         for fut in concurrent.futures.as_completed(list(futures)):
             yield futures.pop(fut), fut.result()
 
@@ -290,27 +264,32 @@ def _stream_response(chunk_iter, process_chunk, total_nodes, total_chunks):
         percent = 0
         ok_chunks = 0
         bad_chunks = 0
-        for (index, frac), result in _iter_results_bounded(chunk_iter, process_chunk):
-            completed += 1
-            # max() keeps the bar monotonic even if chunks complete slightly out of order.
-            percent = max(percent, round(frac * 100))
-            results.append(result["response_json"])
-            last_status_code = result["status_code"]
-            if HTTP_OK <= result["status_code"] < HTTP_MULTIPLE_CHOICES:
-                ok_chunks += 1
-            else:
-                bad_chunks += 1
-            evt = {
-                "type": "chunk",
-                "completed": completed,
-                "total": total_chunks,
-                "percent": percent,
-                "chunk_index": index,
-                "status_code": result["status_code"],
-            }
-            if result["status_code"] >= HTTP_BAD_REQUEST:
-                evt["response_text"] = result.get("response_text", "")
-            yield json.dumps(evt) + "\n"
+        try:
+            for (index, frac), result in _iter_results_bounded(chunk_iter, process_chunk):
+                completed += 1
+                # max() keeps the bar monotonic even if chunks complete slightly out of order.
+                percent = max(percent, round(frac * 100))
+                results.append(result["response_json"])
+                last_status_code = result["status_code"]
+                if HTTP_OK <= result["status_code"] < HTTP_MULTIPLE_CHOICES:
+                    ok_chunks += 1
+                else:
+                    bad_chunks += 1
+                evt = {
+                    "type": "chunk",
+                    "completed": completed,
+                    "total": total_chunks,
+                    "percent": percent,
+                    "chunk_index": index,
+                    "status_code": result["status_code"],
+                }
+                if result["status_code"] >= HTTP_BAD_REQUEST:
+                    evt["response_text"] = result.get("response_text", "")
+                yield json.dumps(evt) + "\n"
+        finally:
+            # Accepted chunks changed the graph even when the client disconnected mid-stream.
+            if ok_chunks:
+                invalidate_ciq_cache("nodes capture")
         # Reached only when every chunk was processed: a client disconnect raises
         # GeneratorExit at a yield inside the loop, so a partial upload (trailing
         # chunks never submitted) can never stamp the flag.
@@ -341,6 +320,8 @@ def _render_result(chunk_iter, process_chunk):
         else:
             bad_chunks += 1
     _stamp_captured_flag(ok_chunks, bad_chunks)
+    if ok_chunks:
+        invalidate_ciq_cache("nodes capture")
     return render_template("capture/result.html", response_json=results, status_code=last_status_code)
 
 
@@ -5,18 +5,34 @@ The story script lives in data/scenario.json. Each step references a CIQ
 execute slot; the knowledge-query id is resolved from CIQ_QUERY_ID_<slot>
 in .env, and the auth headers are derived from the slot's policy subject
 (_Application → app token only, Person → app token + user bearer token).
+Read results are served from the CIQ result cache (api/_ciq_cache.py) while
+fresh.
+
+As soon as a step returns, the next step of the scene is executed in the
+background and held for that browser session (a cookie) for a short while, so
+advancing through the story does not wait on a CIQ round trip. Write steps
+(those with an `empty_message`) are never prefetched, and a prefetched answer
+is dropped if any capture or write execute landed after it was fetched.
 """
 
 import json
 import logging
 import os
+import secrets
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
+from api._ciq_cache import get_cache, is_write_slot
+from api._ciq_results import ColumnarResult, recall, remember
+from api._env import refresh_env
 from api._music_data import CIQ_POLICIES, ciq_query_for_slot
-from dotenv import load_dotenv
-from flask import render_template, request
+from api._platform import data_request
+from api._singleflight import flight_key, get_flights
+from flask import Response, make_response, render_template, request, stream_with_context
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
 
@@ -32,8 +48,14 @@ HTTP_UNAUTHORIZED = 401
 # So we retry 401 a couple of times, but only for person-subject (Bearer) executes.
 USER_TOKEN_RETRY_ATTEMPTS = 2
 USER_TOKEN_RETRY_BACKOFF_SECONDS = 1.5
-# `data[].nodes` keys look like "node.property.name"; keep at least node + prop.
-MIN_KEY_PARTS = 2
+# Rows rendered inline in a story response; the rest are fetched from /chat/results.
+CHAT_PAGE_ROWS = 100
+# Next-step prefetch: how long a prefetched answer is served, how many browser
+# sessions hold one (oldest dropped first), and how many run at once.
+PREFETCH_TTL_SECONDS = 30
+PREFETCH_MAX_SESSIONS = 256
+PREFETCH_WORKERS = 4
+SESSION_COOKIE = "chat_session"
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +75,6 @@ api_chat = APIBlueprint(
     doc_ui=True,
 )
 
-_ENV_FILE = Path(__file__).parent.parent / ".env"
 _SCENARIO_PATH = Path(__file__).parent.parent / "data" / "scenario.json"
 
 _APP_SUBJECT_POLICY_SLOTS = {
@@ -61,9 +82,25 @@ _APP_SUBJECT_POLICY_SLOTS = {
 }
 
 
+# Parsed scenario, re-read only when the file's mtime or size changes.
+_scenario = {"key": None, "scenario": None}
+_scenario_lock = threading.Lock()
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="chat-prefetch")
+# session id -> (scene id, step id, expires (monotonic), cache generation, future)
+_prefetched = OrderedDict()
+_prefetch_lock = threading.Lock()
+
+
 def _load_scenario() -> dict:
-    with _SCENARIO_PATH.open() as f:
-        return json.load(f)
+    stat = _SCENARIO_PATH.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _scenario_lock:
+        if _scenario["key"] != key:
+            with _SCENARIO_PATH.open() as f:
+                _scenario["scenario"] = json.load(f)
+            _scenario["key"] = key
+        return _scenario["scenario"]
 
 
 def _find_step(scenario: dict, scene_id: str, step_id: str) -> tuple[dict | None, dict | None, int]:
@@ -81,9 +118,38 @@ def _needs_user_token(slot: str) -> bool:
     return policy_slot not in _APP_SUBJECT_POLICY_SLOTS
 
 
-def execute_ciq_slot(slot: str, input_params: dict) -> dict:
+def _prefetch_step(session_id: str, scene_id: str, step: dict) -> None:
+    """Start executing a read-only step in the background for this session (replacing its last prefetch)."""
+    if step.get("empty_message") or is_write_slot(step["slot"]):
+        return
+    generation = get_cache().generation()
+    future = _prefetch_executor.submit(execute_ciq_slot, step["slot"], step.get("params", {}))
+    with _prefetch_lock:
+        _prefetched[session_id] = (scene_id, step["id"], time.monotonic() + PREFETCH_TTL_SECONDS, generation, future)
+        _prefetched.move_to_end(session_id)
+        while len(_prefetched) > PREFETCH_MAX_SESSIONS:
+            _prefetched.popitem(last=False)[1][4].cancel()
+    logger.debug("Prefetching story step %s/%s (slot=%s)", scene_id, step["id"], step["slot"])
+
+
+def _take_prefetched(session_id: str, scene_id: str, step_id: str) -> dict | None:
+    """Return this session's prefetched answer for the step, or None when it has to be executed now."""
+    with _prefetch_lock:
+        entry = _prefetched.pop(session_id, None)
+    if entry is None or entry[:2] != (scene_id, step_id):
+        return None
+    _scene_id, _step_id, expires, generation, future = entry
+    if expires <= time.monotonic() or generation != get_cache().generation():
+        future.cancel()
+        return None
+    # Still running when the user clicked: waiting for it beats starting over.
+    response_json = future.result()
+    return None if response_json.get("error") else response_json
+
+
+def execute_ciq_slot(slot: str, input_params: dict) -> dict:  # noqa: C901, PLR0911
     """Execute the knowledge query bound to a CIQ execute slot."""
-    load_dotenv(_ENV_FILE, override=True)
+    refresh_env()
 
     url_endpoints = os.getenv("URL_ENDPOINTS")
     app_token = os.getenv("APP_TOKEN")
@@ -103,10 +169,7 @@ def execute_ciq_slot(slot: str, input_params: dict) -> dict:
         }
 
     needs_user = _needs_user_token(slot)
-    headers = {
-        "Content-Type": "application/json",
-        "X-IK-ClientKey": app_token,
-    }
+    user_token = None
     if needs_user:
         user_token = os.getenv("USER_TOKEN", "")
         if not user_token:
@@ -115,7 +178,6 @@ def execute_ciq_slot(slot: str, input_params: dict) -> dict:
                 "message": "USER_TOKEN not configured. Person-subject queries need a signed-in user "
                 "(introspect a token first).",
             }
-        headers["Authorization"] = f"Bearer {user_token}"
 
     api_url = f"{url_endpoints}/contx-iq/v1/execute"
     json_data = {
@@ -123,32 +185,52 @@ def execute_ciq_slot(slot: str, input_params: dict) -> dict:
         "input_params": input_params,
     }
 
+    ticket = get_cache().lookup(slot, knowledge_query_id, input_params, app_token, user_token)
+    if ticket.hit is not None:
+        logger.info("Story step slot=%s served from the CIQ result cache", slot)
+        return ticket.hit[1]
+
     logger.info("Executing story step: slot=%s query=%s", slot, knowledge_query_id)
     logger.debug("Input params: %s", json.dumps(input_params, indent=2))
 
     # Retry transient 401s on person-subject executes (stale-JWKS-cache window after an
     # IdP signing-key rotation); app-subject 401s aren't transient, so don't retry them.
     max_attempts = USER_TOKEN_RETRY_ATTEMPTS + 1 if needs_user else 1
-    for attempt in range(1, max_attempts + 1):
-        try:
-            response = requests.post(api_url, headers=headers, json=json_data, timeout=120)
-        except requests.RequestException as e:
-            logger.exception("Request failed")
-            return {
-                "error": True,
-                "message": f"Request failed: {e!s}",
-            }
 
-        if response.status_code == HTTP_UNAUTHORIZED and attempt < max_attempts:
-            logger.warning(
-                "Slot %s execute got 401 on attempt %s/%s (likely a stale token-introspect JWKS cache); retrying",
-                slot,
-                attempt,
-                max_attempts,
+    def post():
+        for attempt in range(1, max_attempts + 1):
+            response = data_request(
+                "POST",
+                api_url,
+                app_token,
+                user_token,
+                json=json_data,
+                timeout=120,
+                # A read execute is safe to repeat: 5xx and timeouts are retried, not passed to every waiter.
+                idempotent=not is_write_slot(slot),
             )
-            time.sleep(USER_TOKEN_RETRY_BACKOFF_SECONDS * attempt)
-            continue
-        break
+            if response.status_code == HTTP_UNAUTHORIZED and attempt < max_attempts:
+                logger.warning(
+                    "Slot %s execute got 401 on attempt %s/%s (likely a stale token-introspect JWKS cache); retrying",
+                    slot,
+                    attempt,
+                    max_attempts,
+                )
+                time.sleep(USER_TOKEN_RETRY_BACKOFF_SECONDS * attempt)
+                continue
+            break
+        return response
+
+    # Identical read executes already in flight (same step opened in many browsers) share one call.
+    key = None if is_write_slot(slot) else flight_key(knowledge_query_id, input_params, app_token, user_token)
+    try:
+        response, shared = get_flights().do(key, post)
+    except requests.RequestException as e:
+        logger.exception("Request failed")
+        return {
+            "error": True,
+            "message": f"Request failed: {e!s}",
+        }
 
     logger.info("Response status: %s", response.status_code)
 
@@ -160,6 +242,8 @@ def execute_ciq_slot(slot: str, input_params: dict) -> dict:
             "message": "Invalid JSON response from server",
             "status": response.status_code,
         }
+    if not shared:
+        ticket.record(response.status_code, response_json)
 
     if response.status_code >= HTTP_BAD_REQUEST:
         response_json["error"] = True
@@ -173,7 +257,9 @@ def format_response_for_chat(response_json: dict, empty_message: str = "") -> di
 
     `empty_message` turns a no-rows response into a success confirmation —
     used by write steps (upserts/deletes) where empty data still means the
-    operation happened.
+    operation happened. Rows come back columnar (api/_ciq_results.py): only the
+    first CHAT_PAGE_ROWS are built here, and a larger answer gets a
+    `result_id` the page uses to stream the rest from /chat/results.
     """
     if response_json.get("error"):
         return {
@@ -189,7 +275,7 @@ def format_response_for_chat(response_json: dict, empty_message: str = "") -> di
             return {
                 "type": "success",
                 "message": empty_message,
-                "items": [],
+                "rows": [],
                 "raw_data": response_json,
             }
         return {
@@ -198,34 +284,30 @@ def format_response_for_chat(response_json: dict, empty_message: str = "") -> di
             "raw_data": response_json,
         }
 
-    formatted_items = []
-    for row in data:
-        nodes = row.get("nodes", {})
-        item = {}
-        for key, value in nodes.items():
-            parts = key.split(".")
-            if len(parts) >= MIN_KEY_PARTS:
-                node_name = parts[0]
-                prop_type = parts[1] if parts[1] != "property" else parts[2] if len(parts) > MIN_KEY_PARTS else parts[1]
-                display_key = f"{node_name}_{prop_type}".replace(".", "_")
-            else:
-                display_key = key
-            item[display_key] = value
-        if item:
-            formatted_items.append(item)
-
-    return {
+    result = ColumnarResult(data)
+    if not result:
+        return {
+            "type": "info",
+            "message": "Done — no rows returned for this query.",
+            "raw_data": response_json,
+        }
+    formatted = {
         "type": "success",
-        "message": f"Found {len(formatted_items)} result(s)",
-        "items": formatted_items,
-        "raw_data": response_json,
+        "message": f"Found {len(result)} result(s)",
+        "columns": result.columns,
+        "rows": list(result.rows(0, CHAT_PAGE_ROWS)),
+        "total": len(result),
+        "result_id": None,
     }
+    if len(result) > CHAT_PAGE_ROWS:
+        formatted["result_id"] = remember(result)
+    return formatted
 
 
 @api_chat.get("/", tags=[tag])
 def chat_home():
     """Display the story-driven chat interface."""
-    load_dotenv(_ENV_FILE, override=True)
+    refresh_env()
 
     scenario = _load_scenario()
 
@@ -267,15 +349,22 @@ def execute_story_step():
             insight="",
         )
 
-    response_json = execute_ciq_slot(step["slot"], step.get("params", {}))
+    session_id = request.cookies.get(SESSION_COOKIE) or secrets.token_urlsafe(16)
+    response_json = _take_prefetched(session_id, scene_id, step_id)
+    if response_json is not None:
+        logger.info("Story step %s/%s served from the prefetch", scene_id, step_id)
+    else:
+        response_json = execute_ciq_slot(step["slot"], step.get("params", {}))
     formatted_response = format_response_for_chat(response_json, step.get("empty_message", ""))
 
     query = ciq_query_for_slot(step["slot"])
 
     is_last_step = step_index >= len(scene["steps"]) - 1
     next_step = None if is_last_step else scene["steps"][step_index + 1]
+    if next_step is not None:
+        _prefetch_step(session_id, scene_id, next_step)
 
-    return render_template(
+    html = render_template(
         "chat/story_response.html",
         narrative=step.get("narrative", ""),
         question=step["question"],
@@ -291,3 +380,27 @@ def execute_story_step():
         next_step=next_step,
         conclusion=scene.get("conclusion") if is_last_step else None,
     )
+    response = make_response(html)
+    if request.cookies.get(SESSION_COOKIE) != session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="Lax")
+    return response
+
+
+@api_chat.get("/results", tags=[tag])
+def story_step_results():
+    """Return more rows of a large story-step answer: a JSON page, or NDJSON when asked for."""
+    result = recall(request.args.get("id", ""))
+    if result is None:
+        return {"message": "Unknown or expired result; run the step again."}, 404
+    try:
+        offset = max(0, int(request.args.get("offset", CHAT_PAGE_ROWS)))
+        limit = max(1, int(request.args.get("limit", CHAT_PAGE_ROWS)))
+    except ValueError:
+        return {"message": "offset and limit must be integers"}, 400
+    if "application/x-ndjson" in request.headers.get("Accept", "") or request.args.get("format") == "ndjson":
+        return Response(
+            stream_with_context(result.ndjson(offset)),
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+        )
+    return result.page(offset, limit)
@@ -3,8 +3,10 @@ import json
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
+from api._ciq_cache import get_cache, is_write_slot
 from api._music_data import (
     CIQ_EXECUTE_SLOTS,
     CIQ_POLICIES,
@@ -12,13 +14,17 @@ from api._music_data import (
     ciq_query_for_slot,
     slot_to_path_suffix,
 )
-from flask import render_template, request
+from api._platform import data_request, parse_json
+from api._singleflight import flight_key, get_flights
+from flask import Response, render_template, request, stream_with_context
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
 
 tag = Tag(name="api_ciq_execute", description="ContX IQ Execution")
 security = [{"ApiKeyAuth": []}]
 
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
 HTTP_UNAUTHORIZED = 401
 # Person-subject executes introspect the user's Bearer token against the project's
 # Token Introspect config, which caches the issuer's JWKS.
@@ -27,6 +33,10 @@ HTTP_UNAUTHORIZED = 401
 # So we retry 401 a couple of times, but only for person-subject (Bearer) executes.
 USER_TOKEN_RETRY_ATTEMPTS = 2
 USER_TOKEN_RETRY_BACKOFF_SECONDS = 1.5
+# /execute/batch: queries per request, and how many run at once (the pooled
+# platform client keeps PLATFORM_POOL_MAXSIZE connections, 32 by default).
+BATCH_MAX_QUERIES = 50
+BATCH_MAX_PARALLEL = int(os.getenv("CIQ_BATCH_MAX_PARALLEL", "8"))
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +70,11 @@ def _app_subject_policy_slots() -> set[str]:
 _APP_SUBJECT_POLICY_SLOTS = _app_subject_policy_slots()
 
 
+def _format_event(payload):
+    """Serialize one NDJSON event."""
+    return json.dumps(payload) + "\n"
+
+
 def _execute_default(slot: str) -> dict:
     spec = ciq_execute_for_slot(slot)
     query = ciq_query_for_slot(slot)
@@ -91,114 +106,237 @@ for _slot in CIQ_EXECUTE_SLOTS:
     api_ciq_execute.get(f"/execute{slot_to_path_suffix(_slot)}", tags=[tag])(_make_show_view(_slot))
 
 
-@api_ciq_execute.post("/execute", tags=[tag])
-def execution():
-    """Execute contX IQ with the provided form data."""
-    slot = request.form.get("slot", "1")
-    input_params_str = request.form.get("input_params", "{}")
-    try:
-        input_params = json.loads(input_params_str)
-        json_data = {
-            "id": request.form.get("knowledge_query_id", ""),
-            "input_params": input_params,
-        }
-    except json.JSONDecodeError as e:
-        logger.exception("Failed to parse input_params JSON")
-        return render_template(
-            "ciq_execute/result.html",
-            response_json={"message": f"Invalid JSON in input_params: {e!s}"},
-            status_code=400,
-            slot=slot,
-            input_params=input_params_str,
-        )
-
-    url_endpoints = os.getenv("URL_ENDPOINTS")
-    app_token = os.getenv("APP_TOKEN")
-
+def _policy_slot(slot):
     # Derive the policy slot from the manifest mapping (variant slots like "1b"/"2b"
     # have their own policy, so digit-stripping would be wrong). Mirrors chat.py.
     try:
-        policy_slot = ciq_query_for_slot(slot)["policy_slot"]
+        return ciq_query_for_slot(slot)["policy_slot"]
     except ValueError:
-        policy_slot = slot
+        return slot
+
+
+def _run_execute(slot, query_id, input_params):
+    """Execute one knowledge query; return (status_code, response_json, source).
+
+    `slot` picks the subject (person-subject slots send USER_TOKEN) and, when
+    `query_id` is the slot's own saved query, its read/write classification for
+    the result cache; None runs the query as an uncached app-subject execute.
+    `source` says where the answer came from: "cache", "coalesced" (an identical
+    execute already in flight) or "upstream".
+    """
+    url_endpoints = os.getenv("URL_ENDPOINTS")
+    app_token = os.getenv("APP_TOKEN")
+    policy_slot = _policy_slot(slot) if slot is not None else None
+    json_data = {"id": query_id, "input_params": input_params}
 
     api_url = f"{url_endpoints}/contx-iq/v1/execute"
     logger.info("Executing ContX IQ at: %s (slot=%s, policy_slot=%s)", api_url, slot, policy_slot)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    needs_user = policy_slot not in _APP_SUBJECT_POLICY_SLOTS
-    headers = {
-        "Content-Type": "application/json",
-        "X-IK-ClientKey": app_token,
-    }
+    needs_user = policy_slot is not None and policy_slot not in _APP_SUBJECT_POLICY_SLOTS
+    user_token = None
     if needs_user:
         user_token = os.getenv("USER_TOKEN", "")
         if not user_token:
             # Fail fast: a person-subject slot needs a signed-in user. Sending an empty
             # Bearer would just 401 (and trigger the retries below), hiding the real cause.
             logger.error("USER_TOKEN not configured for person-subject slot %s", slot)
-            return render_template(
-                "ciq_execute/result.html",
-                response_json={
-                    "message": "USER_TOKEN not configured. Person-subject queries need a "
-                    "signed-in user (introspect a token first).",
-                },
-                status_code=400,
-                slot=slot,
-                input_params=input_params_str,
+            message = (
+                "USER_TOKEN not configured. Person-subject queries need a signed-in user (introspect a token first)."
             )
-        headers["Authorization"] = f"Bearer {user_token}"
+            return 400, {"message": message}, "local"
         # Never log any part/length of the token (it's a credential); only that one is set.
         logger.info("USER_TOKEN attached to Authorization header for person-subject slot %s", slot)
 
+    # The form's query id is editable: only an id that is the slot's own saved query
+    # can use the slot's read/write classification (anything else counts as a write).
+    cache_slot = slot if slot is not None and query_id == os.getenv(f"CIQ_QUERY_ID_{slot}") else None
+    ticket = get_cache().lookup(cache_slot, query_id, input_params, app_token, user_token)
+    if ticket.hit is not None:
+        logger.info("CIQ execute slot %s served from the result cache", slot)
+        status_code, response_json = ticket.hit
+        return status_code, response_json, "cache"
+
     # Retry transient 401s on person-subject executes (stale-JWKS-cache window after an
     # IdP signing-key rotation); app-subject 401s aren't transient, so don't retry them.
     max_attempts = USER_TOKEN_RETRY_ATTEMPTS + 1 if needs_user else 1
-    for attempt in range(1, max_attempts + 1):
-        try:
-            response = requests.post(
+
+    def post():
+        for attempt in range(1, max_attempts + 1):
+            response = data_request(
+                "POST",
                 api_url,
-                headers=headers,
+                app_token,
+                user_token,
                 json=json_data,
-                timeout=30,
-            )
-        except requests.RequestException as e:
-            logger.exception("CIQ execute request failed")
-            return render_template(
-                "ciq_execute/result.html",
-                response_json={"message": f"Request failed: {e!s}"},
-                status_code=502,
-                slot=slot,
-                input_params=input_params_str,
-            )
-        if response.status_code == HTTP_UNAUTHORIZED and attempt < max_attempts:
-            logger.warning(
-                "CIQ execute slot %s got 401 on attempt %s/%s (likely a stale token-introspect JWKS cache); retrying",
-                slot,
-                attempt,
-                max_attempts,
+                # A read execute is safe to repeat: 5xx and timeouts are retried, not passed to every waiter.
+                idempotent=not is_write_slot(cache_slot),
             )
-            time.sleep(USER_TOKEN_RETRY_BACKOFF_SECONDS * attempt)
-            continue
-        break
+            if response.status_code == HTTP_UNAUTHORIZED and attempt < max_attempts:
+                logger.warning(
+                    "CIQ execute slot %s got 401 on attempt %s/%s (likely a stale token-introspect JWKS cache); "
+                    "retrying",
+                    slot,
+                    attempt,
+                    max_attempts,
+                )
+                time.sleep(USER_TOKEN_RETRY_BACKOFF_SECONDS * attempt)
+                continue
+            break
+        return response
+
+    # Identical read executes already in flight share one upstream call.
+    key = None if is_write_slot(cache_slot) else flight_key(query_id, input_params, app_token, user_token)
+    try:
+        response, shared = get_flights().do(key, post)
+    except requests.RequestException as e:
+        logger.exception("CIQ execute request failed")
+        return 502, {"message": f"Request failed: {e!s}"}, "local"
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
+    response_json = parse_json(response)
+    if not shared:
+        ticket.record(response.status_code, response_json)
+    return response.status_code, response_json, "coalesced" if shared else "upstream"
+
+
+@api_ciq_execute.post("/execute", tags=[tag])
+def execution():
+    """Execute contX IQ with the provided form data."""
+    slot = request.form.get("slot", "1")
+    input_params_str = request.form.get("input_params", "{}")
     try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+        input_params = json.loads(input_params_str)
+    except json.JSONDecodeError as e:
+        logger.exception("Failed to parse input_params JSON")
+        return render_template(
+            "ciq_execute/result.html",
+            response_json={"message": f"Invalid JSON in input_params: {e!s}"},
+            status_code=400,
+            slot=slot,
+            input_params=input_params_str,
+        )
 
+    status_code, response_json, _source = _run_execute(slot, request.form.get("knowledge_query_id", ""), input_params)
     return render_template(
         "ciq_execute/result.html",
         response_json=response_json,
-        status_code=response.status_code,
+        status_code=status_code,
         slot=slot,
         input_params=input_params_str,
     )
+
+
+def _batch_item(item):
+    """Resolve one batch entry to (slot, query_id, input_params).
+
+    Raises TypeError when the entry or its input_params is not an object, and
+    ValueError when its slot or query id cannot be used; the caller reports
+    either as that entry's 400.
+    """
+    if not isinstance(item, dict):
+        msg = "each query must be an object with a slot or a query_id"
+        raise TypeError(msg)
+    slot = item.get("slot")
+    query_id = item.get("query_id")
+    if slot is not None:
+        slot = str(slot)
+        if slot not in CIQ_EXECUTE_SLOTS:
+            msg = f"unknown slot {slot}"
+            raise ValueError(msg)
+        query_id = query_id or os.getenv(f"CIQ_QUERY_ID_{slot}", "")
+        if not query_id:
+            msg = f"CIQ_QUERY_ID_{slot} not configured"
+            raise ValueError(msg)
+    elif query_id:
+        # A bare query id takes the subject and caching of the slot it was saved for.
+        slot = next((s for s in CIQ_EXECUTE_SLOTS if os.getenv(f"CIQ_QUERY_ID_{s}") == query_id), None)
+    else:
+        msg = "each query needs a slot or a query_id"
+        raise ValueError(msg)
+    input_params = item.get("input_params")
+    if input_params is None:
+        input_params = ciq_execute_for_slot(slot).get("input_params", {}) if slot is not None else {}
+    if not isinstance(input_params, dict):
+        msg = "input_params must be an object"
+        raise TypeError(msg)
+    return slot, query_id, input_params
+
+
+def _timed_execute(slot, query_id, input_params):
+    start = time.perf_counter()
+    status_code, response_json, source = _run_execute(slot, query_id, input_params)
+    return status_code, response_json, source, round((time.perf_counter() - start) * 1000, 1)
+
+
+@api_ciq_execute.post("/execute/batch", tags=[tag])
+def execute_batch():
+    """Run several knowledge queries concurrently, streaming each result as NDJSON as soon as it completes.
+
+    Body: {"queries": [{"slot": "3", "input_params": {...}}, {"query_id": "...", ...}], "max_parallel": 4}.
+    A slot without a query_id runs its saved query; omitted input_params take the
+    slot's default execute params. Every line carries the entry's index, status
+    and latency; the last one is {"type": "done"} with the totals. Entries run in
+    no particular order, so a write in a batch may or may not be seen by its reads.
+    """
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not queries:
+        return {"message": 'Body must be {"queries": [...]} with at least one query'}, 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return {"message": f"At most {BATCH_MAX_QUERIES} queries per batch"}, 400
+    try:
+        parallel = int(body.get("max_parallel", BATCH_MAX_PARALLEL))
+    except (TypeError, ValueError):
+        return {"message": "max_parallel must be an integer"}, 400
+    parallel = max(1, min(parallel, BATCH_MAX_PARALLEL, len(queries)))
+
+    def event_stream():
+        started = time.perf_counter()
+        counts = {"ok": 0, "failed": 0}
+        yield _format_event({"type": "start", "total": len(queries), "max_parallel": parallel})
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = {}
+            for index, item in enumerate(queries):
+                try:
+                    slot, query_id, input_params = _batch_item(item)
+                except (TypeError, ValueError) as e:
+                    counts["failed"] += 1
+                    yield _format_event(
+                        {"type": "result", "index": index, "status_code": 400, "response": {"message": str(e)}},
+                    )
+                    continue
+                future = executor.submit(_timed_execute, slot, query_id, input_params)
+                futures[future] = (index, slot, query_id)
+            try:
+                for future in as_completed(futures):
+                    index, slot, query_id = futures[future]
+                    status_code, response_json, source, latency_ms = future.result()
+                    counts["ok" if HTTP_OK <= status_code < HTTP_MULTIPLE_CHOICES else "failed"] += 1
+                    yield _format_event(
+                        {
+                            "type": "result",
+                            "index": index,
+                            "slot": slot,
+                            "query_id": query_id,
+                            "status_code": status_code,
+                            "latency_ms": latency_ms,
+                            "source": source,
+                            "response": response_json,
+                        },
+                    )
+            finally:
+                # Client went away: don't start the queries still queued.
+                for future in futures:
+                    future.cancel()
+        wall_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield _format_event({"type": "done", "total": len(queries), **counts, "wall_ms": wall_ms})
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+    )
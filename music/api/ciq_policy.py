@@ -2,11 +2,10 @@
 import json
 import logging
 import os
-import re
-from pathlib import Path
 
-import requests
+from api._env import update_env_variable
 from api._music_data import CIQ_POLICY_SLOTS, ciq_policy_for_slot, slot_to_path_suffix
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -20,39 +19,6 @@ HTTP_OK = 200
 HTTP_MULTIPLE_CHOICES = 300
 
 
-def update_env_variable(key, value):
-    """Update or add an environment variable in the .env file."""
-    env_file = Path(__file__).parent.parent / ".env"
-
-    if env_file.exists():
-        with env_file.open() as f:
-            lines = f.readlines()
-    else:
-        lines = []
-
-    key_found = False
-    updated_lines = []
-
-    for line in lines:
-        if re.match(f"^{re.escape(key)}=", line):
-            updated_lines.append(f"{key}={value}\n")
-            key_found = True
-        else:
-            updated_lines.append(line)
-
-    if not key_found:
-        if updated_lines and not updated_lines[-1].endswith("\n"):
-            updated_lines[-1] += "\n"
-        updated_lines.append(f"{key}={value}\n")
-
-    with env_file.open("w") as f:
-        f.writelines(updated_lines)
-
-    os.environ[key] = value
-
-    logger.info("Updated %s in .env file", key)
-
-
 class Unauthorized(BaseModel):
     code: int = Field(-1, description="Status Code")
     message: str = Field("Unauthorized!", description="Exception Information")
@@ -117,28 +83,13 @@ def create_ciq_policy():
     logger.info("Creating ContX IQ policy at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(json_data, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=json_data,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=json_data)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     ciq_policy_id_saved = False
     ciq_policy_id = None
@@ -4,6 +4,7 @@ import logging
 import os
 
 import requests
+from api._platform import data_request
 from flask import render_template
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -48,11 +49,8 @@ def _fetch_schema():
 
     api_url = f"{url_endpoints}/data-schema/v1/"
     try:
-        response = requests.get(
-            api_url,
-            headers={"X-IK-ClientKey": app_token},
-            timeout=SCHEMA_TIMEOUT_SECONDS,
-        )
+        # Probed on page render: fail fast instead of retrying.
+        response = data_request("GET", api_url, app_token, timeout=SCHEMA_TIMEOUT_SECONDS, attempts=1)
     except requests.RequestException as e:
         logger.warning("Data schema request failed: %s", e)
         return None, None
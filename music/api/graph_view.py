@@ -1,10 +1,21 @@
 # Copyright (c) 2026 IndyKite
+import json
 import logging
+import os
 import threading
+import time
+from bisect import bisect_left
 from pathlib import Path
 
-import ijson
-from flask import jsonify, render_template, request
+from api._graph_analytics import DAMPING, TOP_MAX, Analytics
+from api._graph_analytics import available as analytics_available
+from api._graph_clusters import CLUSTER, NODE, UNGROUPED, Clusters
+from api._graph_index import open_index, source_key
+from api._graph_layout import load_or_compute
+from api._graph_responses import ON_DEMAND_LEVELS, EncodedResponse, ResponseCache
+from api._graph_search import SearchIndex
+from api._graph_traverse import Budget, induced_edges, k_hop, shortest_path
+from flask import Response, jsonify, render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 
 tag = Tag(name="graph", description="Graph visualization of the captured music dataset")
@@ -21,6 +32,36 @@ api_graph = APIBlueprint(
 
 NODES_FILE = Path(__file__).parent.parent / "data" / "nodes" / "nodes_music.json"
 RELATIONSHIPS_FILE = Path(__file__).parent.parent / "data" / "relationships" / "relationships_music.json"
+# Every /graph/data response is one page of at most this many nodes (and edges);
+# clients follow next_cursor for the rest.
+PAGE_LIMIT = int(os.getenv("GRAPH_PAGE_LIMIT", "2000"))
+PAGE_LIMIT_MAX = 5000
+PAGE_EDGE_LIMIT = int(os.getenv("GRAPH_PAGE_EDGE_LIMIT", "10000"))
+NEIGHBORHOOD_MAX_HOPS = 2
+# around= listings: the neighborhood is paged, but collected in one bounded traversal.
+NEIGHBORHOOD_MAX_NODES = 50_000
+SEARCH_LIMIT_MAX = 50
+# Traversal endpoints: hop and fan-out caps, and the per-request time budget.
+TRAVERSE_MAX_HOPS = 4
+TRAVERSE_FANOUT = 50
+TRAVERSE_FANOUT_MAX = 1000
+TRAVERSE_TIMEOUT_MS = int(os.getenv("GRAPH_TRAVERSE_TIMEOUT_MS", "500"))
+TRAVERSE_TIMEOUT_MS_MAX = 2000
+# A path search only returns the path, so it may visit far more nodes than a response holds.
+PATH_MAX_VISITED = 200_000
+_DATA_PARAMS = ("types", "include_tracks", "min_degree", "around", "hops", "expand", "limit", "cursor")
+# /graph/clusters: the default grouping type of Tracks, and the query parameters.
+CLUSTER_BY = "Album"
+# The overview is the explorer's first paint, so its pages are much smaller than a listing's.
+CLUSTER_PAGE_LIMIT = int(os.getenv("GRAPH_CLUSTER_PAGE_LIMIT", "200"))
+CLUSTER_PAGE_EDGE_LIMIT = int(os.getenv("GRAPH_CLUSTER_PAGE_EDGE_LIMIT", "500"))
+_CLUSTER_PARAMS = ("by", "drill", "limit", "cursor")
+# Compiled, memory-mapped copy of the two files above, shared by every worker process.
+SNAPSHOT_FILE = Path(os.getenv("GRAPH_SNAPSHOT_FILE", str(Path(__file__).parent.parent / "graph.snapshot")))
+# Per-snapshot extras of node elements, added once computed: positions and analytics hints.
+_NODE_EXTRAS = ("layout", "analytics")
+# ds.cached_value(<extra>) until it has been computed (None: there is none).
+_PENDING = object()
 
 # The label property to prefer per node type (falls back to the first property, then external_id).
 _LABEL_PROPS = {
@@ -37,6 +78,8 @@ _LABEL_PROPS = {
 # modified in the live IKG. A future "live" source (CIQ read) can plug in beside it.
 _cache = {}
 _cache_lock = threading.Lock()
+# Held while a snapshot is opened or updated, so one thread does it at a time.
+_refresh_lock = threading.Lock()
 
 
 def _node_label(node_type, props):
@@ -46,94 +89,91 @@ def _node_label(node_type, props):
     return None
 
 
-def _build_dataset():
-    """Stream both data files once and index them for the graph endpoints.
-
-    ~16k nodes / ~31k relationships compact to a few MB of dicts, so unlike the
-    capture path (which must assume multi-GB files) holding one snapshot in
-    memory is fine - it is what makes expand/filter requests instant.
-    """
-    nodes = {}
-    with NODES_FILE.open("rb") as f:
-        for n in ijson.items(f, "nodes.item", use_float=True):
-            props = {p["type"]: p.get("value") for p in n.get("properties", [])}
-            nodes[n["external_id"]] = {
-                "type": n["type"],
-                "label": _node_label(n["type"], props) or n["external_id"],
-                "props": props,
-            }
-
-    edges = []
-    degree = dict.fromkeys(nodes, 0)
-    track_count = dict.fromkeys(nodes, 0)
-    adj = {}  # external_id -> indexes into edges of every incident edge
-    track_adj = {}  # non-Track external_id -> indexes into edges touching a Track
-    with RELATIONSHIPS_FILE.open("rb") as f:
-        for r in ijson.items(f, "relationships.item", use_float=True):
-            src, tgt = r["source"]["external_id"], r["target"]["external_id"]
-            if src not in nodes or tgt not in nodes:
-                continue
-            idx = len(edges)
-            edges.append({"source": src, "target": tgt, "type": r["type"]})
-            degree[src] += 1
-            degree[tgt] += 1
-            adj.setdefault(src, []).append(idx)
-            adj.setdefault(tgt, []).append(idx)
-            src_is_track = nodes[src]["type"] == "Track"
-            tgt_is_track = nodes[tgt]["type"] == "Track"
-            if src_is_track != tgt_is_track:
-                plain = tgt if src_is_track else src
-                track_count[plain] += 1
-                track_adj.setdefault(plain, []).append(idx)
-
-    type_counts = {}
-    for n in nodes.values():
-        type_counts[n["type"]] = type_counts.get(n["type"], 0) + 1
+def _build_dataset(previous=None):
+    """Open the array-backed index of both data files (api/_graph_index.py).
 
-    return {
-        "nodes": nodes,
-        "edges": edges,
-        "degree": degree,
-        "adj": adj,
-        "track_count": track_count,
-        "track_adj": track_adj,
-        "type_counts": type_counts,
-    }
+    The index holds integer tables and CSR adjacency rather than dicts per node
+    and edge, so one snapshot stays small in memory even for millions of
+    relationships - and it is what makes expand/filter requests instant. It is
+    memory-mapped from SNAPSHOT_FILE: only the first worker after a data change
+    streams the JSON files, the others map the file it wrote. Given the
+    previous dataset, records appended to the files since are applied to it
+    instead of streaming everything again.
+    """
+    return open_index(
+        SNAPSHOT_FILE,
+        NODES_FILE,
+        RELATIONSHIPS_FILE,
+        _node_label,
+        tag=json.dumps(_LABEL_PROPS),
+        previous=previous,
+    )
 
 
 def _get_dataset():
-    """Return the cached dataset, rebuilding when either data file changes on disk."""
-    key = (NODES_FILE.stat().st_mtime_ns, RELATIONSHIPS_FILE.stat().st_mtime_ns)
+    """Return the cached dataset; after either data file changes, the previous one until its successor is ready."""
+    key = source_key((NODES_FILE, RELATIONSHIPS_FILE))
     with _cache_lock:
-        if _cache.get("key") != key:
-            logger.info("Building graph dataset from %s and %s", NODES_FILE.name, RELATIONSHIPS_FILE.name)
-            _cache["data"] = _build_dataset()
-            _cache["key"] = key
-        return _cache["data"]
+        current = _cache.get("data")
+        if current is not None and _cache["key"] == key:
+            return current
+    if current is None:
+        return _refresh(key)
+    if not _refresh_lock.locked():
+        threading.Thread(target=_refresh, args=(key,), daemon=True).start()
+    return current
 
 
-def _node_element(ext_id, ds):
-    n = ds["nodes"][ext_id]
-    return {
+def _refresh(key):
+    """Open the dataset for key and swap it in under _cache_lock.
+
+    A successor is warmed before the swap, so readers keep being served the
+    previous snapshot - stale by one capture, but complete - instead of
+    waiting for the update, the search index or the layout.
+    """
+    with _refresh_lock:
+        with _cache_lock:
+            previous = _cache.get("data")
+            if previous is not None and _cache["key"] == key:
+                return previous
+        ds = _build_dataset(previous)
+        if previous is not None:
+            _warm_snapshot(ds, previous)
+        with _cache_lock:
+            # The files may have moved on while it was built; the next request notices.
+            _cache["data"], _cache["key"] = ds, ds.key[:-1]
+    if previous is None:
+        threading.Thread(target=_warm_snapshot, args=(ds,), daemon=True).start()
+    return ds
+
+
+def _node_element(node, ds):
+    element = {
         "data": {
-            "id": ext_id,
-            "label": n["label"],
-            "type": n["type"],
-            "props": n["props"],
-            "degree": ds["degree"][ext_id],
-            "trackCount": ds["track_count"][ext_id],
+            "id": ds.ids[node],
+            "label": ds.labels[node],
+            "type": ds.type_of(node),
+            "props": ds.node_props(node),
+            "degree": ds.degree(node),
+            "trackCount": ds.track_count(node),
         },
     }
+    layout = ds.cached_value("layout")
+    if layout is not None:
+        element["position"] = layout.position(node)
+    analytics = ds.cached_value("analytics")
+    if analytics is not None:
+        element["data"].update(analytics.hints(node))
+    return element
 
 
-def _edge_element(idx, ds):
-    e = ds["edges"][idx]
+def _edge_element(edge, ds):
     return {
         "data": {
-            "id": f"e{idx}",
-            "source": e["source"],
-            "target": e["target"],
-            "label": e["type"],
+            "id": f"e{edge}",
+            "source": ds.ids[ds.edge_source[edge]],
+            "target": ds.ids[ds.edge_target[edge]],
+            "label": ds.label_names[ds.edge_label[edge]],
         },
     }
 
@@ -144,62 +184,677 @@ def show_graph():
     ds = _get_dataset()
     return render_template(
         "graph/view.html",
-        type_counts=ds["type_counts"],
-        edge_count=len(ds["edges"]),
+        type_counts=ds.type_counts,
+        edge_count=ds.edge_count,
     )
 
 
-def _expand_elements(ds, expand):
-    """Return the cytoscape elements for one node's Track neighbors.
+def _int_arg(args, name, default, low, high):
+    """Return an integer query parameter within [low, high]; raise ValueError with a client message."""
+    raw = args.get(name, "")
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        msg = f"{name} must be an integer"
+        raise ValueError(msg) from None
+    if not low <= value <= high:
+        msg = f"{name} must be between {low} and {high}"
+        raise ValueError(msg)
+    return value
 
-    Includes every edge touching those tracks whose other endpoint is visible
-    in the default view (any non-Track node) or another expanded track.
-    """
-    track_ids = set()
-    edge_idxs = set()
-    for idx in ds["track_adj"].get(expand, []):
-        e = ds["edges"][idx]
-        track = e["source"] if ds["nodes"][e["source"]]["type"] == "Track" else e["target"]
-        track_ids.add(track)
-    for track in track_ids:
-        for idx in ds["adj"].get(track, []):
-            e = ds["edges"][idx]
-            other = e["target"] if e["source"] == track else e["source"]
-            if ds["nodes"][other]["type"] != "Track" or other in track_ids:
-                edge_idxs.add(idx)
+
+def _page_limits(args, defaults=(PAGE_LIMIT, PAGE_EDGE_LIMIT)):
+    """Return (node cap, edge cap) for one response; defaults are the (node, edge) caps without a limit."""
+    limit = _int_arg(args, "limit", defaults[0], 1, PAGE_LIMIT_MAX)
+    return limit, max(defaults[1], limit)
+
+
+def _neighborhood(ds, start, hops):
+    """Return (node numbers within `hops` relationships of start, the limit that cut them short or None)."""
+    budget = Budget(
+        max_nodes=NEIGHBORHOOD_MAX_NODES,
+        max_edges=PAGE_EDGE_LIMIT,
+        seconds=TRAVERSE_TIMEOUT_MS_MAX / 1000,
+    )
+    return k_hop(ds, start, hops, budget).keys(), budget.exceeded
+
+
+def _type_codes(ds, args):
+    """Return the node type codes named in the types parameter, or None when it is absent."""
+    names = [name for name in args.get("types", "").split(",") if name]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in ds.type_names]
+    if unknown:
+        msg = f"Unknown node type(s): {', '.join(unknown)}"
+        raise ValueError(msg)
+    return {ds.type_names.index(name) for name in names}
+
+
+def _selection(ds, around, args):
+    """Return (candidates, selected, truncated) for a listing request.
+
+    candidates are node numbers in ascending order (what the cursor walks);
+    selected(node) is the filter every listed node - and both endpoints of
+    every listed edge - passes: types, min_degree and, with an around node,
+    membership in its neighborhood; truncated names the traversal limit that
+    cut that neighborhood short, else None. Raises ValueError for a bad parameter.
+    """
+    members = truncated = None
+    if around is not None:
+        members, truncated = _neighborhood(ds, around, _int_arg(args, "hops", 1, 1, NEIGHBORHOOD_MAX_HOPS))
+    codes = _type_codes(ds, args)
+    if codes is None:
+        codes = set(range(len(ds.type_names)))
+        if members is None and args.get("include_tracks") != "1":
+            codes.discard(ds.dense_code)
+    min_degree = _int_arg(args, "min_degree", 0, 0, ds.edge_count * 2)
+    node_type = ds.node_type
+
+    def selected(node):
+        return node_type[node] in codes and ds.degree(node) >= min_degree and (members is None or node in members)
+
+    return (sorted(members) if members is not None else range(ds.node_count)), selected, truncated
+
+
+def _resumable_cursor(ds, args, count):
+    """Return (position, edges of that item already sent) from a cursor "<position>[:<sent>]", position <= count."""
+    node, _, sent = args.get("cursor", "").partition(":")
+    try:
+        node, sent = int(node or 0), int(sent or 0)
+    except ValueError:
+        msg = "cursor must be a next_cursor value"
+        raise ValueError(msg) from None
+    if not (0 <= node <= count and 0 <= sent <= ds.edge_count):
+        msg = "cursor is out of range"
+        raise ValueError(msg)
+    return node, sent
+
+
+def _listing_page(ds, around, args):
+    """Return one page of the listing: up to `limit` selected nodes from node number `cursor` on.
+
+    Each relationship between two selected nodes is sent with the later of
+    its endpoints, so a client that adds the pages in order always has both
+    ends in place. A page holds at most edge_limit relationships: it ends
+    before a node once full, and a node with more relationships than still
+    fit (a Playlist of thousands of Tracks) sends the rest on the next page,
+    whose cursor "<node>:<sent>" resumes it without listing the node again.
+    """
+    candidates, selected, truncated = _selection(ds, around, args)
+    limit, edge_limit = _page_limits(args)
+    cursor, sent = _resumable_cursor(ds, args, ds.node_count)
+    nodes, edges = [], []
+    next_cursor = None
+    position = bisect_left(candidates, cursor)
+    while position < len(candidates):
+        node = candidates[position]
+        if selected(node):
+            resumed = node == cursor and sent > 0
+            if not resumed and (len(nodes) >= limit or len(edges) >= edge_limit):
+                next_cursor = str(node)
+                break
+            own = [
+                edge
+                for edge in dict.fromkeys(ds.incident(node))
+                if (other := ds.other(edge, node)) <= node and selected(other)
+            ]
+            if resumed:
+                own = own[sent:]
+            else:
+                nodes.append(node)
+                sent = 0
+            room = edge_limit - len(edges)
+            if len(own) > room:
+                edges.extend(own[:room])
+                next_cursor = f"{node}:{sent + room}"
+                break
+            edges.extend(own)
+        position += 1
+    stats = {"type_counts": ds.type_counts, "nodes": len(nodes), "edges": len(edges)}
+    if around is not None:
+        stats["truncated"] = truncated
     return {
-        "nodes": [_node_element(i, ds) for i in sorted(track_ids)],
-        "edges": [_edge_element(i, ds) for i in sorted(edge_idxs)],
+        "elements": {
+            "nodes": [_node_element(node, ds) for node in nodes],
+            "edges": [_edge_element(edge, ds) for edge in sorted(edges)],
+        },
+        "stats": stats,
+        "next_cursor": next_cursor,
     }
 
 
-def _default_elements(ds, include_tracks):
-    """Return the cytoscape elements and stats for the full listing."""
-    node_ids = [i for i, n in ds["nodes"].items() if include_tracks or n["type"] != "Track"]
-    visible = set(node_ids)
-    edge_idxs = [i for i, e in enumerate(ds["edges"]) if e["source"] in visible and e["target"] in visible]
+def _expand_page(ds, expand, args):
+    """Return one page of a node's Track neighbors, ordered by external_id from offset `cursor`."""
+    tracks = sorted({ds.other(edge, expand) for edge in ds.track_edges(expand)}, key=ds.ids.raw)
+    return _track_page(ds, tracks, args)
+
+
+def _track_page(ds, tracks, args):
+    """Return one page of tracks from offset `cursor` on.
+
+    Includes every edge touching those tracks whose other endpoint is visible
+    in the default view (any non-Track node) or another of the tracks - the
+    latter sent with whichever of the two comes later.
+    """
+    limit, _ = _page_limits(args)
+    cursor = _int_arg(args, "cursor", 0, 0, len(tracks))
+    order = {track: i for i, track in enumerate(tracks)}
+    page = tracks[cursor : cursor + limit]
+    edges = set()
+    for track in page:
+        for edge in ds.incident(track):
+            other = ds.other(edge, track)
+            if not ds.is_dense(other) or order.get(other, len(tracks)) <= order[track]:
+                edges.add(edge)
+    end = cursor + len(page)
     return {
         "elements": {
-            "nodes": [_node_element(i, ds) for i in node_ids],
-            "edges": [_edge_element(i, ds) for i in edge_idxs],
+            "nodes": [_node_element(node, ds) for node in page],
+            "edges": [_edge_element(edge, ds) for edge in sorted(edges)],
         },
-        "stats": {"type_counts": ds["type_counts"], "edges": len(edge_idxs)},
+        "next_cursor": str(end) if end < len(tracks) else None,
     }
 
 
+def _query_key(args, ds, params=_DATA_PARAMS):
+    """Return the cache key of a /graph/data query: its known parameters, sorted, blanks dropped.
+
+    Also records which node extras (_NODE_EXTRAS) were in the body: they appear
+    once computed, and the bodies cached before must not be served after.
+    """
+    known = sorted((name, args.get(name)) for name in params if args.get(name))
+    return (*known, ("extras", ",".join(name for name in _NODE_EXTRAS if ds.cached_value(name) is not None)))
+
+
+def _is_hot(key):
+    """Return True for the default listing and the include_tracks pages (pinned, warmed per snapshot)."""
+    return {name for name, _ in key} <= {"include_tracks", "cursor", "extras"}
+
+
+def _extras_settled(ds):
+    """Return True once every node extra is computed or known to be unavailable - node elements are final."""
+    return all(ds.cached_value(name, _PENDING) is not _PENDING for name in _NODE_EXTRAS)
+
+
+def _layout(ds, previous=None):
+    """Load, compute or extend the snapshot's node positions (api/_graph_layout.py); None without NumPy."""
+    try:
+        return load_or_compute(ds, SNAPSHOT_FILE.with_name(SNAPSHOT_FILE.name + ".layout"), previous)
+    except Exception:
+        # Positions only spare the browser its own layout pass - serve the graph without them.
+        logger.exception("Could not lay out the graph")
+        return None
+
+
+def _analytics(ds):
+    """Compute the snapshot's analytics (api/_graph_analytics.py); None without NumPy and SciPy."""
+    if not analytics_available():
+        return None
+    try:
+        return Analytics(ds)
+    except Exception:
+        # Like positions, the hints are extras - serve the graph without them.
+        logger.exception("Could not compute graph analytics")
+        return None
+
+
+def _warm_snapshot(ds, previous=None):
+    """Build a fresh snapshot's search index, node extras, hot views and Track clusters - off the request path.
+
+    previous is the snapshot ds was opened from, whose layout is extended rather than computed again.
+    """
+    previous_layout = previous.cached_value("layout") if previous is not None else None
+    ds.cached("search", lambda: SearchIndex(ds))
+    ds.cached("layout", lambda: _layout(ds, previous_layout))
+    ds.cached("analytics", lambda: _analytics(ds))
+    _warm_hot_views(ds)
+    _clusters(ds, {})
+
+
+def _warm_hot_views(ds):
+    """Encode the default and include_tracks listings into the snapshot's response cache, while pins are left.
+
+    Pages are warmed in order, so the first pages - the ones every client
+    loads - are pinned; warming stops at the first page that no longer fits
+    the pinned budget, and later pages are cached when requested.
+    """
+    responses = ds.cached("responses", ResponseCache)
+    for base in ({}, {"include_tracks": "1"}):
+        args = dict(base)
+        while True:
+            key = _query_key(args, ds)
+            entry = responses.get(key)
+            payload = None if entry is not None else _listing_page(ds, None, args)
+            if payload is not None:
+                responses.put(key, payload, pinned=True)
+                cursor = payload["next_cursor"]
+            else:
+                cursor = json.loads(entry.variants["identity"])["next_cursor"]
+            if cursor is None or not responses.is_pinned(key):
+                break
+            args["cursor"] = cursor
+            time.sleep(0)  # let requests in between (a cooperative yield under gevent)
+    logger.info("Graph explorer hot views cached: %s", responses.stats())
+
+
+def _send_encoded(entry, responses):
+    """Send a cached response in the best encoding the client accepts, or 304 if its ETag still matches."""
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip") if e in entry.variants]) or "identity"
+    etag = entry.etag_for(encoding)
+    if request.if_none_match.contains_weak(etag):
+        responses.note_not_modified()
+        response = Response(status=304)
+    else:
+        response = Response(entry.variants[encoding], mimetype="application/json")
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    # Revalidate every time: the snapshot (and so the body) can change under the same URL.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @api_graph.get("/data", tags=[tag])
 def graph_data():
-    """Return cytoscape.js elements for the bundled dataset.
+    """Return cytoscape.js elements for the bundled dataset, one bounded page at a time.
 
     Query parameters:
-      include_tracks=1  include the ~14k Track nodes (heavy; default excludes them)
+      types=<T,...>     node types to list (default: every type but Track)
+      include_tracks=1  list every type, the ~14k Track nodes included
+      min_degree=<n>    only nodes with at least n relationships (hubs first)
+      around=<id>       only nodes within `hops` (1-2) relationships of one node
+                        (at most NEIGHBORHOOD_MAX_NODES; stats.truncated says
+                        which limit cut the neighborhood short, else null)
       expand=<id>       only the Track neighbors of one node plus their edges
                         (edges are limited to endpoints the default view already shows)
+      limit=<n>         node cap per page (default GRAPH_PAGE_LIMIT)
+      cursor=<c>        the previous page's next_cursor (opaque)
+
+    Edges are only sent between nodes that pass the same filters, at most
+    max(GRAPH_PAGE_EDGE_LIMIT, limit) per page. Keep requesting with
+    next_cursor until it is null to get the whole selection.
+    Once the snapshot's layout is computed (api/_graph_layout.py) every node
+    also carries a precomputed "position", so the client can skip its own layout,
+    and once its analytics are (api/_graph_analytics.py) a "pagerankPct" and,
+    for the highest-degree nodes, "hub": true.
+    Responses are cached per snapshot (api/_graph_responses.py), compressed
+    and carry an ETag; If-None-Match gets a 304.
     """
     ds = _get_dataset()
-    expand = request.args.get("expand")
-    if expand:
-        if expand not in ds["nodes"]:
-            return jsonify({"error": f"Unknown node: {expand}"}), 404
-        return jsonify({"elements": _expand_elements(ds, expand)})
-    return jsonify(_default_elements(ds, request.args.get("include_tracks") == "1"))
+    args = request.args
+    target = args.get("expand") or args.get("around")
+    node = ds.find(target) if target else None
+    if target and node is None:
+        return jsonify({"error": f"Unknown node: {target}"}), 404
+    responses = ds.cached("responses", ResponseCache)
+    key = _query_key(args, ds)
+    entry = responses.get(key)
+    if entry is None:
+        try:
+            payload = _expand_page(ds, node, args) if args.get("expand") else _listing_page(ds, node, args)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        if payload.get("stats", {}).get("truncated") == "time":
+            # A neighborhood cut short by the clock may be complete next time: send it, don't cache it.
+            return _send_encoded(EncodedResponse(payload, ON_DEMAND_LEVELS), responses)
+        # Hot views are pinned once they are final, i.e. with every node extra there will be.
+        entry = responses.put(key, payload, pinned=_is_hot(key) and _extras_settled(ds))
+    return _send_encoded(entry, responses)
+
+
+@api_graph.get("/data/cache", tags=[tag])
+def graph_data_cache():
+    """Return hit/miss, 304 and size counters of the current snapshot's /graph/data response cache."""
+    return jsonify(_get_dataset().cached("responses", ResponseCache).stats())
+
+
+def _clusters(ds, args):
+    """Return the snapshot's Clusters for the `by` parameter (a non-Track node type, default CLUSTER_BY)."""
+    by = args.get("by") or CLUSTER_BY
+    if by not in ds.type_names or ds.type_names.index(by) == ds.dense_code:
+        msg = f"by must be one of: {', '.join(name for name in ds.type_names if name != ds.type_names[ds.dense_code])}"
+        raise ValueError(msg)
+    return ds.cached(f"clusters:{by}", lambda: Clusters(ds, ds.type_names.index(by)))
+
+
+def _cluster_id(ds, group):
+    return "cluster:*" if group == UNGROUPED else f"cluster:{ds.ids[group]}"
+
+
+def _cluster_element(clusters, group):
+    ds = clusters.ds
+    count = clusters.size(group)
+    grouped = group != UNGROUPED
+    return {
+        "data": {
+            "id": _cluster_id(ds, group),
+            "label": f"{count} {ds.type_names[ds.dense_code]}s",
+            "type": "Cluster",
+            "group": ds.ids[group] if grouped else None,
+            "props": {
+                "group": ds.labels[group] if grouped else "(none)",
+                "members": count,
+                "internal relationships": clusters.internal[group],
+            },
+            "degree": sum(clusters.links[group].values()),
+            "count": count,
+        },
+    }
+
+
+def _aggregated_edge(clusters, group, link, weight):
+    ds = clusters.ds
+    kind, other, label, outgoing = link
+    here = _cluster_id(ds, group)
+    there = _cluster_id(ds, other) if kind == CLUSTER else ds.ids[other]
+    source, target = (here, there) if outgoing else (there, here)
+    name = ds.label_names[label]
+    return {
+        "data": {
+            "id": f"{source}|{name}|{target}",
+            "source": source,
+            "target": target,
+            "label": name,
+            "weight": weight,
+        },
+    }
+
+
+def _cluster_page(clusters, args):
+    """Return one page of cluster supernodes from cluster number `cursor` on, with their aggregated edges.
+
+    An edge between two clusters is sent with the later one, as in _listing_page;
+    the other end of every remaining edge is a node of the default view. Pages
+    default to CLUSTER_PAGE_LIMIT supernodes and hold at most edge_limit edges:
+    a cluster with more than still fit sends the rest on the next page, whose
+    cursor "<cluster>:<sent>" resumes it without listing the cluster again.
+    """
+    limit, edge_limit = _page_limits(args, (CLUSTER_PAGE_LIMIT, CLUSTER_PAGE_EDGE_LIMIT))
+    groups = clusters.groups
+    position, sent = _resumable_cursor(clusters.ds, args, len(groups))
+    nodes, edges = [], []
+    next_cursor = None
+    while position < len(groups):
+        if not sent and (len(nodes) >= limit or len(edges) >= edge_limit):
+            next_cursor = str(position)
+            break
+        group = groups[position]
+        if not sent:
+            nodes.append(_cluster_element(clusters, group))
+        own = [
+            (link, weight)
+            for link, weight in clusters.links[group].items()
+            if link[0] == NODE or clusters.index[link[1]] <= position
+        ][sent:]
+        room = edge_limit - len(edges)
+        edges.extend(_aggregated_edge(clusters, group, link, weight) for link, weight in own[:room])
+        if len(own) > room:
+            next_cursor = f"{position}:{sent + room}"
+            break
+        sent = 0
+        position += 1
+    return {
+        "elements": {"nodes": nodes, "edges": edges},
+        "stats": {"clusters": len(groups), "members": len(clusters.group_of)},
+        "next_cursor": next_cursor,
+    }
+
+
+@api_graph.get("/clusters", tags=[tag])
+def graph_clusters():
+    """Return the Tracks collapsed into cluster supernodes, one bounded page at a time.
+
+    Query parameters:
+      by=<T>          group each Track under its nearest node of type T, at most
+                      two relationships away (default Album; Artist goes through
+                      the Album)
+      drill=<id>      list the Tracks of group <id>'s cluster instead, as
+                      /graph/data?expand= does ("*": the Tracks with no group)
+      limit=<n>, cursor=<c>  as for /graph/data; the overview's pages default to
+                      GRAPH_CLUSTER_PAGE_LIMIT supernodes and at most
+                      GRAPH_CLUSTER_PAGE_EDGE_LIMIT aggregated edges
+
+    A supernode has type "Cluster", its group's id and its member count; an
+    aggregated edge carries the number of Track relationships it stands for
+    as weight (api/_graph_clusters.py). Pages are cached like /graph/data.
+    """
+    ds = _get_dataset()
+    args = request.args
+    try:
+        clusters = _clusters(ds, args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    drill = args.get("drill")
+    group = (UNGROUPED if drill == "*" else ds.find(drill)) if drill else None
+    if drill and group not in clusters.index:
+        return jsonify({"error": f"No cluster for: {drill}"}), 404
+    responses = ds.cached("responses", ResponseCache)
+    key = (("endpoint", "clusters"), *_query_key(args, ds, _CLUSTER_PARAMS))
+    entry = responses.get(key)
+    if entry is None:
+        try:
+            if drill:
+                payload = _track_page(ds, sorted(clusters.members(group), key=ds.ids.raw), args)
+            else:
+                payload = _cluster_page(clusters, args)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        entry = responses.put(key, payload)
+    return _send_encoded(entry, responses)
+
+
+def _ranked_node(ds, analytics, node):
+    return {
+        "id": ds.ids[node],
+        "label": ds.labels[node],
+        "type": ds.type_of(node),
+        "degree": ds.degree(node),
+        "trackCount": ds.track_count(node),
+        # Relative to the average node (1.0), which is easier to read than a share of 1.
+        "pagerank": round(float(analytics.pagerank[node]) * ds.node_count, 3),
+        "component": int(analytics.component[node]),
+    }
+
+
+@api_graph.get("/analytics", tags=[tag])
+def graph_analytics():
+    """Return degree distributions per node type, PageRank leaders, connected components and hubs.
+
+    Query parameters:
+      top=<n>   entries per ranking (default 25)
+
+    Computed once per snapshot over its whole adjacency (api/_graph_analytics.py),
+    treating relationships as undirected; components are numbered by size, 0
+    being the largest. Needs NumPy and SciPy: 503 without them.
+    """
+    ds = _get_dataset()
+    try:
+        top = _int_arg(request.args, "top", 25, 1, TOP_MAX)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    analytics = ds.cached("analytics", lambda: _analytics(ds))
+    if analytics is None:
+        return jsonify({"error": "Graph analytics need NumPy and SciPy: pipenv install"}), 503
+    return jsonify(
+        {
+            "nodes": ds.node_count,
+            "edges": ds.edge_count,
+            "degree": analytics.degree_distribution(),
+            "pagerank": {
+                "damping": DAMPING,
+                "iterations": analytics.iterations,
+                "top": [_ranked_node(ds, analytics, node) for node in analytics.top_pagerank(top)],
+            },
+            "components": analytics.components(top),
+            "hubs": [_ranked_node(ds, analytics, node) for node in analytics.top_degree(top)],
+        },
+    )
+
+
+@api_graph.get("/search", tags=[tag])
+def graph_search():
+    """Return the nodes best matching a free-text query, best first.
+
+    Query parameters:
+      q=<text>        words matched against labels and property values
+                      (prefix for the last word, typo-tolerant otherwise)
+      types=<T,...>   only these node types
+      limit=<n>       results to return (default 10)
+
+    Each result carries the node's id, label, type, degree and score (null
+    for an exact external_id match, which always comes first); load it with
+    /graph/data?around=<id> when it is not on screen yet.
+    """
+    ds = _get_dataset()
+    args = request.args
+    query = args.get("q", "").strip()
+    try:
+        limit = _int_arg(args, "limit", 10, 1, SEARCH_LIMIT_MAX)
+        codes = _type_codes(ds, args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    hits = ds.cached("search", lambda: SearchIndex(ds)).search(query, limit, codes) if query else []
+    exact = ds.find(query) if query else None
+    if exact is not None and (codes is None or ds.node_type[exact] in codes):
+        hits = [(exact, None), *[hit for hit in hits if hit[0] != exact]][:limit]
+    return jsonify(
+        {
+            "query": query,
+            "results": [
+                {
+                    "id": ds.ids[node],
+                    "label": ds.labels[node],
+                    "type": ds.type_of(node),
+                    "degree": ds.degree(node),
+                    "score": score,
+                }
+                for node, score in hits
+            ],
+        },
+    )
+
+
+def _budget(args, fanout=None, node_caps=(PAGE_LIMIT, PAGE_LIMIT_MAX)):
+    """Return the traversal Budget for a request: max_nodes and timeout_ms, within the server's caps."""
+    return Budget(
+        fanout=fanout,
+        max_nodes=_int_arg(args, "max_nodes", node_caps[0], 1, node_caps[1]),
+        max_edges=PAGE_EDGE_LIMIT,
+        seconds=_int_arg(args, "timeout_ms", TRAVERSE_TIMEOUT_MS, 1, TRAVERSE_TIMEOUT_MS_MAX) / 1000,
+    )
+
+
+def _elements(ds, nodes, edges):
+    return {
+        "nodes": [_node_element(node, ds) for node in nodes],
+        "edges": [_edge_element(edge, ds) for edge in edges],
+    }
+
+
+@api_graph.get("/neighborhood", tags=[tag])
+def graph_neighborhood():
+    """Return the nodes within k relationships of one node, and the relationships among them.
+
+    Query parameters:
+      id=<id>           the start node
+      hops=<k>          relationships out (1-4, default 2)
+      fanout=<n>        neighbors expanded per node, best-connected first (default 50)
+      types=<T,...>     only step into these node types
+      max_nodes=<n>     node cap (default GRAPH_PAGE_LIMIT)
+      timeout_ms=<n>    time budget (default GRAPH_TRAVERSE_TIMEOUT_MS)
+
+    `hops` maps each node id to its distance; `truncated` names the limit
+    that cut the result short (fanout, nodes, edges or time), else null.
+    """
+    ds = _get_dataset()
+    args = request.args
+    start = ds.find(args.get("id", ""))
+    if start is None:
+        return jsonify({"error": f"Unknown node: {args.get('id', '')}"}), 404
+    try:
+        hops = _int_arg(args, "hops", 2, 1, TRAVERSE_MAX_HOPS)
+        codes = _type_codes(ds, args)
+        budget = _budget(args, fanout=_int_arg(args, "fanout", TRAVERSE_FANOUT, 1, TRAVERSE_FANOUT_MAX))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    distance = k_hop(ds, start, hops, budget, type_codes=codes)
+    edges = induced_edges(ds, distance, budget)
+    return jsonify(
+        {
+            "elements": _elements(ds, distance, edges),
+            "hops": {ds.ids[node]: depth for node, depth in distance.items()},
+            "truncated": budget.exceeded,
+        },
+    )
+
+
+@api_graph.get("/path", tags=[tag])
+def graph_path():
+    """Return a shortest path between two nodes (relationships followed either way).
+
+    Query parameters:
+      from=<id>, to=<id>  the endpoints
+      types=<T,...>       only pass through these node types
+      max_nodes=<n>       nodes the search may visit (default and cap 200000)
+      timeout_ms=<n>      time budget (default GRAPH_TRAVERSE_TIMEOUT_MS)
+
+    `found` is false with `truncated` null when no path exists, and false
+    with `truncated` set when the budget ran out before one was found.
+    """
+    ds = _get_dataset()
+    args = request.args
+    ends = [ds.find(args.get(name, "")) for name in ("from", "to")]
+    missing = [args.get(name, "") for name, node in zip(("from", "to"), ends, strict=True) if node is None]
+    if missing:
+        return jsonify({"error": f"Unknown node: {', '.join(missing)}"}), 404
+    try:
+        codes = _type_codes(ds, args)
+        budget = _budget(args, node_caps=(PATH_MAX_VISITED, PATH_MAX_VISITED))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    found = shortest_path(ds, ends[0], ends[1], budget, type_codes=codes)
+    nodes, edges = found or ([], [])
+    return jsonify(
+        {
+            "found": found is not None,
+            "length": len(edges) if found else None,
+            "path": [ds.ids[node] for node in nodes],
+            "elements": _elements(ds, nodes, edges),
+            "truncated": budget.exceeded,
+        },
+    )
+
+
+@api_graph.post("/subgraph", tags=[tag])
+def graph_subgraph():
+    """Return the given nodes and every relationship among them.
+
+    JSON body: {"ids": [<id>, ...]} (at most GRAPH_PAGE_LIMIT ids); query
+    parameter timeout_ms as for /graph/neighborhood. Unknown ids are listed
+    in `missing`.
+    """
+    ds = _get_dataset()
+    body = request.get_json(silent=True) or {}
+    ids = body.get("ids") if isinstance(body, dict) else None
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({"error": 'Expected a JSON body {"ids": [<external_id>, ...]}'}), 400
+    if len(ids) > PAGE_LIMIT:
+        return jsonify({"error": f"At most {PAGE_LIMIT} ids per request"}), 400
+    try:
+        budget = _budget(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    found = {i: ds.find(i) for i in dict.fromkeys(ids)}
+    nodes = [node for node in found.values() if node is not None]
+    edges = induced_edges(ds, set(nodes), budget)
+    return jsonify(
+        {
+            "elements": _elements(ds, nodes, edges),
+            "missing": [i for i, node in found.items() if node is None],
+            "truncated": budget.exceeded,
+        },
+    )
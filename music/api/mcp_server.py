@@ -3,9 +3,9 @@ import json
 import logging
 import os
 
-import requests
 from api._env import update_env_variable
 from api._music_data import MCP_SERVER_DEFAULTS
+from api._platform import config_request, parse_json
 from flask import render_template, request
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -76,28 +76,13 @@ def create_mcp_server():
     logger.info("Creating MCP Server at: %s", api_url)
     logger.debug("Request payload: %s", json.dumps(payload, indent=2))
 
-    response = requests.post(
-        api_url,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {sa_token}",
-        },
-        json=payload,
-        timeout=30,
-    )
+    response = config_request("POST", api_url, sa_token, json=payload)
 
     logger.info("Response status: %s", response.status_code)
     logger.debug("Response headers: %s", response.headers)
     logger.debug("Response text: %s", response.text)
 
-    try:
-        response_json = response.json()
-    except ValueError:
-        response_json = {
-            "message": "Invalid JSON response",
-            "status": response.status_code,
-            "response_text": response.text[:500] if response.text else "No response body",
-        }
+    response_json = parse_json(response)
 
     mcp_server_id_saved = False
     mcp_server_id = None
@@ -29,6 +29,10 @@ other ID is created and saved as it goes.
 AuthZEN evaluations and CIQ executes are deliberately NOT replayed: they are
 reads/runs, not creations: use the evaluate/execute forms once provisioned.
 
+Each run is profiled (api._profiler): the final `done` event carries per-step
+wall time, platform round trips, bytes sent, retries and sleep time, and the
+run is exported as a Chrome trace-event file under profiles/.
+
 The /backfill routes serve a different entry point: a music sandbox that was
 created OUTSIDE this app. Given only the prerequisites (URL, tokens,
 PROJECT_ID), they recover every derived ID into .env so the app's forms work
@@ -36,9 +40,12 @@ against that sandbox. Two naming schemes are recognized: the fixed names from
 data/music_manifest.json (scripts using this repo's data), and the Hub
 console's sandbox flow, which deploys the same music templates under
 random-suffixed names ("<base>-<6 digits>-<index>", "app-<6 digits>", ...) and
-creates no MCP server. Each lookup is a read-only GET: nothing is created or
-modified on the platform. The one-by-one buttons and the provisioning run
-never need the backfill; they populate .env themselves as they create things.
+creates no MCP server. Every lookup is a read-only GET: nothing is created or
+modified on the platform. Each config type is listed once up front and the
+lookups are resolved concurrently against those listings, over the shared
+pooled platform session, and the recovered IDs land in .env in a single write.
+The one-by-one buttons and the provisioning run never need the backfill; they
+populate .env themselves as they create things.
 """
 
 import html
@@ -47,11 +54,12 @@ import logging
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import quote
 
 import requests
-from api._env import remove_env_variables, update_env_variable
+from api._env import refresh_env, remove_env_variables, saved_env, update_env_variable, update_env_variables
 from api._music_data import (
     APP_AGENT_DEFAULTS,
     APPLICATION_DEFAULTS,
@@ -63,10 +71,11 @@ from api._music_data import (
     TOKEN_INTROSPECT_DEFAULTS,
     kbac_for_slot,
 )
+from api._platform import config_request
+from api._profiler import RunProfile, note_retry, recording, timed_sleep
 from api.authorization_policy import _default_for_slot as _kbac_default_for_slot
 from api.ciq_knowledge_query import _default_for_slot as _query_default_for_slot
 from api.ciq_policy import _default_for_slot as _policy_default_for_slot
-from dotenv import dotenv_values, load_dotenv
 from flask import Response, current_app, render_template, request, stream_with_context
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field
@@ -339,7 +348,7 @@ def build_steps():
 
 def missing_prerequisites():
     """Return the PREREQUISITES entries whose .env key is absent or empty."""
-    saved = {key for key, value in (dotenv_values(ENV_FILE) or {}).items() if value}
+    saved = {key for key, value in saved_env().items() if value}
     return [entry for entry in PREREQUISITES if entry[0] not in saved]
 
 
@@ -362,7 +371,7 @@ def _assess_create(step, page_text, before):
     the previous run's values would otherwise report as success and mask the
     failure from the required-step abort.
     """
-    saved = dotenv_values(ENV_FILE) or {}
+    saved = saved_env()
     present = all(saved.get(key) for key in step["env_keys"])
     # "changed" includes newly-set: the App Agent recovery path legitimately
     # re-saves the same agent id while minting a fresh APP_TOKEN, and the
@@ -379,16 +388,17 @@ def _assess_create(step, page_text, before):
 
 def _purge_derived_env():
     """Drop every project-scoped .env key after a NEW project was created."""
-    saved = dotenv_values(ENV_FILE) or {}
+    saved = saved_env()
     remove_env_variables([key for key in saved if key not in _BASE_ENV_KEYS])
 
 
 def _read_ikg_status(url_endpoints, sa_token, project_id):
     """Read the project's ikg_status (PENDING/ACTIVE/FAILED/...). Returns (status, error_message)."""
     try:
-        response = requests.get(
+        response = config_request(
+            "GET",
             f"{url_endpoints}/configs/v1/projects/{project_id}",
-            headers={"Authorization": f"Bearer {sa_token}"},
+            sa_token,
             timeout=REQUEST_TIMEOUT,
         )
     except requests.RequestException as e:
@@ -426,7 +436,7 @@ def _ikg_step_iter():
             yield "result", (False, "project IKG provisioning FAILED - delete the project and provision again")
             return
         yield "progress", f"waiting for the project IKG to provision: {status or err} ({elapsed}s)"
-        time.sleep(IKG_POLL_DELAY_SECONDS)
+        timed_sleep(IKG_POLL_DELAY_SECONDS, "IKG poll")
     minutes = IKG_READY_DEADLINE_SECONDS // 60
     yield "result", (False, f"project IKG still not ACTIVE after {minutes} minutes - check the project in the Hub")
 
@@ -441,7 +451,7 @@ def _settle_iter():
     if not os.getenv("APP_TOKEN"):
         yield "result", (False, "APP_TOKEN missing from env - the App Agent credentials step did not save it")
         return
-    time.sleep(AGENT_SETTLE_SECONDS)
+    timed_sleep(AGENT_SETTLE_SECONDS, "agent settle")
     update_env_variable("AGENT_READY", "true")
     yield "result", (True, "APP_TOKEN present - agent credentials are ready")
 
@@ -456,7 +466,7 @@ def _resave_agent_permissions(url_endpoints, sa_token, app_agent_id):
     """
     url = f"{url_endpoints}/configs/v1/application-agents/{app_agent_id}"
     try:
-        read = requests.get(url, headers={"Authorization": f"Bearer {sa_token}"}, timeout=REQUEST_TIMEOUT)
+        read = config_request("GET", url, sa_token, timeout=REQUEST_TIMEOUT)
         # None = could not read the current permissions; a present-but-empty
         # list is a REAL permission set and must be re-saved as-is, never
         # silently replaced with the bundled defaults.
@@ -470,12 +480,7 @@ def _resave_agent_permissions(url_endpoints, sa_token, app_agent_id):
                 permissions = body["api_permissions"]
         if permissions is None:
             permissions = APP_AGENT_DEFAULTS.get("api_permissions", [])
-        response = requests.put(
-            url,
-            headers={"Content-Type": "application/json", "Authorization": f"Bearer {sa_token}"},
-            json={"api_permissions": permissions},
-            timeout=REQUEST_TIMEOUT,
-        )
+        response = config_request("PUT", url, sa_token, json={"api_permissions": permissions}, timeout=REQUEST_TIMEOUT)
     except requests.RequestException:
         logger.exception("Failed to re-save app agent permissions")
         return False
@@ -590,6 +595,7 @@ def _capture_iter(client, step):
         logger.warning("Capture %s try %s/%s failed: %s", step["path"], attempt, CAPTURE_TRIES, detail)
         if attempt >= CAPTURE_TRIES or kind is None:
             break
+        note_retry(f"capture {kind}")
         if kind == "denial":
             resaved = _resave_agent_permissions(
                 os.getenv("URL_ENDPOINTS"),
@@ -608,13 +614,13 @@ def _capture_iter(client, step):
                     f"retrying in {CAPTURE_RETRY_DELAY_SECONDS}s"
                 ),
             )
-            time.sleep(CAPTURE_RETRY_DELAY_SECONDS)
+            timed_sleep(CAPTURE_RETRY_DELAY_SECONDS, "capture denial retry")
         else:
             yield (
                 "progress",
                 f"try {attempt} hit a transient platform error: waiting {EVAL_ERROR_RETRY_DELAY_SECONDS}s",
             )
-            time.sleep(EVAL_ERROR_RETRY_DELAY_SECONDS)
+            timed_sleep(EVAL_ERROR_RETRY_DELAY_SECONDS, "platform error cache")
     yield "result", (False, f"{detail} (after {attempt} tr{'y' if attempt == 1 else 'ies'})")
 
 
@@ -637,7 +643,7 @@ def _execute_step(client, step):
             for kind, payload in iterator:
                 yield ("substep", payload) if kind == "progress" else ("result", payload)
             return
-        before = dotenv_values(ENV_FILE) or {}
+        before = saved_env()
         response = client.post(step["path"], data=step["payload"]())
         yield "result", _assess_create(step, response.get_data(as_text=True), before)
     except Exception as exc:
@@ -653,7 +659,7 @@ def _execute_step(client, step):
 @api_provision.get("/run", tags=[tag])
 def show_run_form():
     """Display the provision page with the prerequisite checklist and step list."""
-    load_dotenv(ENV_FILE, override=True)
+    refresh_env()
     missing = missing_prerequisites()
     return render_template(
         "provision/run_form.html",
@@ -691,7 +697,7 @@ def _reset_derived_state(skip_ids, event):
     try:
         _purge_derived_env()
         if skip_ids is not None:
-            skip_ids = {key for key, value in (dotenv_values(ENV_FILE) or {}).items() if value}
+            skip_ids = {key for key, value in saved_env().items() if value}
         detail = "cleared project-scoped values from a previous run"
     except Exception:
         logger.exception("Failed to purge project-scoped .env values")
@@ -700,28 +706,44 @@ def _reset_derived_state(skip_ids, event):
     return skip_ids, _format_event({**event, "type": "substep", "detail": detail})
 
 
+def _finish_profile(state):
+    """Export the run's trace file and return the timings for its `done` event."""
+    profile = state["profile"]
+    path = profile.export()
+    timings = profile.summary()
+    timings["trace_file"] = str(path.relative_to(ENV_FILE.parent)) if path else None
+    state["profiled"] = True
+    return timings
+
+
 def _stream_steps(client, steps, skip_ids, counts, state):
     """Run the steps in order, yielding formatted NDJSON events and updating counts.
 
     skip_ids is the set of .env keys already saved (skip steps whose keys are
     all present), or None when the user unchecked skip-existing. Sets
     state["finished"] (after sending blocked + done events) when a required
-    step fails, so the caller knows the run terminated early.
+    step fails, so the caller knows the run terminated early. Every step,
+    skipped ones included, is timed on state["profile"].
     """
+    profile = state["profile"]
     for index, step in enumerate(steps, 1):
         state["label"] = step["label"]
         event = {"type": "step", "index": index, "total": len(steps), "label": step["label"], "path": step["path"]}
+        profile.begin_step(index, step["label"])
         skipped = _skipped_event(step, skip_ids, event, counts)
         if skipped is not None:
+            profile.end_step("skipped")
             yield skipped
             continue
         logger.info("Provisioning step %s/%s: %s", index, len(steps), step["label"])
         ok, detail = False, "step yielded no result"
         for kind, payload in _execute_step(client, step):
             if kind == "substep":
+                profile.mark_substep(payload)
                 yield _format_event({**event, "type": "substep", "detail": payload})
             else:
                 ok, detail = payload
+        profile.end_step("ok" if ok else "failed")
         counts["ok" if ok else "failed"] += 1
         yield _format_event({**event, "status": "ok" if ok else "failed", "detail": detail})
         # Everything after the base setup depends on it; a failed config or
@@ -729,7 +751,7 @@ def _stream_steps(client, steps, skip_ids, counts, state):
         if not ok and step["required"]:
             yield _format_event({"type": "blocked", "detail": f"Stopping: '{step['label']}' failed"})
             state["finished"] = True
-            yield _format_event({"type": "done", "aborted": True, **counts})
+            yield _format_event({"type": "done", "aborted": True, **counts, "timings": _finish_profile(state)})
             return
         if ok and step.get("resets_derived"):
             skip_ids, reset_event = _reset_derived_state(skip_ids, event)
@@ -743,7 +765,7 @@ def run_provisioning():
     client = current_app.test_client()
 
     def event_stream(state):
-        load_dotenv(ENV_FILE, override=True)
+        refresh_env()
         missing = missing_prerequisites()
         if missing:
             labels = ", ".join(label for _key, label in missing)
@@ -751,23 +773,29 @@ def run_provisioning():
             state["finished"] = True
             yield _format_event({"type": "done", "aborted": True, "ok": 0, "failed": 0, "skipped": 0})
             return
-        # Skip decisions come from the .env FILE, not os.environ: stale ids can
-        # survive in the process environment after a project delete.
-        saved_ids = {key for key, value in (dotenv_values(ENV_FILE) or {}).items() if value}
+        # Skip decisions come from the state store, not os.environ: stale ids
+        # can survive in a process environment the store did not populate.
+        saved_ids = {key for key, value in saved_env().items() if value}
         steps = build_steps()
         yield _format_event({"type": "start", "total": len(steps)})
         counts = {"ok": 0, "failed": 0, "skipped": 0}
-        yield from _stream_steps(client, steps, saved_ids if skip_existing else None, counts, state)
+        with recording(state["profile"]):
+            yield from _stream_steps(client, steps, saved_ids if skip_existing else None, counts, state)
         if state["finished"]:  # a required step failed and already sent its done event
             return
         state["finished"] = True
-        yield _format_event({"type": "done", "aborted": False, **counts})
+        yield _format_event({"type": "done", "aborted": False, **counts, "timings": _finish_profile(state)})
 
     def guarded_stream():
         # A closed browser tab / page reload aborts the response mid-run with a
         # silent GeneratorExit at the next yield. Nothing can keep the run going
         # once the client is gone, but it must never be invisible in the log.
-        state = {"finished": False, "label": "before the first step"}
+        state = {
+            "finished": False,
+            "label": "before the first step",
+            "profile": RunProfile("provision"),
+            "profiled": False,
+        }
         try:
             yield from event_stream(state)
         finally:
@@ -777,6 +805,9 @@ def run_provisioning():
                     "Steps already completed are saved in .env — re-run with skip-existing to continue.",
                     state["label"],
                 )
+                # The partial run's trace still shows where the time went.
+                if not state["profiled"] and state["label"] != "before the first step":
+                    state["profile"].export()
 
     return Response(
         stream_with_context(guarded_stream()),
@@ -834,7 +865,7 @@ def build_backfill_lookups():
 
 def missing_backfill_prerequisites():
     """Return the BACKFILL_PREREQUISITES entries whose .env key is absent or empty."""
-    saved = {key for key, value in (dotenv_values(ENV_FILE) or {}).items() if value}
+    saved = {key for key, value in saved_env().items() if value}
     return [entry for entry in BACKFILL_PREREQUISITES if entry[0] not in saved]
 
 
@@ -842,8 +873,8 @@ def missing_backfill_prerequisites():
 # templates but suffix every name: policies/queries become
 # "<base>-<6 digits>-<index>", and the singletons are named "app-<6 digits>",
 # "agent-<6 digits>", "token-introspect-<6 digits>" (no MCP server is created
-# at all). When the fixed-name read misses, the fallback lists the project's
-# configs once per type and matches these patterns.
+# at all). The run lists the project's configs once per type up front and
+# matches both the fixed names and these patterns against that listing.
 _CONSOLE_SUFFIX = r"-\d{6}-\d+$"
 _CONSOLE_SINGLETON_PATTERNS = {
     "applications": re.compile(r"^app-\d{6}$"),
@@ -851,29 +882,52 @@ _CONSOLE_SINGLETON_PATTERNS = {
     "token-introspects": re.compile(r"^token-introspect-\d{6}$"),
     "mcp-servers": None,
 }
+# Lookups are independent reads, so they run concurrently over the pooled
+# platform session (api/_platform.py): the whole backfill costs roughly its
+# slowest round trip instead of the sum of ~80 of them.
+BACKFILL_MAX_WORKERS = 8
 
 
-def _list_configs(resource, cache):
-    """List the project's configs of one type (cached per run); [] on any error."""
-    if resource not in cache:
-        url = f"{os.getenv('URL_ENDPOINTS', '')}/configs/v1/{resource}"
-        entries = []
-        try:
-            response = requests.get(
-                url,
-                params={"project_id": os.getenv("PROJECT_ID", "")},
-                headers={"Authorization": f"Bearer {os.getenv('SA_TOKEN', '')}"},
-                timeout=REQUEST_TIMEOUT,
-            )
-            if HTTP_OK <= response.status_code < HTTP_MULTIPLE_CHOICES:
-                data = response.json().get("data")
-                entries = data if isinstance(data, list) else []
-            else:
-                logger.warning("Listing %s returned status %s", resource, response.status_code)
-        except (requests.exceptions.RequestException, ValueError):
-            logger.exception("Listing %s failed", resource)
-        cache[resource] = entries
-    return cache[resource]
+def _list_configs(sa_token, resource):
+    """List the project's configs of one type; None when the listing itself failed."""
+    url = f"{os.getenv('URL_ENDPOINTS', '')}/configs/v1/{resource}"
+    try:
+        response = config_request(
+            "GET",
+            url,
+            sa_token,
+            params={"project_id": os.getenv("PROJECT_ID", "")},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not HTTP_OK <= response.status_code < HTTP_MULTIPLE_CHOICES:
+            logger.warning("Listing %s returned status %s", resource, response.status_code)
+            return None
+        data = response.json().get("data")
+    except (requests.exceptions.RequestException, ValueError, AttributeError):
+        logger.exception("Listing %s failed", resource)
+        return None
+    return data if isinstance(data, list) else []
+
+
+def _prefetch_listings(sa_token, executor, resources):
+    """List every resource type once, concurrently, and index each listing by name.
+
+    Returns {resource: {"entries": [...], "by_name": {name: entry}}}, with None
+    for a type whose listing failed (its lookups fall back to the fixed-name read).
+    """
+    futures = {resource: executor.submit(_list_configs, sa_token, resource) for resource in resources}
+    listings = {}
+    for resource, future in futures.items():
+        entries = future.result()
+        if entries is None:
+            listings[resource] = None
+            continue
+        by_name = {}
+        for entry in entries:
+            if isinstance(entry, dict) and entry.get("name"):
+                by_name.setdefault(entry["name"], entry)
+        listings[resource] = {"entries": [e for e in entries if isinstance(e, dict)], "by_name": by_name}
+    return listings
 
 
 def _console_candidates(lookup, entries):
@@ -894,13 +948,13 @@ def _console_candidates(lookup, entries):
     return matches
 
 
-def _match_console_name(lookup, cache):
+def _match_console_name(lookup, entries):
     """Try to resolve a lookup against console-sandbox naming: (status, detail, id) or None.
 
     Returns None when the listing holds no plausible match: the caller keeps
     the fixed-name "missing" outcome.
     """
-    matches = _console_candidates(lookup, _list_configs(lookup["resource"], cache))
+    matches = _console_candidates(lookup, entries)
     if not matches:
         return None
     if len(matches) > 1:
@@ -912,14 +966,15 @@ def _match_console_name(lookup, cache):
     return "ok", f"matched console-sandbox config {matched.get('name')}", matched["id"]
 
 
-def _fetch_config_id(lookup):
+def _fetch_config_id(sa_token, lookup):
     """Resolve one config's ID by name: ("ok"|"missing"|"failed", detail, id|None)."""
     url = f"{os.getenv('URL_ENDPOINTS', '')}/configs/v1/{lookup['resource']}/{quote(lookup['name'], safe='')}"
     try:
-        response = requests.get(
+        response = config_request(
+            "GET",
             url,
+            sa_token,
             params={"location": os.getenv("PROJECT_ID", "")},
-            headers={"Authorization": f"Bearer {os.getenv('SA_TOKEN', '')}"},
             timeout=REQUEST_TIMEOUT,
         )
     except requests.exceptions.RequestException as exc:
@@ -944,25 +999,34 @@ def _fetch_config_id(lookup):
     return "ok", config_id, config_id
 
 
-def _resolve_lookup(lookup, listing_cache):
-    """Resolve one lookup: fixed-name read first, console-listing fallback on a miss."""
-    status, detail, config_id = _fetch_config_id(lookup)
-    if status == "ok":
-        return "ok", f"{lookup['env_key']} saved", config_id
-    if status == "missing":
-        # Console-created sandboxes suffix every name: retry against the
-        # project listing before reporting the config as absent.
-        fallback = _match_console_name(lookup, listing_cache)
+def _resolve_lookup(sa_token, lookup, listings):
+    """Resolve one lookup from the prefetched listing, with the fixed-name read as the fallback.
+
+    A fixed-name hit in the listing wins, then console-suffixed naming. Only a
+    lookup the listing cannot answer (listing failed, or no match at all) pays
+    its own round trip: the read confirms a real miss even if the listing was
+    truncated.
+    """
+    listing = listings.get(lookup["resource"])
+    if listing is not None:
+        entry = listing["by_name"].get(lookup["name"])
+        if entry and entry.get("id"):
+            return "ok", f"{lookup['env_key']} saved", entry["id"]
+        fallback = _match_console_name(lookup, listing["entries"])
         if fallback:
             status, fallback_detail, config_id = fallback
             detail = f"{lookup['env_key']} saved ({fallback_detail})" if status == "ok" else fallback_detail
+            return status, detail, config_id
+    status, detail, config_id = _fetch_config_id(sa_token, lookup)
+    if status == "ok":
+        return "ok", f"{lookup['env_key']} saved", config_id
     return status, detail, config_id
 
 
 @api_provision.get("/backfill", tags=[tag])
 def show_backfill_form():
     """Display the backfill page with the prerequisite checklist and lookup list."""
-    load_dotenv(ENV_FILE, override=True)
+    refresh_env()
     missing = missing_backfill_prerequisites()
     return render_template(
         "provision/backfill_form.html",
@@ -979,42 +1043,65 @@ def run_backfill():
     skip_existing = request.form.get("skip_existing") == "true"
 
     def event_stream():
-        load_dotenv(ENV_FILE, override=True)
+        refresh_env()
         missing = missing_backfill_prerequisites()
         if missing:
             labels = ", ".join(label for _key, label in missing)
             yield _format_event({"type": "blocked", "detail": f"Missing from .env: {labels}"})
             yield _format_event({"type": "done", "aborted": True, "ok": 0, "failed": 0, "skipped": 0, "missing": 0})
             return
-        saved_ids = {key for key, value in (dotenv_values(ENV_FILE) or {}).items() if value}
+        saved_ids = {key for key, value in saved_env().items() if value}
         lookups = build_backfill_lookups()
         yield _format_event({"type": "start", "total": len(lookups)})
         counts = {"ok": 0, "failed": 0, "skipped": 0, "missing": 0}
-        listing_cache = {}
-        for index, lookup in enumerate(lookups, 1):
-            label = f"{lookup['label']}: {lookup['name']}" if lookup["name"] else lookup["label"]
-            event = {
-                "type": "step",
-                "index": index,
-                "total": len(lookups),
-                "label": label,
-                "path": lookup["env_key"],
+        pending = [lookup for lookup in lookups if not (skip_existing and lookup["env_key"] in saved_ids)]
+        # Every recovered ID is saved in ONE .env rewrite at the end (or when
+        # the client disconnects mid-run, so nothing already resolved is lost).
+        recovered = {}
+        sa_token = os.getenv("SA_TOKEN", "")
+        with ThreadPoolExecutor(max_workers=BACKFILL_MAX_WORKERS) as executor:
+            listings = _prefetch_listings(
+                sa_token,
+                executor,
+                sorted({lookup["resource"] for lookup in pending if lookup["resource"]}),
+            )
+            futures = {
+                lookup["env_key"]: executor.submit(_resolve_lookup, sa_token, lookup, listings)
+                for lookup in pending
+                if lookup["resource"] is not None
             }
-            if skip_existing and lookup["env_key"] in saved_ids:
-                counts["skipped"] += 1
-                yield _format_event({**event, "status": "skipped", "detail": f"{lookup['env_key']} already set"})
-                continue
-            if lookup["resource"] is None:
-                update_env_variable(lookup["env_key"], "true")
-                counts["ok"] += 1
-                detail = f"{lookup['env_key']}=true (not readable via the Config API: assumed already captured)"
-                yield _format_event({**event, "status": "ok", "detail": detail})
-                continue
-            status, detail, config_id = _resolve_lookup(lookup, listing_cache)
-            if status == "ok":
-                update_env_variable(lookup["env_key"], config_id)
-            counts[status] += 1
-            yield _format_event({**event, "status": status, "detail": detail})
+            try:
+                # Reported in lookup order: the lookups already run in parallel,
+                # so waiting on each in turn costs nothing over completion order.
+                for index, lookup in enumerate(lookups, 1):
+                    label = f"{lookup['label']}: {lookup['name']}" if lookup["name"] else lookup["label"]
+                    event = {
+                        "type": "step",
+                        "index": index,
+                        "total": len(lookups),
+                        "label": label,
+                        "path": lookup["env_key"],
+                    }
+                    if skip_existing and lookup["env_key"] in saved_ids:
+                        counts["skipped"] += 1
+                        detail = f"{lookup['env_key']} already set"
+                        yield _format_event({**event, "status": "skipped", "detail": detail})
+                        continue
+                    if lookup["resource"] is None:
+                        recovered[lookup["env_key"]] = "true"
+                        counts["ok"] += 1
+                        detail = f"{lookup['env_key']}=true (not readable via the Config API: assumed already captured)"
+                        yield _format_event({**event, "status": "ok", "detail": detail})
+                        continue
+                    status, detail, config_id = futures[lookup["env_key"]].result()
+                    if status == "ok":
+                        recovered[lookup["env_key"]] = config_id
+                    counts[status] += 1
+                    yield _format_event({**event, "status": status, "detail": detail})
+            finally:
+                for future in futures.values():
+                    future.cancel()
+                update_env_variables(recovered)
         yield _format_event({"type": "done", "aborted": False, **counts})
 
     return Response(
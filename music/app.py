@@ -5,7 +5,12 @@ import logging
 import os
 from pathlib import Path
 
+from api._authzen_gateway import gateway_stats
+from api._ciq_cache import get_cache as get_ciq_cache
+from api._env import refresh_env, saved_env
 from api._music_data import CIQ_POLICIES, CIQ_QUERIES, EVALUATIONS, KBACS
+from api._platform import platform_metrics
+from api._singleflight import get_flights
 
 # Register apis
 from api.app_agent import api_app_agent
@@ -24,7 +29,6 @@ from api.project import api_project
 from api.provision import api_provision
 from api.relationships import api_relationships
 from api.token_introspect import api_token_introspect
-from dotenv import dotenv_values, load_dotenv
 from flask import render_template
 from flask_openapi3 import Info, OpenAPI, SecurityScheme
 
@@ -62,11 +66,11 @@ logger.info("=" * 50)
 logger.info("Flask application starting...")
 logger.info("=" * 50)
 
-# Load .env from the same directory as app.py so `flask run` works regardless of
-# the current working directory. override=True picks up edits made by /api_*/create
-# routes (which append IDs/tokens to the same file) on subsequent reloads.
+# Saved values live in the state store (api/_state.py), which imports .env from
+# the same directory as app.py on first use, so `flask run` works regardless of
+# the current working directory; hand edits to .env are picked up on each request.
 ENV_FILE = Path(__file__).parent / ".env"
-load_dotenv(ENV_FILE, override=True)
+refresh_env()
 sa_token = os.getenv("SA_TOKEN")
 app_token = os.getenv("APP_TOKEN")
 url = os.getenv("URL_ENDPOINTS")
@@ -101,8 +105,14 @@ app.register_api(api_graph)
 app.register_api(api_data_schema)
 
 
-# Memoized on the .env mtime so page renders don't re-parse the file.
-_graph_flags_cache = {"key": (), "value": False}
+@app.before_request
+def sync_saved_env():
+    """Pick up values saved by other threads/workers (or a hand-edited .env) before each request.
+
+    A version check against the state store; the values are only reloaded
+    into os.environ when something actually changed.
+    """
+    refresh_env()
 
 
 @app.context_processor
@@ -113,20 +123,11 @@ def inject_graph_availability():
     once (CAPTURED_* flags written by the capture routes and by the backfill),
     so the graph page isn't offered before there is anything in the IKG.
 
-    Read from the .env FILE, not os.environ: a project delete cleans the file,
-    but stale flags survive in the process environment until Flask restarts.
+    Read from the state store, which a project delete cleans, so a stale flag
+    can never keep the graph unlocked.
     """
-    try:
-        key = ENV_FILE.stat().st_mtime_ns
-    except OSError:
-        key = None
-    if _graph_flags_cache["key"] != key:
-        saved = dotenv_values(ENV_FILE) or {}
-        _graph_flags_cache["value"] = (
-            saved.get("CAPTURED_NODES") == "true" and saved.get("CAPTURED_RELATIONSHIPS") == "true"
-        )
-        _graph_flags_cache["key"] = key
-    return {"graph_available": _graph_flags_cache["value"]}
+    saved = saved_env()
+    return {"graph_available": saved.get("CAPTURED_NODES") == "true" and saved.get("CAPTURED_RELATIONSHIPS") == "true"}
 
 
 def _slot_suffix(slot: str) -> str:
@@ -217,5 +218,29 @@ def index():
     )
 
 
+@app.get("/platform/metrics")
+def platform_metrics_view():
+    """Per-endpoint call counts, statuses and latency of this process's platform calls."""
+    return platform_metrics()
+
+
+@app.get("/authzen/gateway/stats")
+def authzen_gateway_stats_view():
+    """Batch sizes and decision-cache hit rate of this process's AuthZEN evaluations."""
+    return gateway_stats()
+
+
+@app.get("/ciq/cache/stats")
+def ciq_cache_stats_view():
+    """Hit rate, entries and invalidations of this process's CIQ result cache."""
+    return get_ciq_cache().stats()
+
+
+@app.get("/ciq/coalescing/stats")
+def ciq_coalescing_stats_view():
+    """How many CIQ executes joined an identical call already in flight instead of making their own."""
+    return get_flights().stats()
+
+
 if __name__ == "__main__":
     app.run(debug=False)
@@ -0,0 +1,311 @@
+# Copyright (c) 2026 IndyKite
+"""Replay CIQ knowledge queries with many virtual users and report per-slot latency.
+
+Each virtual user walks a plan of (slot, input_params) steps in order - by
+default every read-only step of data/scenario.json - starting at a different
+step, pausing a random think time between steps, until the run is over. Users
+start one by one over the ramp-up period. The auth headers follow the slot's
+policy subject exactly as the chat does (app-subject: app token only;
+person-subject: app token + a user Bearer token), so one plan mixes both kinds
+of traffic; --user-tokens gives each virtual user its own person.
+
+    python bench_ciq_load.py --users 50 --ramp-up 10 --duration 60 --think 1.5
+    python bench_ciq_load.py --slots 1,3,14 --users 20
+    python bench_ciq_load.py --plan my_plan.json      # [{"slot": "3", "params": {...}, "weight": 2}, ...]
+    python bench_ciq_load.py --stub --users 100       # local stand-in platform (CI)
+
+Against the real platform it reads URL_ENDPOINTS, APP_TOKEN, USER_TOKEN and
+the CIQ_QUERY_ID_<slot> values saved in .env, straight from the file (the
+process environment fills in what it lacks), and never writes anything: not
+even the import of a hand-edited .env into state.db that the app does. It calls
+/contx-iq/v1/execute directly, bypassing the app's result cache and request
+coalescing so every step is a real query. Write steps (upserts/deletes) are
+skipped unless --include-writes is given: they would change the graph.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from api._ciq_cache import is_write_slot
+from api._music_data import CIQ_EXECUTE_SLOTS, ciq_execute_for_slot
+from api._platform import data_request, parse_json
+from api._state import ENV_FILE
+from api.chat import _load_scenario, _needs_user_token
+from dotenv import dotenv_values
+
+HTTP_OK = 200
+HTTP_MULTIPLE_CHOICES = 300
+HTTP_BAD_REQUEST = 400
+PERCENTILES = (0.50, 0.90, 0.95, 0.99)
+
+
+class _StubPlatform(BaseHTTPRequestHandler):
+    """Stand-in CIQ execute endpoint: answers after latency +/- jitter, checking the auth headers."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.1
+    jitter = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))  # noqa: S311
+        if not self.headers.get("X-IK-ClientKey") or not body.get("id"):
+            status, payload = HTTP_BAD_REQUEST, {"message": "missing client key or query id"}
+        else:
+            status, payload = HTTP_OK, {"data": [{"nodes": {"stub.query": body["id"]}}]}
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *_args: object):
+        pass
+
+
+def _start_stub(latency, jitter):
+    handler = type("StubPlatform", (_StubPlatform,), {"latency": latency, "jitter": jitter})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 4096
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_plan(args):
+    """Return the list of {"slot", "params", "weight"} steps the virtual users walk."""
+    if args.plan:
+        with Path(args.plan).open() as f:
+            steps = [
+                {"slot": str(s["slot"]), "params": s.get("params", {}), "weight": s.get("weight", 1)}
+                for s in json.load(f)
+            ]
+    elif args.slots:
+        steps = [
+            {"slot": slot, "params": ciq_execute_for_slot(slot).get("input_params", {}), "weight": 1}
+            for slot in (s.strip() for s in args.slots.split(","))
+            if slot
+        ]
+    else:
+        steps = [
+            {
+                "slot": step["slot"],
+                "params": step.get("params", {}),
+                "weight": 1,
+                "empty_message": step.get("empty_message"),
+            }
+            for scene in _load_scenario()["scenes"]
+            for step in scene["steps"]
+        ]
+    unknown = sorted({s["slot"] for s in steps} - set(CIQ_EXECUTE_SLOTS))
+    if unknown:
+        msg = f"Unknown slot(s): {', '.join(unknown)}"
+        raise SystemExit(msg)
+    if not args.include_writes:
+        steps = [s for s in steps if not s.pop("empty_message", None) and not is_write_slot(s["slot"])]
+    # Weighted steps are simply repeated in the walk.
+    return [step for step in steps for _ in range(max(1, int(step["weight"])))]
+
+
+class _Results:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.by_slot = {}
+
+    def add(self, slot, seconds, status):
+        with self.lock:
+            entry = self.by_slot.setdefault(slot, {"latencies": [], "errors": 0, "statuses": {}})
+            entry["latencies"].append(seconds)
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+            if not HTTP_OK <= (status if isinstance(status, int) else 0) < HTTP_MULTIPLE_CHOICES:
+                entry["errors"] += 1
+
+
+def _execute(target, step, user_token):
+    """One execute with the chat's header logic; return the status code (or "error"/"skipped")."""
+    slot = step["slot"]
+    query_id = target["query_ids"].get(slot)
+    if not query_id:
+        return "skipped"
+    if _needs_user_token(slot):
+        if not user_token:
+            return "skipped"
+    else:
+        user_token = None
+    try:
+        response = data_request(
+            "POST",
+            f"{target['url']}/contx-iq/v1/execute",
+            target["app_token"],
+            user_token,
+            json={"id": query_id, "input_params": step["params"]},
+            timeout=target["timeout"],
+            attempts=1,
+        )
+    except requests.RequestException:
+        return "error"
+    parse_json(response)
+    return response.status_code
+
+
+def _virtual_user(index, run_state):
+    plan, target, args, deadline, results = run_state
+    rng = random.Random(args.seed + index)  # noqa: S311 - load shaping, not security
+    tokens = target["user_tokens"]
+    user_token = tokens[index % len(tokens)] if tokens else None
+    position = rng.randrange(len(plan))
+    while time.monotonic() < deadline:
+        step = plan[position % len(plan)]
+        position += 1
+        start = time.perf_counter()
+        status = _execute(target, step, user_token)
+        if status != "skipped":
+            results.add(step["slot"], time.perf_counter() - start, status)
+        if args.think:
+            # Exponential think time around the mean, like independent users reading.
+            pause = min(rng.expovariate(1 / args.think), args.think * 5)
+            time.sleep(max(0.0, min(pause, deadline - time.monotonic())))
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(results, wall):
+    """Return per-slot rows (count, errors, req/s, percentiles in ms) plus a total row."""
+    rows = []
+    everything = []
+    for slot, entry in sorted(results.by_slot.items(), key=lambda item: CIQ_EXECUTE_SLOTS.index(item[0])):
+        latencies = sorted(entry["latencies"])
+        everything.extend(latencies)
+        rows.append(_row(slot, latencies, entry["errors"], wall, entry["statuses"]))
+    total_errors = sum(entry["errors"] for entry in results.by_slot.values())
+    rows.append(_row("total", sorted(everything), total_errors, wall, None))
+    return rows
+
+
+def _row(slot, latencies, errors, wall, statuses):
+    row = {
+        "slot": slot,
+        "count": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000) if latencies else 0,
+    }
+    for fraction in PERCENTILES:
+        row[f"p{round(fraction * 100)}_ms"] = round(_percentile(latencies, fraction) * 1000)
+    row["max_ms"] = round(latencies[-1] * 1000) if latencies else 0
+    if statuses is not None:
+        row["statuses"] = {str(k): v for k, v in statuses.items()}
+    return row
+
+
+def _target(args, stub):
+    """Where to send the executes: the stand-in, or the platform configured in .env."""
+    if stub is not None:
+        return {
+            "url": f"http://127.0.0.1:{stub.server_address[1]}",
+            "app_token": "stub-app-token",
+            "user_tokens": [f"stub-user-token-{i}" for i in range(max(1, args.stub_persons))],
+            "query_ids": {slot: f"stub-query-{slot}" for slot in CIQ_EXECUTE_SLOTS},
+            "timeout": args.timeout,
+        }
+    # Read as a file, not through api/_env.refresh_env(): that may import .env into state.db.
+    saved = {key: value for key, value in dotenv_values(ENV_FILE).items() if value}
+    setting = {key: saved.get(key) or os.getenv(key, "") for key in ("URL_ENDPOINTS", "APP_TOKEN", "USER_TOKEN")}
+    user_tokens = []
+    if args.user_tokens:
+        user_tokens = [line.strip() for line in Path(args.user_tokens).read_text().splitlines() if line.strip()]
+    elif setting["USER_TOKEN"]:
+        user_tokens = [setting["USER_TOKEN"]]
+    missing = [key for key in ("URL_ENDPOINTS", "APP_TOKEN") if not setting[key]]
+    if missing:
+        msg = f"Missing from .env: {', '.join(missing)} (or run with --stub)"
+        raise SystemExit(msg)
+    return {
+        "url": setting["URL_ENDPOINTS"],
+        "app_token": setting["APP_TOKEN"],
+        "user_tokens": user_tokens,
+        "query_ids": {
+            slot: saved.get(f"CIQ_QUERY_ID_{slot}") or os.getenv(f"CIQ_QUERY_ID_{slot}", "")
+            for slot in CIQ_EXECUTE_SLOTS
+        },
+        "timeout": args.timeout,
+    }
+
+
+def run(args):
+    """Drive the plan with args.users virtual users; return (rows, wall seconds)."""
+    plan = build_plan(args)
+    if not plan:
+        msg = "Nothing to run: the plan has no (read-only) steps"
+        raise SystemExit(msg)
+    stub = _start_stub(args.stub_latency, args.stub_jitter) if args.stub else None
+    try:
+        target = _target(args, stub)
+        results = _Results()
+        started = time.monotonic()
+        deadline = started + args.ramp_up + args.duration
+        run_state = (plan, target, args, deadline, results)
+        users = []
+        for index in range(args.users):
+            delay = args.ramp_up * index / args.users
+            user = threading.Timer(delay, _virtual_user, (index, run_state))
+            user.daemon = True
+            user.start()
+            users.append(user)
+        # A timer thread runs its user to the end, so joining it waits out the user's last step.
+        for user in users:
+            user.join()
+        wall = time.monotonic() - started
+    finally:
+        if stub is not None:
+            stub.shutdown()
+    return summarize(results, wall), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--plan", help="JSON list of {slot, params, weight} steps (default: data/scenario.json)")
+    source.add_argument("--slots", help="comma-separated slots, run with their default execute params")
+    parser.add_argument("--users", type=int, default=10, help="virtual users")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which the users start")
+    parser.add_argument("--duration", type=float, default=30, help="seconds at full load, after the ramp-up")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between a user's steps (0: none)")
+    parser.add_argument("--user-tokens", help="file with one user token per line, spread over the virtual users")
+    parser.add_argument("--include-writes", action="store_true", help="also run upsert/delete steps")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per execute (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for start steps and think times")
+    parser.add_argument("--stub", action="store_true", help="run against a local stand-in platform")
+    parser.add_argument("--stub-latency", type=float, default=0.1, help="stand-in seconds per execute")
+    parser.add_argument("--stub-jitter", type=float, default=0.05, help="stand-in latency spread (+/- seconds)")
+    parser.add_argument("--stub-persons", type=int, default=5, help="distinct user tokens in stub mode")
+    parser.add_argument("--json", action="store_true", help="print the summary rows as JSON")
+    args = parser.parse_args()
+
+    rows, wall = run(args)
+    if args.json:
+        print(json.dumps({"wall_s": round(wall, 2), "rows": rows}, indent=2))  # noqa: T201
+        return
+    columns = ("slot", "count", "errors", "req_per_s", "mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{args.users} users, {wall:.1f}s wall")  # noqa: T201
+    print("  ".join(f"{c:>9}" for c in columns))  # noqa: T201
+    for row in rows:
+        print("  ".join(f"{row[c]!s:>9}" for c in columns))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
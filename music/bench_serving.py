@@ -0,0 +1,222 @@
+# Copyright (c) 2026 IndyKite
+"""Benchmark the thread-per-request and cooperative (gevent) serving modes.
+
+Starts a local stand-in for the platform that answers every call after a
+fixed delay, then serves a one-route app that makes that platform call
+through api/_platform.py under gunicorn, once per worker class, and drives
+it with a burst of concurrent requests:
+
+    pipenv run python bench_serving.py --requests 2000 --concurrency 500 --latency 0.5
+
+With one worker of 8 threads, gthread tops out near 8 / latency requests per
+second and queues the rest; gevent keeps every request's upstream call in
+flight at once. "--modes flask" adds the `flask run` development server as a
+baseline (and runs without gunicorn installed).
+
+Nothing here talks to the real platform, and it never reads or writes .env.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from api._platform import data_request, parse_json
+from flask_openapi3 import OpenAPI
+
+APP_DIR = Path(__file__).parent
+HTTP_OK = 200
+STARTUP_TIMEOUT_SECONDS = 30
+
+# The app each server mode runs (gunicorn bench_serving:bench_app).
+bench_app = OpenAPI(__name__)
+
+
+@bench_app.get("/bench/call")
+def bench_call():
+    """One platform round trip, as a route handler makes it."""
+    upstream = os.getenv("BENCH_UPSTREAM", "")
+    response = data_request("POST", f"{upstream}/contx-iq/v1/execute", "bench-key", json={}, attempts=1)
+    return parse_json(response), response.status_code
+
+
+@bench_app.get("/bench/ready")
+def bench_ready():
+    return {"ok": True}
+
+
+class _SlowPlatform(BaseHTTPRequestHandler):
+    """Stand-in platform: every call succeeds after the configured delay."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client pool is exercised
+    latency = 0.5
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        body = json.dumps({"data": [], "bench": True}).encode()
+        self.send_response(HTTP_OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args: object):
+        pass
+
+
+def _start_platform(latency):
+    handler = type("SlowPlatform", (_SlowPlatform,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 4096
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_command(mode, port, args):
+    if mode == "flask":
+        return [sys.executable, "-m", "flask", "--app", "bench_serving:bench_app", "run", "--port", str(port)], {}
+    env = {
+        "WORKER_CLASS": mode,
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(args.workers),
+        "THREADS": str(args.threads),
+        "WORKER_CONNECTIONS": str(args.worker_connections),
+        "ACCESS_LOG": "",
+    }
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "bench_serving:bench_app"], env
+
+
+def _wait_ready(base_url, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f"{base_url}/bench/ready", timeout=1).status_code == HTTP_OK:
+                return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _drive(base_url, total, concurrency, timeout):
+    """Fire `total` requests, `concurrency` at a time; return per-request latencies and the error count."""
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.get(f"{base_url}/bench/call", timeout=timeout).status_code == HTTP_OK
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    latencies = sorted(seconds for ok, seconds in results if ok)
+    return latencies, sum(1 for ok, _ in results if not ok)
+
+
+def run_mode(mode, upstream, args):
+    """Serve bench_app in one mode, drive it, and return its summary row (None if it could not start)."""
+    port = _free_port()
+    command, env = _server_command(mode, port, args)
+    process = subprocess.Popen(  # noqa: S603 - fixed argv built above
+        command,
+        cwd=APP_DIR,
+        env={**os.environ, **env, "BENCH_UPSTREAM": upstream},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not _wait_ready(base_url, process):
+            process.kill()
+            detail = (process.communicate(timeout=5)[1] or "").strip().splitlines()
+            print(f"{mode}: server did not start ({detail[-1] if detail else 'no output'})")  # noqa: T201
+            return None
+        started = time.perf_counter()
+        latencies, errors = _drive(base_url, args.requests, args.concurrency, args.timeout)
+        wall = time.perf_counter() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "mode": mode,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 2),
+        "req_per_s": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000),
+        "mean_ms": round(statistics.fmean(latencies) * 1000) if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--modes", default="gthread,gevent", help="comma-separated: gthread, gevent, sync, flask")
+    parser.add_argument("--requests", type=int, default=1000, help="total requests per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests in flight from the load driver")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the stand-in platform takes per call")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads per worker")
+    parser.add_argument("--worker-connections", type=int, default=2000, help="gevent requests per worker")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request (seconds)")
+    parser.add_argument("--json", action="store_true", help="print the summary rows as JSON")
+    args = parser.parse_args()
+
+    platform = _start_platform(args.latency)
+    upstream = f"http://127.0.0.1:{platform.server_address[1]}"
+    rows = []
+    try:
+        for mode in filter(None, (m.strip() for m in args.modes.split(","))):
+            row = run_mode(mode, upstream, args)
+            if row is not None:
+                rows.append(row)
+    finally:
+        platform.shutdown()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))  # noqa: T201
+        return
+    columns = ("mode", "ok", "errors", "wall_s", "req_per_s", "p50_ms", "p95_ms", "p99_ms", "mean_ms")
+    print("  ".join(f"{c:>9}" for c in columns))  # noqa: T201
+    for row in rows:
+        print("  ".join(f"{row[c]!s:>9}" for c in columns))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Copyright (c) 2026 IndyKite
+"""Shadow-test KBAC policies locally, without creating them on the platform.
+
+Streams data/nodes/nodes_music.json and relationships_music.json (the
+files capture pushes) into an in-memory graph (api/_kbac_local.py) and
+evaluates the manifest's ten KBAC policies there:
+
+    # every subject x resource cell of every policy, with allow/deny counts
+    python kbac_shadow.py sweep
+
+    # which decisions an edited policy would change before publishing it
+    python kbac_shadow.py diff --against my-policy.json
+
+    # answer AuthZEN bodies (single or with an "evaluations" list); without
+    # a file, the manifest's Evaluation bodies
+    python kbac_shadow.py evaluate [requests.json]
+
+--against takes a manifest (its KBAC list replaces the current one), a
+list of KBAC entries or a single entry ({name, policy, status}); entries
+replace the current policies of the same name and new names are added.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import ijson
+from api._kbac_local import LocalEvaluator, LocalGraph, diff, sweep
+from api._music_data import EVALUATIONS, KBACS
+
+APP_DIR = Path(__file__).parent
+NODES_FILE = APP_DIR / "data" / "nodes" / "nodes_music.json"
+RELATIONSHIPS_FILE = APP_DIR / "data" / "relationships" / "relationships_music.json"
+
+
+def load_graph():
+    """Stream the nodes and relationships files into the in-memory graph."""
+    with NODES_FILE.open("rb") as nodes, RELATIONSHIPS_FILE.open("rb") as relationships:
+        return LocalGraph.from_records(
+            ijson.items(nodes, "nodes.item", use_float=True),
+            ijson.items(relationships, "relationships.item", use_float=True),
+        )
+
+
+def candidate_policies(current, path):
+    """Return the policy set to compare against: `current` updated from the --against file."""
+    with Path(path).open() as f:
+        raw = json.load(f)
+    if isinstance(raw, dict) and ("kbac" in raw or "kbacs" in raw):
+        entries = raw.get("kbac", raw.get("kbacs"))
+        return entries if isinstance(entries, list) else [entries]
+    entries = raw if isinstance(raw, list) else [raw]
+    by_name = {entry.get("name", ""): entry for entry in current}
+    for entry in entries:
+        by_name[entry.get("name", "")] = entry
+    return list(by_name.values())
+
+
+def _report_unsupported(evaluator, label=""):
+    for name, reason in evaluator.unsupported.items():
+        print(f"{label}skipped {name}: {reason}", file=sys.stderr)  # noqa: T201
+
+
+def run_sweep(evaluator):
+    """Evaluate every cell of every policy group; return the summary dict."""
+    started = time.perf_counter()
+    groups = {}
+    for (subject_type, action, resource_type), _subject_id, allowed in sweep(evaluator):
+        counts = groups.setdefault(
+            f"{subject_type} {action} {resource_type}",
+            {"subjects": 0, "resources": len(evaluator.graph.by_type.get(resource_type, [])), "allow": 0},
+        )
+        counts["subjects"] += 1
+        counts["allow"] += len(allowed)
+    wall = time.perf_counter() - started
+    for counts in groups.values():
+        counts["deny"] = counts["subjects"] * counts["resources"] - counts["allow"]
+    decisions = sum(c["subjects"] * c["resources"] for c in groups.values())
+    return {
+        "decisions": decisions,
+        "wall_s": round(wall, 3),
+        "decisions_per_s": round(decisions / wall) if wall else 0,
+        "groups": groups,
+        "unsupported": evaluator.unsupported,
+    }
+
+
+def run_diff(before, after):
+    """Compare two evaluators over every cell; return the summary dict with the changed cells."""
+    started = time.perf_counter()
+    changes = list(diff(before, after))
+    by_group = {}
+    for change in changes:
+        group = f"{change['subject_type']} {change['action']} {change['resource_type']}"
+        counts = by_group.setdefault(group, {"granted": 0, "revoked": 0})
+        counts[change["change"]] += 1
+    return {
+        "wall_s": round(time.perf_counter() - started, 3),
+        "granted": sum(c["granted"] for c in by_group.values()),
+        "revoked": sum(c["revoked"] for c in by_group.values()),
+        "groups": by_group,
+        "changes": changes,
+        "unsupported": {"before": before.unsupported, "after": after.unsupported},
+    }
+
+
+def run_evaluate(evaluator, path):
+    """Answer every AuthZEN body in the file (one body or a list of them), or the manifest's."""
+    if path is None:
+        raw = [entry["body"] for entry in EVALUATIONS]
+    elif path == "-":
+        raw = json.load(sys.stdin)
+    else:
+        with Path(path).open() as f:
+            raw = json.load(f)
+    bodies = raw if isinstance(raw, list) else [raw]
+    return [evaluator.evaluations(body) if "evaluations" in body else evaluator.evaluate(body) for body in bodies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sweep", help="evaluate every subject x resource cell of every policy")
+    diff_parser = commands.add_parser("diff", help="list the decisions a policy change would flip")
+    diff_parser.add_argument("--against", required=True, help="manifest, KBAC entry list or single KBAC entry")
+    diff_parser.add_argument("--show", type=int, default=20, help="changed cells to print (text output)")
+    evaluate_parser = commands.add_parser("evaluate", help="answer AuthZEN request bodies")
+    evaluate_parser.add_argument(
+        "requests",
+        nargs="?",
+        help="JSON file with one body or a list of them (- for stdin; default: the manifest's evaluations)",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = load_graph()
+    policies = KBACS
+    evaluator = LocalEvaluator(graph, policies)
+    loaded = time.perf_counter() - started
+
+    if args.command == "evaluate":
+        _report_unsupported(evaluator)
+        print(json.dumps(run_evaluate(evaluator, args.requests), indent=2))  # noqa: T201
+        return
+    if args.command == "diff":
+        after = LocalEvaluator(graph, candidate_policies(policies, args.against))
+        result = run_diff(evaluator, after)
+        if args.json:
+            print(json.dumps(result, indent=2))  # noqa: T201
+            return
+        _report_unsupported(evaluator, "current: ")
+        _report_unsupported(after, "candidate: ")
+        print(  # noqa: T201
+            f"{result['granted']} decisions newly allowed, {result['revoked']} no longer allowed ({result['wall_s']}s)",
+        )
+        for group, counts in result["groups"].items():
+            print(f"  {group}: +{counts['granted']} -{counts['revoked']}")  # noqa: T201
+        for change in result["changes"][: args.show]:
+            sign = "+" if change["change"] == "granted" else "-"
+            print(  # noqa: T201
+                f"  {sign} {change['subject_type']}:{change['subject_id']} {change['action']} "
+                f"{change['resource_type']}:{change['resource_id']}  ({', '.join(change['policies'])})",
+            )
+        if len(result["changes"]) > args.show:
+            print(f"  ... {len(result['changes']) - args.show} more (--show, --json)")  # noqa: T201
+        return
+
+    result = run_sweep(evaluator)
+    if args.json:
+        print(json.dumps(result, indent=2))  # noqa: T201
+        return
+    _report_unsupported(evaluator)
+    print(  # noqa: T201
+        f"{len(graph.props)} nodes, {graph.relationship_count} relationships loaded in {loaded:.2f}s; "
+        f"{result['decisions']} decisions in {result['wall_s']}s = {result['decisions_per_s']}/s",
+    )
+    print(f"{'subject action resource':>36}  {'subjects':>8}  {'allow':>7}  {'deny':>7}")  # noqa: T201
+    for group, counts in result["groups"].items():
+        print(f"{group:>36}  {counts['subjects']:>8}  {counts['allow']:>7}  {counts['deny']:>7}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
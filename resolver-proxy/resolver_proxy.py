@@ -0,0 +1,272 @@
+# Copyright (c) 2026 IndyKite
+"""Caching proxy for the third-party APIs behind external data resolvers.
+
+The weather and stock-quote resolvers point the platform at open-meteo and
+Yahoo Finance, so every CIQ execute that reads weather.property.current or
+quote.property.price waits for a third-party call. Pointing a resolver's url
+at this proxy instead (https://<proxy>/<upstream>/<path>?<query>) answers
+repeated lookups from memory:
+
+ - responses are cached per normalized URL (upstream, path, sorted query)
+   for the upstream's TTL;
+ - for STALE_SECONDS after that, the stale copy is served at once and
+   refreshed in the background (stale-while-revalidate); while the
+   upstream is failing it is served for up to STALE_IF_ERROR_SECONDS;
+ - concurrent misses for the same URL share one upstream fetch;
+ - the resolver's User-Agent, Accept and Accept-Language headers go
+   upstream with the fetch (Yahoo answers the bare python-requests agent
+   with 429), falling back to PROXY_USER_AGENT_<UPSTREAM> or a browser-like
+   DEFAULT_USER_AGENT; a 429, like a 5xx, is served stale-if-error;
+ - GET /stats reports hit rates and upstream latency per upstream.
+
+Only the upstreams listed in PROXY_UPSTREAMS are reachable, so this is not
+an open proxy. Only successful GET responses are cached. The cache is per
+process - run one worker with threads.
+"""
+
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("resolver_proxy")
+
+HTTP_OK = 200
+HTTP_NOT_FOUND = 404
+HTTP_METHOD_NOT_ALLOWED = 405
+HTTP_TOO_MANY_REQUESTS = 429
+HTTP_SERVER_ERROR = 500
+HTTP_BAD_GATEWAY = 502
+
+# name=base URL pairs; the name is the first path segment of a proxied URL.
+DEFAULT_UPSTREAMS = "open-meteo=https://api.open-meteo.com,yahoo=https://query1.finance.yahoo.com"
+TTL_SECONDS = float(os.getenv("PROXY_TTL_SECONDS", "60"))
+STALE_SECONDS = float(os.getenv("PROXY_STALE_SECONDS", "300"))
+STALE_IF_ERROR_SECONDS = float(os.getenv("PROXY_STALE_IF_ERROR_SECONDS", "3600"))
+UPSTREAM_TIMEOUT = float(os.getenv("PROXY_UPSTREAM_TIMEOUT", "10"))
+CACHE_MAX_ENTRIES = int(os.getenv("PROXY_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BODY_BYTES = int(os.getenv("PROXY_CACHE_MAX_BODY_BYTES", str(1024 * 1024)))
+REFRESH_WORKERS = int(os.getenv("PROXY_REFRESH_WORKERS", "4"))
+LATENCY_SAMPLES = 1000
+# Upstream response headers passed through to the caller (bodies are stored decoded, so no Content-Encoding).
+PASS_HEADERS = ("Content-Type", "Content-Language")
+# Request headers forwarded upstream; none of them changes what the cached body may be served to.
+FORWARD_HEADERS = ("User-Agent", "Accept", "Accept-Language")
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; resolver-proxy)"
+
+
+def _parse_upstreams(spec):
+    upstreams = {}
+    for item in spec.split(","):
+        name, _, base = item.strip().partition("=")
+        if name and base:
+            suffix = name.upper().replace("-", "_")
+            upstreams[name] = {
+                "base": base.rstrip("/"),
+                "ttl": float(os.getenv(f"PROXY_TTL_{suffix}", str(TTL_SECONDS))),
+                "user_agent": os.getenv(f"PROXY_USER_AGENT_{suffix}", DEFAULT_USER_AGENT),
+            }
+    return upstreams
+
+
+UPSTREAMS = _parse_upstreams(os.getenv("PROXY_UPSTREAMS", DEFAULT_UPSTREAMS))
+
+
+def normalized_url(upstream, path, args):
+    """Return the upstream URL for one request, query parameters sorted (blanks kept); it is the cache key."""
+    query = urlencode(sorted(args.items(multi=True)))
+    return f"{UPSTREAMS[upstream]['base']}/{path}" + (f"?{query}" if query else "")
+
+
+class _Entry:
+    def __init__(self, status, headers, body, ttl) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.fetched = time.monotonic()
+        self.ttl = ttl
+
+    def age(self):
+        return time.monotonic() - self.fetched
+
+
+class _Fetch:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class ResolverCache:
+    """Per-URL response cache with stale-while-revalidate and coalesced upstream fetches."""
+
+    def __init__(self) -> None:
+        """Start empty, with a pooled upstream session and the background refresh workers."""
+        self._entries = OrderedDict()
+        self._fetches = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(UPSTREAMS) or 1, pool_maxsize=32)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._refresher = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="refresh")
+        self._stats = {
+            name: {
+                "requests": 0,
+                "hits": 0,
+                "stale_hits": 0,
+                "misses": 0,
+                "coalesced": 0,
+                "refreshes": 0,
+                "upstream_errors": 0,
+            }
+            for name in UPSTREAMS
+        }
+        self._latencies = {name: deque(maxlen=LATENCY_SAMPLES) for name in UPSTREAMS}
+
+    def get(self, upstream, url, headers=None):
+        """Return (entry, outcome) - outcome is HIT, STALE, MISS or COALESCED; raise on upstream failure.
+
+        headers are the request headers to send upstream if this call fetches (see FORWARD_HEADERS).
+        """
+        ttl = UPSTREAMS[upstream]["ttl"]
+        with self._lock:
+            stats = self._stats[upstream]
+            stats["requests"] += 1
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                age = entry.age()
+                if age < entry.ttl:
+                    stats["hits"] += 1
+                    return entry, "HIT"
+                if age < entry.ttl + STALE_SECONDS:
+                    stats["stale_hits"] += 1
+                    if url not in self._fetches:
+                        self._fetches[url] = _Fetch()
+                        stats["refreshes"] += 1
+                        self._refresher.submit(self._fetch, upstream, url, ttl, headers)
+                    return entry, "STALE"
+            fetch = self._fetches.get(url)
+            leader = fetch is None
+            if leader:
+                fetch = self._fetches[url] = _Fetch()
+                stats["misses"] += 1
+            else:
+                stats["coalesced"] += 1
+        if leader:
+            self._fetch(upstream, url, ttl, headers)
+        else:
+            fetch.done.wait(UPSTREAM_TIMEOUT * 2)
+        if fetch.entry is not None and fetch.entry.status < HTTP_SERVER_ERROR and not _throttled(fetch.entry):
+            return fetch.entry, "MISS" if leader else "COALESCED"
+        # Upstream failing: an expired copy is better than no answer (stale-if-error).
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is not None and entry.age() < entry.ttl + STALE_IF_ERROR_SECONDS:
+            return entry, "STALE"
+        if fetch.entry is not None:
+            return fetch.entry, "MISS" if leader else "COALESCED"
+        raise fetch.error or requests.Timeout(f"timed out waiting for {url}")
+
+    def _fetch(self, upstream, url, ttl, headers=None):
+        """Fetch url once for every caller waiting on it; cache a 200 within the size limit."""
+        with self._lock:
+            fetch = self._fetches[url]
+        sent = {"User-Agent": UPSTREAMS[upstream]["user_agent"], **(headers or {})}
+        start = time.perf_counter()
+        try:
+            response = self._session.get(url, headers=sent, timeout=UPSTREAM_TIMEOUT)
+            headers = {h: response.headers[h] for h in PASS_HEADERS if h in response.headers}
+            fetch.entry = _Entry(response.status_code, headers, response.content, ttl)
+        except requests.RequestException as exc:
+            fetch.error = exc
+            logger.warning("Upstream %s failed: %s", upstream, exc)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latencies[upstream].append(elapsed)
+                if fetch.entry is None or fetch.entry.status != HTTP_OK:
+                    self._stats[upstream]["upstream_errors"] += 1
+                elif len(fetch.entry.body) <= CACHE_MAX_BODY_BYTES:
+                    self._entries[url] = fetch.entry
+                    self._entries.move_to_end(url)
+                    while len(self._entries) > CACHE_MAX_ENTRIES:
+                        self._entries.popitem(last=False)
+                del self._fetches[url]
+            fetch.done.set()
+
+    def stats(self):
+        """Return the cache size and, per upstream, the request outcomes, hit rate and upstream latency."""
+        with self._lock:
+            out = {"entries": len(self._entries), "upstreams": {}}
+            for name, counts in self._stats.items():
+                served = counts["hits"] + counts["stale_hits"] + counts["coalesced"]
+                latencies = sorted(self._latencies[name])
+                out["upstreams"][name] = {
+                    **counts,
+                    "ttl_seconds": UPSTREAMS[name]["ttl"],
+                    "hit_rate": round(served / counts["requests"], 3) if counts["requests"] else 0.0,
+                    "upstream_ms_mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+                    "upstream_ms_p95": round(latencies[round(0.95 * (len(latencies) - 1))] * 1000, 1)
+                    if latencies
+                    else 0.0,
+                }
+            return out
+
+
+def _throttled(entry):
+    return entry.status == HTTP_TOO_MANY_REQUESTS
+
+
+def forwarded_headers(incoming):
+    """Return the FORWARD_HEADERS present on the incoming request."""
+    return {name: incoming[name] for name in FORWARD_HEADERS if incoming.get(name)}
+
+
+app = Flask(__name__)
+cache = ResolverCache()
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness probe."""
+    return {"status": "ok", "upstreams": sorted(UPSTREAMS)}
+
+
+@app.get("/stats")
+def stats():
+    """Hit rates and upstream latency per upstream."""
+    return jsonify(cache.stats())
+
+
+@app.route("/<upstream>/<path:path>", methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"])
+def proxy(upstream, path):
+    """Serve GET <upstream>/<path>?<query> from the cache, fetching from the upstream on a miss."""
+    if upstream not in UPSTREAMS:
+        return jsonify({"error": f"unknown upstream {upstream!r}", "upstreams": sorted(UPSTREAMS)}), HTTP_NOT_FOUND
+    if request.method not in {"GET", "HEAD"}:
+        return jsonify({"error": "only GET resolvers can be proxied"}), HTTP_METHOD_NOT_ALLOWED
+    url = normalized_url(upstream, path, request.args)
+    try:
+        entry, outcome = cache.get(upstream, url, forwarded_headers(request.headers))
+    except requests.RequestException as exc:
+        return jsonify({"error": f"upstream {upstream} unavailable: {exc}"}), HTTP_BAD_GATEWAY
+    headers = {**entry.headers, "X-Cache": outcome, "Age": str(int(entry.age()))}
+    return Response(entry.body, status=entry.status, headers=headers)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=int(os.getenv("PROXY_PORT", "8090")), threaded=True)  # noqa: S104